@@ -0,0 +1,73 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from rosbags.typesys.types import builtin_interfaces__msg__Time as Time
+from rosbags.typesys.types import diagnostic_msgs__msg__KeyValue as KeyValue
+from rosbags.typesys.types import sensor_msgs__msg__Image as Image
+from rosbags.typesys.types import std_msgs__msg__Header as Header
+
+from module_loader import load_module
+
+RESOLUTIONS = [(640, 480), (1280, 720)]
+
+def write_cdr(bag, frame):
+    if bag.start_nanos == 0: bag.start_nanos = time.time_ns()
+
+    t_str_arr = ("%.9f" % time.time()).split('.')
+    header = Header(stamp=Time(sec=int(t_str_arr[0]), nanosec=int(t_str_arr[1])), frame_id='0')
+    img = Image(header=header,
+            height=frame.shape[0],
+            width=frame.shape[1],
+            encoding='mono16',
+            is_bigendian=0,
+            step=frame.shape[1]*2,
+            data=frame.flatten().view(dtype=np.int8))
+    bag._write(bag.depth_conn, Image.__msgtype__, img)
+
+    for name, value in {
+        'system_time': "%.6f" % time.time(),
+        'timestamp_domain': 'System Time',
+        'Time Of Arrival': int(time.time())
+    }.items():
+        bag._write(bag.depth_meta_conn, KeyValue.__msgtype__, KeyValue(key=name, value=str(value)))
+
+def time_writes(rosbag_utils, calib, resolution, compression, write, seconds):
+    width, height = resolution
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 65535, (height, width), dtype=np.uint16) for _ in range(8)]
+    with tempfile.TemporaryDirectory() as folder:
+        bag = rosbag_utils.DepthAiBags(Path(folder) / 'depth.bag', calib, {'depth': resolution},
+                                       compression=compression)
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            write(bag, frames[count % len(frames)])
+            count += 1
+        bag.close()
+        elapsed = time.perf_counter() - start
+    return elapsed / count, frames[0].nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description="Depth bag frame writes: rosbags CDR serialization vs direct ROS1 buffers")
+    parser.add_argument('calib', type=Path, help="calib.json saved next to a recording")
+    parser.add_argument('--compression', default='none', choices=['none', 'lz4', 'bz2'])
+    parser.add_argument('--seconds', default=2., type=float, help="Time spent writing each configuration")
+    args = parser.parse_args()
+
+    rosbag_utils = load_module('depth-recording/rosbag_utils.py')
+    writers = [('cdr', write_cdr), ('direct', lambda bag, frame: bag.write(frame))]
+
+    print(f"{args.compression} compression, 30 FPS budget 33.3 ms")
+    print(" resolution |  ms / frame  cdr / direct |     MB/s  cdr / direct")
+    for resolution in RESOLUTIONS:
+        results = [time_writes(rosbag_utils, args.calib, resolution, args.compression, write, args.seconds)
+                   for _, write in writers]
+        per_frame = [seconds * 1e3 for seconds, _ in results]
+        rates = [nbytes / seconds / 1e6 for seconds, nbytes in results]
+        print("%5dx%-5d | %12.3f / %6.3f | %12.1f / %6.1f" % (*resolution, *per_frame, *rates))
+
+if __name__ == '__main__':
+    main()
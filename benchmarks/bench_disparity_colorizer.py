@@ -0,0 +1,35 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from module_loader import best_of, load_module
+
+FRAMES = [('400p', (400, 640)), ('720p', (720, 1280)), ('1080p', (1080, 1920))]
+
+def colorize_copy(disparity, max_disparity, threshold):
+    frame = (disparity * 255. / max_disparity).astype(np.uint8)
+    frame[frame < threshold] = 0
+    return np.ascontiguousarray(cv2.applyColorMap(frame, cv2.COLORMAP_JET))
+
+def main():
+    parser = argparse.ArgumentParser(description="Disparity colorizing: scale + threshold + applyColorMap vs DisparityColorizer")
+    parser.add_argument('--demo', default='poka-yoke-picking/utils', help="Folder holding depth_utils.py")
+    parser.add_argument('--threshold', type=int, default=128, help="Scaled disparity below which pixels are black")
+    args = parser.parse_args()
+
+    depth_utils = load_module(f"{args.demo}/depth_utils.py")
+    rng = np.random.default_rng(0)
+
+    print(" frame  dtype  |  ms / frame  copy / DisparityColorizer")
+    for name, shape in FRAMES:
+        for dtype, max_disparity in [(np.uint8, 95), (np.uint16, 3040)]:
+            disparity = rng.integers(0, max_disparity + 1, shape, dtype=dtype)
+            colorizer = depth_utils.DisparityColorizer(max_disparity, threshold=args.threshold)
+            copy = lambda: colorize_copy(disparity, max_disparity, args.threshold)
+            assert np.array_equal(copy(), colorizer.colorize(disparity))
+            times = [best_of(function, 20, 3) * 1e3 for function in (copy, lambda: colorizer.colorize(disparity))]
+            print(f"{name:>6s} {np.dtype(dtype).name:6s} | {times[0]:12.3f} / {times[1]:8.3f}")
+
+if __name__ == '__main__':
+    main()
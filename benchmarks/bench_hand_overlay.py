@@ -0,0 +1,67 @@
+import argparse
+import sys
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from module_loader import ROOT, best_of, load_module
+
+FRAME = (360, 640, 3)
+BOX = (80, 60)
+
+def draw_hand_validation_copy(image, hand, du):
+    xMin, yMin, xMax, yMax = hand.Rect
+    x_point, y_point, z_point = du.CalculateTextPoints(xMin, yMin, xMax, yMax)
+    z_color = du.GetValidationColor(hand.InRangeZ)
+    image_copy = image.copy()
+    cv2.rectangle(image_copy, (xMin, yMin), (xMax, yMax), z_color, cv2.FILLED)
+    image = cv2.addWeighted(image, 0.8, image_copy, 0.2, 0)
+    cv2.rectangle(image, (xMin, yMin), (xMax, yMax), du.GetValidationColor(hand.InsideRect), 2)
+    cv2.putText(image, 'X', x_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, du.GetValidationColor(hand.InRangeX), 1)
+    cv2.putText(image, 'Y', y_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, du.GetValidationColor(hand.InRangeY), 1)
+    cv2.putText(image, 'Z', z_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, z_color, 1)
+    return image
+
+def draw_copy(image, hands, du):
+    image = image.copy()
+    for hand in hands:
+        image = draw_hand_validation_copy(image, hand, du)
+    return image
+
+def draw_in_place(image, hands, du):
+    image = image.copy()
+    for hand in hands:
+        du.DrawHandValidation(image, hand)
+    return image
+
+def random_hands(rng, count, shape):
+    h, w = shape[:2]
+    hands = []
+    for _ in range(count):
+        x, y = int(rng.integers(0, w - BOX[0])), int(rng.integers(0, h - BOX[1]))
+        flags = rng.integers(0, 2, 4).astype(bool)
+        hands.append(SimpleNamespace(Rect=(x, y, x + BOX[0], y + BOX[1]),
+            InsideRect=flags[0], InRangeX=flags[1], InRangeY=flags[2], InRangeZ=flags[3]))
+    return hands
+
+def main():
+    parser = argparse.ArgumentParser(description="Hand overlay: full-frame copy + addWeighted vs DrawHandValidation in place")
+    parser.add_argument('--demo', default='poka-yoke-picking', help="Folder holding utils/drawing_utils.py")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT / args.demo))
+    du = load_module(f"{args.demo}/utils/drawing_utils.py")
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, FRAME, dtype=np.uint8)
+
+    print(f"{FRAME[1]}x{FRAME[0]} frame, {BOX[0]}x{BOX[1]} boxes")
+    print(" hands |  us / frame  copy / in place")
+    for count in range(1, 5):
+        hands = random_hands(rng, count, FRAME)
+        assert np.array_equal(draw_copy(image, hands, du), draw_in_place(image, hands, du))
+        times = [best_of(lambda: draw(image, hands, du), 200) * 1e6 for draw in (draw_copy, draw_in_place)]
+        print(f"{count:6d} | {times[0]:12.1f} / {times[1]:8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+from math import ceil, sqrt
+
+import numpy as np
+
+from module_loader import best_of, load_module
+
+def generate_anchors_loop(mpu, options):
+    anchors = []
+    layer_id = 0
+    n_strides = len(options.strides)
+    while layer_id < n_strides:
+        anchor_height = []
+        anchor_width = []
+        aspect_ratios = []
+        scales = []
+        last_same_stride_layer = layer_id
+        while last_same_stride_layer < n_strides and \
+                options.strides[last_same_stride_layer] == options.strides[layer_id]:
+            scale = mpu.calculate_scale(options.min_scale, options.max_scale, last_same_stride_layer, n_strides)
+            if last_same_stride_layer == 0 and options.reduce_boxes_in_lowest_layer:
+                aspect_ratios += [1.0, 2.0, 0.5]
+                scales += [0.1, scale, scale]
+            else:
+                aspect_ratios += options.aspect_ratios
+                scales += [scale] * len(options.aspect_ratios)
+                if options.interpolated_scale_aspect_ratio > 0:
+                    if last_same_stride_layer == n_strides -1:
+                        scale_next = 1.0
+                    else:
+                        scale_next = mpu.calculate_scale(options.min_scale, options.max_scale, last_same_stride_layer+1, n_strides)
+                    scales.append(sqrt(scale * scale_next))
+                    aspect_ratios.append(options.interpolated_scale_aspect_ratio)
+            last_same_stride_layer += 1
+
+        for i,r in enumerate(aspect_ratios):
+            ratio_sqrts = sqrt(r)
+            anchor_height.append(scales[i] / ratio_sqrts)
+            anchor_width.append(scales[i] * ratio_sqrts)
+
+        stride = options.strides[layer_id]
+        feature_map_height = ceil(options.input_size_height / stride)
+        feature_map_width = ceil(options.input_size_width / stride)
+
+        for y in range(feature_map_height):
+            for x in range(feature_map_width):
+                for anchor_id in range(len(anchor_height)):
+                    x_center = (x + options.anchor_offset_x) / feature_map_width
+                    y_center = (y + options.anchor_offset_y) / feature_map_height
+                    if options.fixed_anchor_size:
+                        new_anchor = [x_center, y_center, 1.0, 1.0]
+                    else:
+                        new_anchor = [x_center, y_center, anchor_width[anchor_id], anchor_height[anchor_id]]
+                    anchors.append(new_anchor)
+
+        layer_id = last_same_stride_layer
+    return np.array(anchors)
+
+def main():
+    parser = argparse.ArgumentParser(description="Palm SSD anchor generation: per-frame loop vs vectorized vs cached")
+    parser.add_argument('--demo', default='poka-yoke-picking/utils', help="Folder holding mediapipe_utils.py")
+    args = parser.parse_args()
+
+    mpu = load_module(f"{args.demo}/mediapipe_utils.py")
+    options = mpu.PALM_ANCHOR_OPTIONS
+
+    reference = generate_anchors_loop(mpu, options)
+    assert np.array_equal(reference, mpu.generate_anchors(options))
+    mpu.get_anchors(options)
+
+    print(f"{len(reference)} anchors")
+    print(f"  loop generate_anchors:       {best_of(lambda: generate_anchors_loop(mpu, options), 20) * 1e6:8.1f} us")
+    print(f"  vectorized generate_anchors: {best_of(lambda: mpu.generate_anchors(options), 200) * 1e6:8.1f} us")
+    print(f"  cached get_anchors:          {best_of(lambda: mpu.get_anchors(options), 2000) * 1e6:8.1f} us")
+
+if __name__ == '__main__':
+    main()
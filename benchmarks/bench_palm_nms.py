@@ -0,0 +1,51 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from module_loader import best_of, load_module
+
+def palm_regions_nms_cv2(palms, nms_thresh):
+    if len(palms) == 0: return palms
+    boxes = (palms.boxes * 1000).astype(np.int32)
+    indices = cv2.dnn.NMSBoxes(boxes.tolist(), palms.scores.tolist(), 0, nms_thresh)
+    return palms.select(np.asarray(indices, dtype=np.int64).reshape(-1))
+
+def palm_outputs(anchors, hands, rng):
+    scores = rng.normal(-6, 1, len(anchors)).astype(np.float32)
+    bboxes = rng.normal(0, 1, (len(anchors), 18)).astype(np.float32)
+    for center in rng.uniform(0.2, 0.8, (hands, 2)):
+        size = rng.uniform(0.15, 0.25)
+        near = np.flatnonzero(np.hypot(*(anchors[:, 0:2] - center).T) < size * 0.5)
+        scores[near] = rng.normal(2, 1, len(near))
+        bboxes[near, 0:2] = (center - anchors[near, 0:2]) * 128 + rng.normal(0, 1, (len(near), 2))
+        bboxes[near, 2:4] = size * 128 + rng.normal(0, 2, (len(near), 2))
+    return scores, bboxes
+
+def main():
+    parser = argparse.ArgumentParser(description="Palm NMS: cv2.dnn.NMSBoxes vs NumPy hard and weighted NMS")
+    parser.add_argument('--demo', default='poka-yoke-picking/utils', help="Folder holding mediapipe_utils.py")
+    parser.add_argument('--score_thresh', type=float, default=0.6)
+    parser.add_argument('--nms_thresh', type=float, default=0.3)
+    args = parser.parse_args()
+
+    mpu = load_module(f"{args.demo}/mediapipe_utils.py")
+    anchors = mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)
+    rng = np.random.default_rng(0)
+
+    variants = {
+        'cv2': lambda palms: palm_regions_nms_cv2(palms, args.nms_thresh),
+        'numpy': lambda palms: mpu.palm_regions_nms(palms, args.nms_thresh),
+        'weighted': lambda palms: mpu.palm_regions_nms(palms, args.nms_thresh, weighted=True),
+    }
+    print("hands candidates |  NMS only (us)  cv2 / numpy / weighted | decode + NMS (us)")
+    for hands in (1, 2, 4):
+        scores, bboxes = palm_outputs(anchors, hands, rng)
+        palms = mpu.decode_palm_regions(args.score_thresh, scores, bboxes, anchors)
+        nms = [best_of(lambda: nms(palms), 500) * 1e6 for nms in variants.values()]
+        total = [best_of(lambda: nms(mpu.decode_palm_regions(args.score_thresh, scores, bboxes, anchors)), 500) * 1e6
+                 for nms in variants.values()]
+        print(f"{hands:5d} {len(palms):10d} | {' / '.join(f'{t:6.1f}' for t in nms):>40s} | {' / '.join(f'{t:6.1f}' for t in total)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from module_loader import best_of, load_module
+
+FRAMES = [('1080p', (1080, 1920, 3)), ('13MP', (3120, 4208, 3))]
+
+def letterbox_copy(frame, size):
+    h, w = frame.shape[:2]
+    frame_size = max(h, w)
+    pad_h = int((frame_size - h)/2)
+    pad_w = int((frame_size - w)/2)
+    padded = cv2.copyMakeBorder(frame, pad_h, pad_h, pad_w, pad_w, cv2.BORDER_CONSTANT)
+    return np.ascontiguousarray(cv2.resize(padded, (size, size), interpolation=cv2.INTER_NEAREST).transpose(2, 0, 1))
+
+def stretch_copy(frame, size, interpolation):
+    return np.ascontiguousarray(cv2.resize(frame, (size, size), interpolation=interpolation).transpose(2, 0, 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Planar NN input: copyMakeBorder + resize + transpose vs PlanarResizer")
+    parser.add_argument('--demo', default='poka-yoke-picking/utils', help="Folder holding nn_utils.py")
+    args = parser.parse_args()
+
+    nnu = load_module(f"{args.demo}/nn_utils.py")
+    rng = np.random.default_rng(0)
+
+    print(" frame  size mode          |  ms / frame  copy / PlanarResizer")
+    for name, shape in FRAMES:
+        frame = rng.integers(0, 256, shape, dtype=np.uint8)
+        for size, mode in [(128, 'letterbox'), (416, 'letterbox'), (416, 'stretch'), (224, 'stretch area')]:
+            if mode == 'letterbox':
+                resizer = nnu.PlanarResizer(size)
+                copy = lambda: letterbox_copy(frame, size)
+            else:
+                interpolation = cv2.INTER_AREA if mode == 'stretch area' else cv2.INTER_NEAREST
+                resizer = nnu.PlanarResizer(size, letterbox=False, interpolation=interpolation)
+                copy = lambda: stretch_copy(frame, size, interpolation)
+            assert np.array_equal(copy(), resizer.resize(frame))
+            times = [best_of(function, 20, 3) * 1e3 for function in (copy, lambda: resizer.resize(frame))]
+            print(f"{name:>6s} {size:5d} {mode:13s} | {times[0]:12.3f} / {times[1]:8.3f}")
+
+if __name__ == '__main__':
+    main()
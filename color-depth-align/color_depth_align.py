@@ -1,6 +1,6 @@
 import cv2
-import numpy as np
 import depthai as dai
+from depth_utils import DisparityColorizer
 
 rgbWeight = 0.5
 depthWeight = 0.5
@@ -51,6 +51,7 @@ stereo.setSubpixel(False)
 stereo.setDepthAlign(dai.CameraBoardSocket.RGB)
 
 maxDisparity = stereo.initialConfig.getMaxDisparity()
+depthColorizer = DisparityColorizer(maxDisparity)
 
 camRgb.isp.link(rgbOut.input)
 left.out.link(stereo.left)
@@ -86,11 +87,7 @@ with dai.Device(pipeline) as device:
             cv2.imshow(rgbWindowName, frameRgb)
 
         if latestPacket["disp"] is not None:
-            frameDisp = latestPacket["disp"].getFrame()
-            frameDisp = (frameDisp * 255.0 / maxDisparity).astype(np.uint8)
-            frameDisp[frameDisp<128] = 0
-            frameDisp = cv2.applyColorMap(frameDisp, cv2.COLORMAP_JET)
-            frameDisp = np.ascontiguousarray(frameDisp)
+            frameDisp = depthColorizer.colorize(latestPacket["disp"].getFrame())
             cv2.imshow(depthWindowName, frameDisp)
 
         if frameRgb is not None and frameDisp is not None:
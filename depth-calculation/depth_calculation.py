@@ -1,7 +1,8 @@
 import cv2
-import numpy as np
 import depthai as dai
 import mediapipe_utils as mpu
+import nn_utils as nnu
+from depth_utils import DepthStatistics, DisparityColorizer
 from pathlib import Path
 
 class DepthCalculation:
@@ -13,6 +14,9 @@ class DepthCalculation:
         self.palm_input_length = 128
         self.palm_score_threshold = 0.6
         self.palm_nms_threshold = 0.3
+        self.palm_request_depth = 2
+        self.palm_planar = nnu.PlanarResizer(self.palm_input_length)
+        self.palm_layers = nnu.LayerReader({"regressors": (len(mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)), 18)})
 
     def create_pipeline(self):
         pipeline = dai.Pipeline()
@@ -54,6 +58,7 @@ class DepthCalculation:
         stereo.setDepthAlign(dai.CameraBoardSocket.RGB)
         
         self.maxDisparity = stereo.initialConfig.getMaxDisparity()
+        self.depth_colorizer = DisparityColorizer(self.maxDisparity)
 
         camColor.isp.link(colorOut.input)
         left.out.link(stereo.left)
@@ -71,41 +76,23 @@ class DepthCalculation:
 
         return pipeline
     
-    def to_planar(self, arr, shape):
-        resized = cv2.resize(arr, shape, interpolation=cv2.INTER_NEAREST).transpose(2,0,1)
-        return resized
-
     def updateBlendWeights(self, percent_color):
         self.colorWeight = float(percent_color)/100.0
         self.depthWeight = 1.0 - self.colorWeight
 
     def palm_postprocess(self, inference):
-        anchor_options = mpu.SSDAnchorOptions(
-            num_layers=4, 
-            min_scale=0.1484375,
-            max_scale=0.75,
-            input_size_height=128,
-            input_size_width=128,
-            anchor_offset_x=0.5,
-            anchor_offset_y=0.5,
-            strides=[8, 16, 16, 16],
-            aspect_ratios= [1.0],
-            reduce_boxes_in_lowest_layer=False,
-            interpolated_scale_aspect_ratio=1.0,
-            fixed_anchor_size=True)
-
-        anchors = mpu.generate_anchors(anchor_options)
-        
-        nb_anchors = anchors.shape[0]
+        anchors = mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)
 
-        scores = np.array(inference.getLayerFp16("classificators"), dtype=np.float16) 
-        bboxes = np.array(inference.getLayerFp16("regressors"), dtype=np.float16).reshape((nb_anchors, 18))
+        layers = self.palm_layers.read(inference)
+        scores = layers["classificators"]
+        bboxes = layers["regressors"]
         
-        self.regions = mpu.decode_bboxes(self.palm_score_threshold, scores, bboxes, anchors)
-        self.regions = mpu.non_max_suppression(self.regions, self.palm_nms_threshold)
+        palms = mpu.decode_palm_regions(self.palm_score_threshold, scores, bboxes, anchors)
+        palms = mpu.palm_regions_nms(palms, self.palm_nms_threshold)
 
-        mpu.detections_to_rect(self.regions)
-        mpu.rect_transformation(self.regions, self.frame_size, self.frame_size)
+        mpu.palm_regions_to_rect(palms)
+        mpu.palm_regions_transformation(palms, self.frame_size, self.frame_size)
+        self.regions = palms.to_regions()
 
     def run(self):
         device = dai.Device(self.create_pipeline())
@@ -125,6 +112,8 @@ class DepthCalculation:
         q_palm_in = device.getInputQueue(name="palm_in")
         q_palm_out = device.getOutputQueue(name="palm_out", maxSize=4, blocking=True)
 
+        palm_window = nnu.InferenceWindow(q_palm_in, q_palm_out, self.palm_request_depth)
+
         while True:
             latestPacket = {}
             latestPacket["color"] = None
@@ -136,41 +125,35 @@ class DepthCalculation:
                 if len(packets) > 0:
                     latestPacket[queueName] = packets[-1]
 
-            copiaColor = None
-
             if latestPacket["color"] is not None:
-                frameColor = latestPacket["color"].getCvFrame()
+                color = latestPacket["color"].getCvFrame()
 
-                h, w = frameColor.shape[:2]
+                h, w = color.shape[:2]
                 self.frame_size = max(h, w)
                 self.pad_h = int((self.frame_size - h)/2)
                 self.pad_w = int((self.frame_size - w)/2)
 
-                copiaColor = cv2.copyMakeBorder(frameColor, self.pad_h, self.pad_h, self.pad_w, self.pad_w, cv2.BORDER_CONSTANT)
-                
                 frame_nn = dai.ImgFrame()
                 frame_nn.setWidth(self.palm_input_length)
                 frame_nn.setHeight(self.palm_input_length)
-                frame_nn.setData(self.to_planar(copiaColor, (self.palm_input_length, self.palm_input_length)))
-                q_palm_in.send(frame_nn)
-                
-                inference = q_palm_out.get()
+                frame_nn.setData(self.palm_planar.resize(color))
+                palm_window.send(frame_nn, color)
+
+            for frameColor, inference in palm_window.results():
                 self.palm_postprocess(inference)
 
                 for i, region in enumerate(self.regions):
-                    self.draw_palm_rectangle(frameColor, copiaColor, region)
+                    self.draw_palm_rectangle(frameColor, region)
 
                 cv2.imshow(colorWindowName, frameColor)
             
             if latestPacket["depth"] is not None:
-                frameDisp = latestPacket["depth"].getFrame()
-                frameDisp = (frameDisp * 255. / self.maxDisparity).astype(np.uint8)
-                frameDisp[frameDisp<128] = 0
-                frameDisp = cv2.applyColorMap(frameDisp, cv2.COLORMAP_JET)
-                frameDisp = np.ascontiguousarray(frameDisp)
+                disparity = latestPacket["depth"].getFrame()
+                depth_statistics = DepthStatistics(disparity)
+                frameDisp = self.depth_colorizer.colorize(disparity)
 
                 for i, region in enumerate(self.regions):
-                    self.averageDepth, self.centroidX, self.centroidY = self.calc_spatials(self.x1, self.y1, self.x2, self.y2, frameDisp)
+                    self.averageDepth, self.centroidX, self.centroidY = self.calc_spatials(self.x1, self.y1, self.x2, self.y2, depth_statistics)
 
                     xmin, ymin, xmax, ymax = self.get_roi_by_percent(0.5, self.x1, self.y1, self.x2, self.y2)
 
@@ -191,12 +174,13 @@ class DepthCalculation:
             if cv2.waitKey(1) == ord('q'):
                 break
 
-    def draw_palm_rectangle(self, frame, copy, region):
+    def draw_palm_rectangle(self, frame, region):
         x1_float = region.pd_box[0]
         y1_float = region.pd_box[1]
         x2_float = x1_float + region.pd_box[2]
         y2_float = y1_float + region.pd_box[3]
-        new_h, new_w = copy.shape[:2]
+        new_h = self.pad_h * 2 + frame.shape[0]
+        new_w = self.pad_w * 2 + frame.shape[1]
         self.x1 = int(x1_float*new_w) - self.pad_w
         self.y1 = int(y1_float*new_h) - self.pad_h
         self.x2 = int(x2_float*new_w) - self.pad_w
@@ -206,12 +190,12 @@ class DepthCalculation:
     def draw_palm_text(self, frame, depth, pt1, pt2):
         cv2.putText(frame, str(depth), (pt1, pt2), cv2.FONT_HERSHEY_DUPLEX, 0.4, (255, 255, 255))
     
-    def calc_spatials(self, xmin, ymin, xmax, ymax, depth):
+    def calc_spatials(self, xmin, ymin, xmax, ymax, depth_statistics):
         xmin, ymin, xmax, ymax = self.get_roi_by_percent(0.5, xmin, ymin, xmax, ymax)
 
-        depthROI = depth[ymin:ymax, xmin:xmax]
-
-        averageDepth = int(np.mean(depthROI[True]))
+        averageDepth = depth_statistics.mean(xmin, ymin, xmax, ymax)
+        if averageDepth is not None:
+            averageDepth = int(averageDepth)
 
         centroidX = int((xmax - xmin) / 2) + xmin
         centroidY = int((ymax - ymin) / 2) + ymin
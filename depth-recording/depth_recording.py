@@ -1,16 +1,17 @@
 import argparse
 import depthai as dai
-from datetime import timedelta
 import contextlib
 import math
 import time
 from pathlib import Path
 import cv2
 
-from record_utils import EncodingQuality, Record
+from record_utils import BagCompression, EncodingQuality, Record
+from sync_utils import QueueEvents, StreamSynchronizer
 
 _save_choices = ("color", "left", "right", "disparity", "depth")
 _quality_choices = ("BEST", "HIGH", "MEDIUM", "LOW")
+_compression_choices = ("NONE", "LZ4", "BZ2")
 
 parser = argparse.ArgumentParser()
 parser.add_argument('-p', '--path', default="recordings", type=str, help="Path where to store the captured data")
@@ -20,6 +21,11 @@ parser.add_argument('-f', '--fps', type=float, default=30,
                     help='Camera sensor FPS, applied to all cams')
 parser.add_argument('-q', '--quality', default="HIGH", type=str, choices=_quality_choices,
                     help='Selects the quality of the recording. Default: %(default)s')
+parser.add_argument('-c', '--compression', default="NONE", type=str, choices=_compression_choices,
+                    help='Chunk compression of the depth bag: LZ4 for speed, BZ2 for size (too slow for 30 FPS depth). '
+                         'Encoded streams are already compressed and are stored as-is. Default: %(default)s')
+parser.add_argument('-cs', '--chunk_size', type=int, default=1024,
+                    help='Size in KB of the depth bag chunks that are compressed together. Default: %(default)s')
 parser.add_argument('-fc', '--frame_cnt', type=int, default=-1,
                     help='Number of frames to record. Record until stopped by default.')
 parser.add_argument('-tl', '--timelapse', type=int, default=-1,
@@ -29,22 +35,6 @@ parser.add_argument('-d', '--display', action="store_true", help="Display color
 args = parser.parse_args()
 save_path = Path.cwd() / args.path
 
-def check_sync(queues, timestamp):
-    matching_frames = []
-    for q in queues:
-        for i, msg in enumerate(q['msgs']):
-            time_diff = abs(msg.getTimestamp() - timestamp)
-            if time_diff <= timedelta(milliseconds=math.ceil(500 / args.fps)):
-                matching_frames.append(i)
-                break
-
-    if len(matching_frames) == len(queues):
-        for i, q in enumerate(queues):
-            q['msgs'] = q['msgs'][matching_frames[i]:]
-        return True
-    else:
-        return False
-
 def run_record():
     with contextlib.ExitStack() as stack:
         device_infos = dai.Device.getAllAvailableDevices()
@@ -63,46 +53,54 @@ def run_record():
             recording.set_timelapse(args.timelapse)
             recording.set_save_streams(args.save)
             recording.set_quality(EncodingQuality[args.quality])
+            recording.set_compression(BagCompression[args.compression])
+            recording.set_chunk_size(args.chunk_size * 1024)
             recording.set_preview(args.display)
             recording.start()
 
             recordings.append(recording)
 
         queues = [q for recording in recordings for q in recording.queues]
+        events = QueueEvents(max_size=10 * len(queues))
+        for q in queues:
+            events.attach(q)
+        sync = StreamSynchronizer([(q['mxid'], q['name']) for q in queues],
+                                  tolerance=math.ceil(500 / args.fps) / 1000)
         frame_counter = 0
         start_time = time.time()
         timelapse = 0
         while True:
             try:
-                for q in queues:
+                arrivals, overflow = events.wait(timeout=0.1)
+                for q, old_msg in overflow:
+                    sync.drop((q['mxid'], q['name']), old_msg)
+                for q, new_msg in arrivals:
                     if 0 < args.timelapse and time.time() - timelapse < args.timelapse:
                         continue
-                    new_msg = q['q'].tryGet()
-                    if new_msg is not None:
-                        q['msgs'].append(new_msg)
-                        if check_sync(queues, new_msg.getTimestamp()):
-                            if time.time() - start_time < 1.5: continue
-                            if 0 < args.timelapse: timelapse = time.time()
-                            if args.frame_cnt == frame_counter: raise KeyboardInterrupt
-                            frame_counter+=1
+                    synced = sync.add((q['mxid'], q['name']), new_msg)
+                    if synced is not None:
+                        if time.time() - start_time < 1.5: continue
+                        if 0 < args.timelapse: timelapse = time.time()
+                        if args.frame_cnt == frame_counter: raise KeyboardInterrupt
+                        frame_counter+=1
 
-                            for recording in recordings:
-                                frames = {}
-                                for stream in recording.queues:
-                                    frames[stream['name']] = stream['msgs'].pop(0).getCvFrame()
-                                    if stream['name'] == 'preview':
-                                        cv2.imshow(q['mxid'], frames[stream['name']])
-                                        del frames[stream['name']]
-                                recording.frame_q.put(frames)
-                time.sleep(0.001)
+                        for recording in recordings:
+                            msgs = {}
+                            for stream in recording.queues:
+                                msg = synced[(stream['mxid'], stream['name'])]
+                                if stream['name'] == 'preview':
+                                    cv2.imshow(stream['mxid'], msg.getCvFrame())
+                                else:
+                                    msgs[stream['name']] = msg
+                            recording.write(msgs)
                 if cv2.waitKey(1) == ord('q'):
                     break
             except KeyboardInterrupt:
                 break
 
+        print(sync.report())
         for recording in recordings:
-            recording.frame_q.put(None)
-            recording.process.join()
+            recording.stop()
 
 if __name__ == '__main__':
     run_record()
\ No newline at end of file
@@ -1,15 +1,66 @@
 from pathlib import Path
-from multiprocessing import Queue
-from threading import Thread
+import multiprocessing
+import signal
+import time
+import csv
 import depthai as dai
 from enum import Enum
 
+from ring_utils import FrameRing
+
 class EncodingQuality(Enum):
     BEST = 1
     HIGH = 2
     MEDIUM = 3
     LOW = 4
 
+class BagCompression(Enum):
+    NONE = 1
+    LZ4 = 2
+    BZ2 = 3
+
+
+def to_nanos(delta) -> int:
+    return (delta.days * 86400 + delta.seconds) * 1000000000 + delta.microseconds * 1000
+
+
+def run_writer(ring: FrameRing, path: Path, quality: EncodingQuality, sizes: dict,
+               compression: BagCompression, chunk_size: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    files = {}
+    timestamps_file = open(str(path / "timestamps.csv"), 'w', newline='')
+    timestamps = csv.writer(timestamps_file)
+    timestamps.writerow(("stream", "sequence", "timestamp_ns"))
+    def create_video_file(name):
+        if name == 'depth':
+            from rosbag_utils import DepthAiBags
+            files[name] = DepthAiBags(path, path / "calib.json", sizes, rgb='color' in sizes,
+                                      compression=compression.name.lower(), chunk_size=chunk_size)
+        else:
+            ext = 'h265' if quality == EncodingQuality.LOW else 'mjpeg'
+            files[name] = open(str(path / f"{name}.{ext}"), 'wb')
+
+    while True:
+        slot, frames, stamps = ring.get()
+        if frames is None:
+            break
+        for name in frames:
+            if name not in files:
+                create_video_file(name)
+
+            stamp, sequence = stamps[name]
+            if name == 'depth':
+                files[name].write(frames[name], stamp, sequence)
+            else:
+                files[name].write(frames[name])
+            timestamps.writerow((name, sequence, stamp))
+        ring.release(slot)
+    for name in files:
+        files[name].close()
+    timestamps_file.close()
+    if 'depth' in files:
+        print(files['depth'].report())
+
 
 class Record():
     def __init__(self, path: Path, device) -> None:
@@ -18,6 +69,8 @@ class Record():
         self.timelapse = -1
         self.device = device
         self.quality = EncodingQuality.HIGH
+        self.compression = BagCompression.NONE
+        self.chunk_size = 1 << 20
         self.rotate = -1
         self.preview = False
 
@@ -30,29 +83,19 @@ class Record():
 
         self.convert_mp4 = False
 
-    def run(self):
-        files = {}
-        def create_video_file(name):
-            if name == 'depth':
-                files[name] = self.depthAiBag
-            else:
-                ext = 'h265' if self.quality == EncodingQuality.LOW else 'mjpeg'
-                files[name] = open(str(self.path / f"{name}.{ext}"), 'wb')
+    def write(self, msgs: dict):
+        frames = {}
+        stamps = {}
+        for name, msg in msgs.items():
+            frames[name] = msg.getFrame() if name == 'depth' else msg.getData()
+            stamps[name] = (self.clock_offset + to_nanos(msg.getTimestamp()), msg.getSequenceNum())
+        return self.ring.put(frames, timeout=1 / self.fps, stamps=stamps)
 
-        while True:
-            try:
-                frames = self.frame_q.get()
-                if frames is None:
-                    break
-                for name in frames:
-                    if name not in files:
-                        create_video_file(name)
-
-                    files[name].write(frames[name])
-            except KeyboardInterrupt:
-                break
-        for name in files:
-            files[name].close()
+    def stop(self):
+        self.ring.close()
+        self.process.join()
+        print(f"{self.mxid} {self.ring.report()}")
+        self.ring.unlink()
 
     def start(self):
         if not self.stereo:
@@ -73,25 +116,21 @@ class Record():
 
         self.pipeline, self.nodes = self.create_pipeline()
 
-        if "depth" in self.save:
-            from rosbag_utils import DepthAiBags
-            res = ['depth']
-            if self.rotate in [0,2]:
-                res = (res[1], res[0])
-            self.depthAiBag = DepthAiBags(self.path, self.device, self.get_sizes(), rgb='color' in self.save)
-
-        self.frame_q = Queue(20)
-        self.process = Thread(target=self.run)
+        sizes = self.get_sizes()
+        context = multiprocessing.get_context('spawn')
+        self.ring = FrameRing(context, self.get_capacities(sizes))
+        self.process = context.Process(target=run_writer, args=(self.ring, self.path, self.quality, sizes,
+                                                                self.compression, self.chunk_size))
         self.process.start()
 
         self.device.startPipeline(self.pipeline)
+        self.clock_offset = time.time_ns() - to_nanos(dai.Clock.now())
 
         self.queues = []
         maxSize = 1 if 0 < self.timelapse else 10
         for stream in self.save:
             self.queues.append({
                 'q': self.device.getOutputQueue(name=stream, maxSize=maxSize, blocking=False),
-                'msgs': [],
                 'name': stream,
                 'mxid': self.mxid
             })
@@ -105,6 +144,12 @@ class Record():
     def set_quality(self, quality: EncodingQuality):
         self.quality = quality
 
+    def set_compression(self, compression: BagCompression):
+        self.compression = compression
+
+    def set_chunk_size(self, chunk_size: int):
+        self.chunk_size = chunk_size
+
     def set_preview(self, preview: bool):
         self.preview = preview
 
@@ -125,6 +170,20 @@ class Record():
             dict['depth'] = self.nodes['left'].getResolutionSize()
         return dict
 
+    def get_capacities(self, sizes):
+        capacities = {}
+        for name in self.save:
+            if name not in sizes:
+                continue
+            width, height = sizes[name]
+            if name == 'depth':
+                capacities[name] = width * height * 2
+            elif name == 'color':
+                capacities[name] = width * height * 3 // 2
+            else:
+                capacities[name] = width * height
+        return capacities
+
     def create_folder(self, path: Path, mxid: str):
         i = 0
         while True:
@@ -0,0 +1,86 @@
+from multiprocessing import shared_memory
+from queue import Empty
+import numpy as np
+
+class FrameRing():
+    def __init__(self, context, capacities: dict, slots: int = 20) -> None:
+        self.capacities = capacities
+        self.offsets = {}
+        self.slot_size = 0
+        for name, capacity in capacities.items():
+            self.offsets[name] = self.slot_size
+            self.slot_size += capacity
+        self.slots = slots
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, slots * self.slot_size))
+
+        self.free_q = context.Queue()
+        self.filled_q = context.Queue()
+        for slot in range(slots):
+            self.free_q.put(slot)
+
+        self.written = 0
+        self.backpressure = 0
+        self.overruns = 0
+        self.oversized = 0
+
+    def view(self, slot: int, name: str, nbytes: int):
+        return np.ndarray(nbytes, dtype=np.uint8, buffer=self.memory.buf,
+                          offset=slot * self.slot_size + self.offsets[name])
+
+    def acquire(self, timeout: float):
+        try:
+            return self.free_q.get_nowait()
+        except Empty:
+            self.backpressure += 1
+        try:
+            return self.free_q.get(timeout=timeout)
+        except Empty:
+            self.overruns += 1
+            return None
+
+    def put(self, frames: dict, timeout: float = 1., stamps: dict = None) -> bool:
+        slot = self.acquire(timeout)
+        if slot is None:
+            return False
+
+        meta = {}
+        for name, frame in frames.items():
+            frame = np.ascontiguousarray(frame)
+            if frame.nbytes > self.capacities.get(name, 0):
+                self.oversized += 1
+                meta[name] = frame
+                continue
+            self.view(slot, name, frame.nbytes)[:] = frame.reshape(-1).view(np.uint8)
+            meta[name] = (frame.dtype.str, frame.shape)
+        self.filled_q.put((slot, meta, stamps))
+        self.written += 1
+        return True
+
+    def get(self):
+        item = self.filled_q.get()
+        if item is None:
+            return None, None, None
+
+        slot, meta, stamps = item
+        frames = {}
+        for name, info in meta.items():
+            if isinstance(info, np.ndarray):
+                frames[name] = info
+                continue
+            dtype, shape = np.dtype(info[0]), info[1]
+            frames[name] = self.view(slot, name, dtype.itemsize * int(np.prod(shape))).view(dtype).reshape(shape)
+        return slot, frames, stamps
+
+    def release(self, slot: int):
+        self.free_q.put(slot)
+
+    def close(self):
+        self.filled_q.put(None)
+
+    def unlink(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def report(self):
+        return (f"ring: {self.written} sets written, {self.backpressure} waits for a free slot, "
+                f"{self.overruns} overruns, {self.oversized} oversized frames")
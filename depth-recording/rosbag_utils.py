@@ -10,13 +10,23 @@ from rosbags.typesys.types import std_msgs__msg__UInt32 as UInt32
 from rosbags.typesys.types import sensor_msgs__msg__Image as Image
 from rosbags.typesys.types import std_msgs__msg__Header as Header
 from rosbags.typesys import get_types_from_msg, register_types
+from lz4.frame import compress as lz4_compress
 
 from pathlib import Path
 import numpy as np
 import os
+import struct
 import time
 import depthai as dai
 
+class FastLz4Writer(Writer):
+    # rosbags compresses LZ4 chunks at level 16, about 12 MB/s, which falls behind
+    # the 18 MB/s of 640x480 depth at 30 FPS; the default fast level keeps up.
+    def set_compression(self, fmt):
+        super().set_compression(fmt)
+        if self.compression_format == 'lz4':
+            self.compressor = lz4_compress
+
 class DepthAiBags:
     def __enter__(self):
         return self
@@ -24,7 +34,7 @@ class DepthAiBags:
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.close()
 
-    def __init__(self, path: Path, device, resolutions, rgb=False, overwrite = False):
+    def __init__(self, path: Path, calib_path: Path, resolutions, rgb=False, overwrite = False, compression = 'none', chunk_size = 1 << 20):
         rgb=False
         if not str(path).endswith('.bag'):
             path = path / 'depth.bag'
@@ -36,7 +46,18 @@ class DepthAiBags:
                 raise Exception('Specified path already exists. Set argument overwrite=True to delete the bag at that path')
 
         self.start_nanos = 0
-        self.writer = Writer(path)
+        self.image_buffers = {}
+        self.timestamp_domains = {
+            False: self.serialize_keyvalue('timestamp_domain', 'System Time'),
+            True: self.serialize_keyvalue('timestamp_domain', 'Global Time'),
+        }
+        self.path = path
+        self.message_bytes = 0
+        self.write_seconds = 0.
+        self.writer = FastLz4Writer(path)
+        if compression != 'none':
+            self.writer.set_compression(Writer.CompressionFormat[compression.upper()])
+        self.writer.chunk_threshold = chunk_size
         self.closed = False
         self.writer.open()
 
@@ -62,7 +83,7 @@ class DepthAiBags:
         self.write_keyvalues('/device_0/sensor_0/property', {'Depth Units': '0.001000'})
         self.write_transform('/device_0/sensor_0/Depth_0/tf/0')
 
-        calibData = device.readCalibration()
+        calibData = dai.CalibrationHandler(str(calib_path))
         self.write_depthInfo('/device_0/sensor_0/Depth_0/info/camera_info', resolutions['depth'], calibData)
 
         if rgb:
@@ -76,9 +97,17 @@ class DepthAiBags:
 
     def close(self):
         if self.closed: return
+        start = time.perf_counter()
         self.writer.close()
+        self.write_seconds += time.perf_counter() - start
         self.closed = True
 
+    def report(self):
+        size = self.path.stat().st_size
+        return (f"{self.path.name}: {self.writer.compression_format} compression, "
+                f"{self.message_bytes / 1e6:.1f} MB of frames stored in {size / 1e6:.1f} MB "
+                f"({self.message_bytes / max(size, 1):.2f}x), {self.message_bytes / 1e6 / max(self.write_seconds, 1e-9):.1f} MB/s")
+
     def _write(self, connection, type, data):
         self.writer.write(connection, time.time_ns() - self.start_nanos, cdr_to_ros1(serialize_cdr(data, type), type))
 
@@ -149,37 +178,49 @@ class DepthAiBags:
                     roi=self.get_default_roi())
         self._write(c, type, info)
 
-    def write(self, frame):
-        if self.start_nanos == 0: self.start_nanos = time.time_ns()
+    def write(self, frame, stamp=None, sequence=0):
+        start = time.perf_counter()
+        arrival = time.time_ns()
+        device_time = stamp is not None
+        if not device_time: stamp = arrival
+        if self.start_nanos == 0: self.start_nanos = stamp
 
         rgb = len(frame.shape) == 3
-        if rgb:
-            frame = frame[:, :, [2, 1, 0]]
-        img = Image(header=self.get_current_header(),
-                height=frame.shape[0],
-                width=frame.shape[1],
-                encoding='rgb8' if rgb else 'mono16',
-                is_bigendian=0,
-                step=frame.shape[1]*2,
-                data=frame.flatten().view(dtype=np.int8))
-        type = Image.__msgtype__
-
-        self._write(self.rgb_conn if rgb else self.depth_conn, type, img)
-
-        self.write_keyvalues(self.rgb_meta_conn if rgb else self.depth_meta_conn, {
-            'system_time': "%.6f" % time.time(),
-            'timestamp_domain': 'System Time',
-            'Time Of Arrival': int(time.time())
-        }, connection=True)
+        buffer, pixels = self.get_image_buffer(frame.shape, frame.dtype, 'rgb8' if rgb else 'mono16')
+        struct.pack_into('<III', buffer, 0, sequence & 0xffffffff, *divmod(stamp, 1000000000))
+        np.copyto(pixels, frame[:, :, ::-1] if rgb else frame)
+
+        timestamp = stamp - self.start_nanos
+        self.writer.write(self.rgb_conn if rgb else self.depth_conn, timestamp, buffer)
+
+        meta_conn = self.rgb_meta_conn if rgb else self.depth_meta_conn
+        self.writer.write(meta_conn, timestamp, self.serialize_keyvalue('system_time', "%.6f" % (stamp / 1e9)))
+        self.writer.write(meta_conn, timestamp, self.timestamp_domains[device_time])
+        self.writer.write(meta_conn, timestamp, self.serialize_keyvalue('Time Of Arrival', str(arrival // 1000000000)))
+        self.message_bytes += len(buffer)
+        self.write_seconds += time.perf_counter() - start
+
+    def get_image_buffer(self, shape, dtype, encoding):
+        key = (shape, dtype, encoding)
+        if key not in self.image_buffers:
+            height, width = shape[:2]
+            step = width * int(np.prod(shape[2:])) * dtype.itemsize
+            header = struct.pack('<IIII', 0, 0, 0, 1) + b'0'
+            prefix = header + struct.pack('<III', height, width, len(encoding)) + encoding.encode() \
+                + struct.pack('<BII', 0, step, height * step)
+            buffer = bytearray(len(prefix) + height * step)
+            buffer[:len(prefix)] = prefix
+            pixels = np.frombuffer(buffer, dtype=dtype, offset=len(prefix)).reshape(shape)
+            self.image_buffers[key] = (buffer, pixels)
+        return self.image_buffers[key]
+
+    def serialize_keyvalue(self, key, value):
+        key, value = key.encode(), value.encode()
+        return struct.pack('<I', len(key)) + key + struct.pack('<I', len(value)) + value
 
     def get__default_header(self):
         t = Time(sec=0, nanosec=0)
         return Header(stamp=t, frame_id='0')
 
-    def get_current_header(self):
-        t_str_arr = ("%.9f" % time.time()).split('.')
-        t = Time(sec=int(t_str_arr[0]), nanosec=int(t_str_arr[1]))
-        return Header(stamp=t, frame_id='0')
-
     def get_default_roi(self):
         return Roi(x_offset=0, y_offset=0, height=0, width=0, do_rectify=False)
\ No newline at end of file
@@ -0,0 +1,90 @@
+from collections import deque
+from threading import Condition
+
+# Unlike PacketReader, which keeps only the newest packet per stream, every
+# arrival is kept in order so StreamSynchronizer can pair frames by timestamp.
+# Past max_size the oldest arrival moves to the overflow, which wait() hands
+# back so it can be counted as dropped.
+class QueueEvents():
+    def __init__(self, max_size: int = None) -> None:
+        self.condition = Condition()
+        self.max_size = max_size
+        self.arrivals = deque()
+        self.overflow = []
+
+    def attach(self, stream: dict):
+        stream['q'].addCallback(lambda name, msg: self.put(stream, msg))
+
+    def put(self, stream: dict, msg):
+        with self.condition:
+            if len(self.arrivals) == self.max_size:
+                self.overflow.append(self.arrivals.popleft())
+            self.arrivals.append((stream, msg))
+            self.condition.notify_all()
+
+    def wait(self, timeout: float = None):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.arrivals) > 0, timeout)
+            arrivals = list(self.arrivals)
+            self.arrivals.clear()
+            overflow, self.overflow = self.overflow, []
+        return arrivals, overflow
+
+class StreamSynchronizer():
+    def __init__(self, streams, tolerance: float, max_backlog: int = 10) -> None:
+        self.tolerance = tolerance
+        self.max_backlog = max_backlog
+        self.backlogs = {stream: deque() for stream in streams}
+        self.last_sequence = dict.fromkeys(self.backlogs)
+        self.empty = len(self.backlogs)
+        self.matched = 0
+        self.dropped = dict.fromkeys(self.backlogs, 0)
+        self.missed = dict.fromkeys(self.backlogs, 0)
+
+    def track(self, stream, msg):
+        sequence = msg.getSequenceNum()
+        last = self.last_sequence[stream]
+        if last is not None and sequence > last + 1:
+            self.missed[stream] += sequence - last - 1
+        self.last_sequence[stream] = sequence
+
+    def drop(self, stream, msg):
+        self.track(stream, msg)
+        self.dropped[stream] += 1
+
+    def add(self, stream, msg):
+        self.track(stream, msg)
+        backlog = self.backlogs[stream]
+        if len(backlog) == self.max_backlog:
+            backlog.popleft()
+            self.dropped[stream] += 1
+        elif len(backlog) == 0:
+            self.empty -= 1
+        backlog.append((msg.getTimestamp().total_seconds(), msg))
+        return self.match()
+
+    def match(self):
+        while self.empty == 0:
+            newest = max(backlog[0][0] for backlog in self.backlogs.values())
+            stale = False
+            for stream, backlog in self.backlogs.items():
+                if backlog[0][0] < newest - self.tolerance:
+                    self.pop(stream)
+                    self.dropped[stream] += 1
+                    stale = True
+            if not stale:
+                self.matched += 1
+                return {stream: self.pop(stream) for stream in self.backlogs}
+        return None
+
+    def pop(self, stream):
+        backlog = self.backlogs[stream]
+        msg = backlog.popleft()[1]
+        if len(backlog) == 0:
+            self.empty += 1
+        return msg
+
+    def report(self):
+        dropped = sum(self.dropped.values())
+        missed = sum(self.missed.values())
+        return f"synced {self.matched} sets, dropped {dropped} on host, missed {missed} on device"
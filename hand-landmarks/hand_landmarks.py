@@ -1,6 +1,7 @@
 import numpy as np
 import collections
 import mediapipe_utils as mpu
+import nn_utils as nnu
 import depthai as dai
 import cv2
 from pathlib import Path
@@ -9,16 +10,13 @@ import argparse
 import uuid
 from datetime import datetime
 
-def to_planar(arr: np.ndarray, shape: tuple) -> np.ndarray:
-    resized = cv2.resize(arr, shape, interpolation=cv2.INTER_NEAREST).transpose(2,0,1)
-    return resized
-
 class HandLandmarks:
     def __init__(
         self,
         pd_path="models/palm_detection.blob", 
         pd_score_threshold=0.5,
         pd_nms_threshold=0.3,
+        pd_request_depth=2,
         hl_path="models/hand_landmarks.blob",
         hl_score_threshold=0.4,
         show_landmarks=True,
@@ -27,27 +25,16 @@ class HandLandmarks:
         self.pd_path = pd_path
         self.pd_score_threshold = pd_score_threshold
         self.pd_nms_threshold = pd_nms_threshold
+        self.pd_request_depth = pd_request_depth
         self.hl_path = hl_path
         self.hl_score_threshold = hl_score_threshold
         self.show_landmarks=show_landmarks
         self.show_hand_box = show_hand_box
 
-        anchor_options = mpu.SSDAnchorOptions(
-            num_layers=4, 
-            min_scale=0.1484375,
-            max_scale=0.75,
-            input_size_height=128,
-            input_size_width=128,
-            anchor_offset_x=0.5,
-            anchor_offset_y=0.5,
-            strides=[8, 16, 16, 16],
-            aspect_ratios= [1.0],
-            reduce_boxes_in_lowest_layer=False,
-            interpolated_scale_aspect_ratio=1.0,
-            fixed_anchor_size=True)
-
-        self.anchors = mpu.generate_anchors(anchor_options)
+        self.anchors = mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)
         self.nb_anchors = self.anchors.shape[0]
+        self.pd_layers = nnu.LayerReader({"regressors": (self.nb_anchors, 18)})
+        self.hl_layers = nnu.LayerReader()
 
         self.preview_width = 1920
         self.preview_height = 1080
@@ -68,6 +55,7 @@ class HandLandmarks:
         pipeline = dai.Pipeline()
         pipeline.setOpenVINOVersion(version=dai.OpenVINO.Version.VERSION_2021_2)
         self.pd_input_length = 128
+        self.pd_planar = nnu.PlanarResizer(self.pd_input_length)
 
         cam = pipeline.createColorCamera()
         cam.setPreviewSize(self.preview_width, self.preview_height)
@@ -89,6 +77,7 @@ class HandLandmarks:
         hl_nn = pipeline.createNeuralNetwork()
         hl_nn.setBlobPath(str(Path(self.hl_path).resolve().absolute()))
         self.hl_input_length = 224
+        self.hl_planar = nnu.PlanarResizer(self.hl_input_length)
         hl_in = pipeline.createXLinkIn()
         hl_in.setStreamName("hl_in")
         hl_in.out.link(hl_nn.input)
@@ -99,19 +88,22 @@ class HandLandmarks:
         return pipeline
 
     def pd_postprocess(self, inference):
-        scores = np.array(inference.getLayerFp16("classificators"), dtype=np.float16) 
-        bboxes = np.array(inference.getLayerFp16("regressors"), dtype=np.float16).reshape((self.nb_anchors,18)) 
-        
-        self.regions = mpu.decode_bboxes(self.pd_score_threshold, scores, bboxes, self.anchors)
+        layers = self.pd_layers.read(inference)
+        scores = layers["classificators"]
+        bboxes = layers["regressors"]
         
-        self.regions = mpu.non_max_suppression(self.regions, self.pd_nms_threshold)
-        mpu.detections_to_rect(self.regions)
-        mpu.rect_transformation(self.regions, self.frame_size, self.frame_size)
+        palms = mpu.decode_palm_regions(self.pd_score_threshold, scores, bboxes, self.anchors)
+        palms = mpu.palm_regions_nms(palms, self.pd_nms_threshold)
+
+        mpu.palm_regions_to_rect(palms)
+        mpu.palm_regions_transformation(palms, self.frame_size, self.frame_size)
+        self.regions = palms.to_regions()
 
     def hl_postprocess(self, region, inference):
-        region.hl_score = inference.getLayerFp16("Identity_1")[0]    
-        region.handedness = inference.getLayerFp16("Identity_2")[0]
-        hl_raw = np.array(inference.getLayerFp16("Squeeze"))
+        layers = self.hl_layers.read(inference)
+        region.hl_score = float(layers["Identity_1"][0])
+        region.handedness = float(layers["Identity_2"][0])
+        hl_raw = layers["Squeeze"].astype(np.float64)
         
         hl = []
         for i in range(int(len(hl_raw)/3)):
@@ -218,6 +210,9 @@ class HandLandmarks:
         q_hl_in = device.getInputQueue(name="hl_in")
         q_hl_out = device.getOutputQueue(name="hl_out", maxSize=4, blocking=True)
 
+        pd_window = nnu.InferenceWindow(q_pd_in, q_pd_out, self.pd_request_depth)
+        hl_window = nnu.InferenceWindow(q_hl_in, q_hl_out)
+
         while True:
             in_video = q_video_out.get()
             video_frame = in_video.getCvFrame()
@@ -232,46 +227,44 @@ class HandLandmarks:
             frame_nn = dai.ImgFrame()
             frame_nn.setWidth(self.pd_input_length)
             frame_nn.setHeight(self.pd_input_length)
-            frame_nn.setData(to_planar(video_frame, (self.pd_input_length, self.pd_input_length)))
-            q_pd_in.send(frame_nn)
+            frame_nn.setData(self.pd_planar.resize(video_frame))
+            pd_window.send(frame_nn, (video_frame, h, w))
 
-            original_frame = video_frame.copy()
-            
-            inference = q_pd_out.get()
-            self.pd_postprocess(inference)
-
-            for i,r in enumerate(self.regions):
-                img_hand = mpu.warp_rect_img(r.rect_points, video_frame, self.hl_input_length, self.hl_input_length)
-                nn_data = dai.NNData()   
-                nn_data.setLayer("input_1", to_planar(img_hand, (self.hl_input_length, self.hl_input_length)))
-                q_hl_in.send(nn_data)
-            
-            handedness = 0
-            palm_bbox = []
-
-            for i,r in enumerate(self.regions):
-                inference = q_hl_out.get()
-                self.hl_postprocess(r, inference)
-                hand_frame, handedness, hand_bbox, palm_bbox, palmar_text = self.hl_render(video_frame, original_frame, r)
+            for (video_frame, h, w), inference in pd_window.results():
+                original_frame = video_frame.copy()
+                self.pd_postprocess(inference)
 
-            training_dataset = False
-
-            if training_dataset and len(palm_bbox) == 4:
-                random_uuid = uuid.uuid4()
-                date_string = (datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
                 for i,r in enumerate(self.regions):
-                    # hand_image = mpu.warp_rect_img(r.rect_points, original_frame, 416, 416)
-                    y_percentage = int((palm_bbox[3]-palm_bbox[1])*0.125)
-                    x_percentage = int((palm_bbox[2]-palm_bbox[0])*0.125)
-                    hand_image = original_frame[palm_bbox[1]-(2*y_percentage):palm_bbox[3], palm_bbox[0]-x_percentage:palm_bbox[2]+x_percentage]
-                    if hand_image is not None:
-                        cv2.imshow("Dataset Image", hand_image)
-                        # image_name = 'dataset/' + str(random_uuid) + '_' + str(i) + '.jpg'
-                        image_name = 'dataset/' + date_string + '_' + str(i) + '.png'
-                        cv2.imwrite(image_name, hand_image)
-
-            video_frame = video_frame[self.pad_h:self.pad_h+h, self.pad_w:self.pad_w+w]
-            cv2.imshow("Hand Landmarks", video_frame)
+                    img_hand = mpu.warp_rect_img(r.rect_points, video_frame, self.hl_input_length, self.hl_input_length)
+                    nn_data = dai.NNData()   
+                    nn_data.setLayer("input_1", self.hl_planar.resize(img_hand))
+                    hl_window.send(nn_data, r)
+                
+                handedness = 0
+                palm_bbox = []
+
+                for r, inference in hl_window.drain():
+                    self.hl_postprocess(r, inference)
+                    hand_frame, handedness, hand_bbox, palm_bbox, palmar_text = self.hl_render(video_frame, original_frame, r)
+
+                training_dataset = False
+
+                if training_dataset and len(palm_bbox) == 4:
+                    random_uuid = uuid.uuid4()
+                    date_string = (datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+                    for i,r in enumerate(self.regions):
+                        # hand_image = mpu.warp_rect_img(r.rect_points, original_frame, 416, 416)
+                        y_percentage = int((palm_bbox[3]-palm_bbox[1])*0.125)
+                        x_percentage = int((palm_bbox[2]-palm_bbox[0])*0.125)
+                        hand_image = original_frame[palm_bbox[1]-(2*y_percentage):palm_bbox[3], palm_bbox[0]-x_percentage:palm_bbox[2]+x_percentage]
+                        if hand_image is not None:
+                            cv2.imshow("Dataset Image", hand_image)
+                            # image_name = 'dataset/' + str(random_uuid) + '_' + str(i) + '.jpg'
+                            image_name = 'dataset/' + date_string + '_' + str(i) + '.png'
+                            cv2.imwrite(image_name, hand_image)
+
+                video_frame = video_frame[self.pad_h:self.pad_h+h, self.pad_w:self.pad_w+w]
+                cv2.imshow("Hand Landmarks", video_frame)
 
             key = cv2.waitKey(1) 
             if key == ord('q') or key == 27:
@@ -283,7 +276,9 @@ if __name__ == "__main__":
                         help="Path to a blob file for palm detection model (default=%(default)s)")
     parser.add_argument("--hl_m", default="models/hand_landmarks.blob", type=str,
                         help="Path to a blob file for hand landmarks model (default=%(default)s)")
+    parser.add_argument("--pd_depth", default=2, type=int,
+                        help="Number of palm detection requests kept in flight (default=%(default)s)")
     args = parser.parse_args()
 
-    hand_landmarks = HandLandmarks(pd_path=args.pd_m, hl_path=args.hl_m)
+    hand_landmarks = HandLandmarks(pd_path=args.pd_m, pd_request_depth=args.pd_depth, hl_path=args.hl_m)
     hand_landmarks.run()
\ No newline at end of file
@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
 from collections import namedtuple
-from math import ceil, sqrt, pi, floor, sin, cos, atan2
+from math import ceil, sqrt, pi, floor, sin, cos
 import warnings
 
 warnings.filterwarnings('ignore')
@@ -73,48 +73,44 @@ def generate_anchors(options):
         feature_map_height = ceil(options.input_size_height / stride)
         feature_map_width = ceil(options.input_size_width / stride)
 
-        for y in range(feature_map_height):
-            for x in range(feature_map_width):
-                for anchor_id in range(len(anchor_height)):
-                    x_center = (x + options.anchor_offset_x) / feature_map_width
-                    y_center = (y + options.anchor_offset_y) / feature_map_height
-                    if options.fixed_anchor_size:
-                        new_anchor = [x_center, y_center, 1.0, 1.0]
-                    else:
-                        new_anchor = [x_center, y_center, anchor_width[anchor_id], anchor_height[anchor_id]]
-                    anchors.append(new_anchor)
+        y, x = np.mgrid[0:feature_map_height, 0:feature_map_width]
+        layer_anchors = np.empty((feature_map_height * feature_map_width, len(anchor_height), 4))
+        layer_anchors[..., 0] = ((x + options.anchor_offset_x) / feature_map_width).reshape(-1, 1)
+        layer_anchors[..., 1] = ((y + options.anchor_offset_y) / feature_map_height).reshape(-1, 1)
+        if options.fixed_anchor_size:
+            layer_anchors[..., 2:4] = 1.0
+        else:
+            layer_anchors[..., 2] = anchor_width
+            layer_anchors[..., 3] = anchor_height
+        anchors.append(layer_anchors.reshape(-1, 4))
 
         layer_id = last_same_stride_layer
-    return np.array(anchors)
+    return np.concatenate(anchors)
 
-def decode_bboxes(score_thresh, scores, bboxes, anchors):
-    regions = []
-    scores = 1 / (1 + np.exp(-scores))
-    detection_mask = scores > score_thresh
-    det_scores = scores[detection_mask]
-    if det_scores.size == 0: return regions
-    det_bboxes = bboxes[detection_mask]
-    det_anchors = anchors[detection_mask]
-    scale = 128
+_anchors_cache = {}
+
+def get_anchors(options):
+    key = tuple(tuple(value) if isinstance(value, list) else value for value in options)
+    anchors = _anchors_cache.get(key)
+    if anchors is None:
+        anchors = generate_anchors(options)
+        anchors.flags.writeable = False
+        _anchors_cache[key] = anchors
+    return anchors
 
-    det_bboxes = det_bboxes* np.tile(det_anchors[:,2:4], 9) / scale + np.tile(det_anchors[:,0:2],9)
-    det_bboxes[:,2:4] = det_bboxes[:,2:4] - det_anchors[:,0:2]
-    det_bboxes[:,0:2] = det_bboxes[:,0:2] - det_bboxes[:,3:4] * 0.5
-
-    for i in range(det_bboxes.shape[0]):
-        score = det_scores[i]
-        box = det_bboxes[i,0:4]
-        kps = []
-        for kp in range(7):
-            kps.append(det_bboxes[i,4+kp*2:6+kp*2])
-        regions.append(HandRegion(float(score), box, kps))
-    return regions
-
-def non_max_suppression(regions, nms_thresh):
-    boxes = [ [int(x*1000) for x in r.pd_box] for r in regions]
-    scores = [r.pd_score for r in regions]
-    indices = cv2.dnn.NMSBoxes(boxes, scores, 0, nms_thresh)
-    return [regions[i] for i in indices]
+PALM_ANCHOR_OPTIONS = SSDAnchorOptions(
+    num_layers=4,
+    min_scale=0.1484375,
+    max_scale=0.75,
+    input_size_height=128,
+    input_size_width=128,
+    anchor_offset_x=0.5,
+    anchor_offset_y=0.5,
+    strides=[8, 16, 16, 16],
+    aspect_ratios=[1.0],
+    reduce_boxes_in_lowest_layer=False,
+    interpolated_scale_aspect_ratio=1.0,
+    fixed_anchor_size=True)
 
 def normalize_radians(angle):
     return angle - 2 * pi * floor((angle + pi) / (2 * pi))
@@ -123,19 +119,6 @@ def rot_vec(vec, rotation):
     vx, vy = vec
     return [vx * cos(rotation) - vy * sin(rotation), vx * sin(rotation) + vy * cos(rotation)]
 
-def detections_to_rect(regions):
-    target_angle = pi * 0.5
-    for region in regions:
-        region.rect_w = region.pd_box[2]
-        region.rect_h = region.pd_box[3]
-        region.rect_x_center = region.pd_box[0] + region.rect_w / 2
-        region.rect_y_center = region.pd_box[1] + region.rect_h / 2
-
-        x0, y0 = region.pd_kps[0]
-        x1, y1 = region.pd_kps[2]
-        rotation = target_angle - atan2(-(y1 - y0), x1 - x0)
-        region.rotation = normalize_radians(rotation)
-
 def rotated_rect_to_points(cx, cy, w, h, rotation, wi, hi):
     b = cos(rotation) * 0.5
     a = sin(rotation) * 0.5
@@ -151,28 +134,120 @@ def rotated_rect_to_points(cx, cy, w, h, rotation, wi, hi):
     p0x, p0y, p1x, p1y = int(p0x), int(p0y), int(p1x), int(p1y)
     return [(p0x,p0y), (p1x,p1y), (p2x,p2y), (p3x,p3y)]
 
-def rect_transformation(regions, w, h):
+class HandRegions:
+    def __init__(self, scores, boxes, kps):
+        self.scores = scores
+        self.boxes = boxes
+        self.kps = kps
+        self.rotations = None
+        self.rect_points = None
+
+    def __len__(self):
+        return self.scores.shape[0]
+
+    def select(self, indices):
+        return HandRegions(self.scores[indices], self.boxes[indices], self.kps[indices])
+
+    def to_regions(self):
+        regions = []
+        for i in range(len(self)):
+            region = HandRegion(float(self.scores[i]), self.boxes[i], list(self.kps[i]))
+            if self.rotations is not None:
+                region.rect_w, region.rect_h = self.rect_sizes[i]
+                region.rect_x_center, region.rect_y_center = self.rect_centers[i]
+                region.rotation = float(self.rotations[i])
+            if self.rect_points is not None:
+                region.rect_x_center_a, region.rect_y_center_a = self.rect_centers_a[i]
+                region.rect_w_a, region.rect_h_a = self.rect_sizes_a[i]
+                region.rect_points = [tuple(point) for point in self.rect_points[i].tolist()]
+            regions.append(region)
+        return regions
+
+def decode_palm_regions(score_thresh, scores, bboxes, anchors):
+    scores = 1 / (1 + np.exp(-scores))
+    detection_mask = scores > score_thresh
+    det_scores = scores[detection_mask]
+    det_bboxes = bboxes[detection_mask]
+    det_anchors = anchors[detection_mask]
+    scale = 128
+
+    det_bboxes = det_bboxes.reshape(-1, 9, 2) * det_anchors[:, np.newaxis, 2:4] / scale + det_anchors[:, np.newaxis, 0:2]
+    boxes = det_bboxes[:, 0:2].reshape(-1, 4)
+    boxes[:, 2:4] = boxes[:, 2:4] - det_anchors[:, 0:2]
+    boxes[:, 0:2] = boxes[:, 0:2] - boxes[:, 3:4] * 0.5
+    return HandRegions(det_scores, boxes, det_bboxes[:, 2:])
+
+def palm_regions_nms(palms, nms_thresh, weighted=False):
+    if len(palms) == 0: return palms
+    order = np.argsort(-palms.scores, kind='stable')
+    palms = palms.select(order)
+
+    x1 = palms.boxes[:, 0]
+    y1 = palms.boxes[:, 1]
+    x2 = x1 + palms.boxes[:, 2]
+    y2 = y1 + palms.boxes[:, 3]
+    areas = palms.boxes[:, 2] * palms.boxes[:, 3]
+    inter_w = np.maximum(0, np.minimum(x2[:, np.newaxis], x2) - np.maximum(x1[:, np.newaxis], x1))
+    inter_h = np.maximum(0, np.minimum(y2[:, np.newaxis], y2) - np.maximum(y1[:, np.newaxis], y1))
+    inter = inter_w * inter_h
+    overlaps = inter / (areas[:, np.newaxis] + areas - inter) > nms_thresh
+
+    keep = []
+    clusters = []
+    available = np.ones(len(palms), dtype=bool)
+    while available.any():
+        i = available.argmax()
+        cluster = overlaps[i] & available
+        cluster[i] = True
+        available &= ~cluster
+        keep.append(i)
+        clusters.append(cluster)
+
+    kept = palms.select(keep)
+    if weighted:
+        weights = np.where(clusters, palms.scores.astype(np.float64), 0)
+        weights /= weights.sum(axis=1, keepdims=True)
+        kept.boxes = weights @ palms.boxes
+        kept.kps = np.einsum('kn,nij->kij', weights, palms.kps)
+    return kept
+
+def palm_regions_to_rect(palms):
+    target_angle = pi * 0.5
+    palms.rect_sizes = palms.boxes[:, 2:4]
+    palms.rect_centers = palms.boxes[:, 0:2] + palms.rect_sizes / 2
+
+    delta = palms.kps[:, 2] - palms.kps[:, 0]
+    rotations = target_angle - np.arctan2(-delta[:, 1], delta[:, 0])
+    palms.rotations = rotations - 2 * pi * np.floor((rotations + pi) / (2 * pi))
+
+def palm_regions_transformation(palms, w, h):
     scale_x = 2.6
     scale_y = 2.6
     shift_x = 0
     shift_y = -0.5
-    for region in regions:
-        width = region.rect_w
-        height = region.rect_h
-        rotation = region.rotation
-        if rotation == 0:
-            region.rect_x_center_a = (region.rect_x_center + width * shift_x) * w
-            region.rect_y_center_a = (region.rect_y_center + height * shift_y) * h
-        else:
-            x_shift = (w * width * shift_x * cos(rotation) - h * height * shift_y * sin(rotation))
-            y_shift = (w * width * shift_x * sin(rotation) + h * height * shift_y * cos(rotation))
-            region.rect_x_center_a = region.rect_x_center*w + x_shift
-            region.rect_y_center_a = region.rect_y_center*h + y_shift
-
-        long_side = max(width * w, height * h)
-        region.rect_w_a = long_side * scale_x
-        region.rect_h_a = long_side * scale_y
-        region.rect_points = rotated_rect_to_points(region.rect_x_center_a, region.rect_y_center_a, region.rect_w_a, region.rect_h_a, region.rotation, w, h)
+    width = palms.rect_sizes[:, 0]
+    height = palms.rect_sizes[:, 1]
+    cos_r = np.cos(palms.rotations)
+    sin_r = np.sin(palms.rotations)
+
+    palms.rect_centers_a = palms.rect_centers * (w, h)
+    palms.rect_centers_a[:, 0] += w * width * shift_x * cos_r - h * height * shift_y * sin_r
+    palms.rect_centers_a[:, 1] += w * width * shift_x * sin_r + h * height * shift_y * cos_r
+
+    long_side = np.maximum(width * w, height * h)
+    palms.rect_sizes_a = long_side[:, np.newaxis] * (scale_x, scale_y)
+
+    b = cos_r * 0.5
+    a = sin_r * 0.5
+    cx, cy = palms.rect_centers_a.T
+    rw, rh = palms.rect_sizes_a.T
+    points = np.empty((len(palms), 4, 2))
+    points[:, 0, 0] = cx - a*rh - b*rw
+    points[:, 0, 1] = cy + b*rh - a*rw
+    points[:, 1, 0] = cx + a*rh - b*rw
+    points[:, 1, 1] = cy - b*rh - a*rw
+    points[:, 2:4] = 2 * palms.rect_centers_a[:, np.newaxis] - points[:, 0:2]
+    palms.rect_points = points.astype(np.int64)
 
 def warp_rect_img(rect_points, img, w, h):
         src = np.array(rect_points[1:], dtype=np.float32)
@@ -1,5 +1,6 @@
 import cv2
 import depthai as dai
+from packet_utils import PacketReader
 
 picking_device_id = '1844301041F08B1200'
 assembly_device_id = '1844301051CC711200'
@@ -85,49 +86,57 @@ for device_info in devices:
         assembly_device = dai.Device(openvino_version, device_info, usb2_mode)
         assembly_device.startPipeline(assembly_pipeline)
 
-picking_queue_depth = picking_device.getOutputQueue(name="depth", maxSize=4, blocking=False)
+picking_queue_depth = picking_device.getOutputQueue(name="depth", maxSize=1, blocking=False)
 picking_queue_color = picking_device.getOutputQueue(name="color", maxSize=1, blocking=False)
 
-assembly_queue_depth = assembly_device.getOutputQueue(name="depth", maxSize=4, blocking=False)
+assembly_queue_depth = assembly_device.getOutputQueue(name="depth", maxSize=1, blocking=False)
 assembly_queue_color = assembly_device.getOutputQueue(name="color", maxSize=1, blocking=False)
 
+latest_packets = PacketReader()
+latest_packets.attach(picking_queue_depth, "picking_depth")
+latest_packets.attach(picking_queue_color, "picking_color")
+latest_packets.attach(assembly_queue_depth, "assembly_depth")
+latest_packets.attach(assembly_queue_color, "assembly_color")
+
 while True:
-    picking_depth_input = picking_queue_depth.get()
-    picking_depth_frame = picking_depth_input.getFrame()
-    
-    picking_depth_crop = picking_depth_frame[0:390, 25:545]
-    picking_depth_color = cv2.normalize(picking_depth_crop, None, 255, 0, cv2.NORM_INF, cv2.CV_8UC1)
-    picking_depth_color[picking_depth_color<128] = 0
-    picking_depth_color = cv2.equalizeHist(picking_depth_color)
-    picking_depth_color = cv2.applyColorMap(picking_depth_color, cv2.COLORMAP_JET)
+    packets = latest_packets.wait(timeout=0.1)
+
+    if packets["picking_depth"] is not None:
+        picking_depth_frame = packets["picking_depth"].getFrame()
+
+        picking_depth_crop = picking_depth_frame[0:390, 25:545]
+        picking_depth_color = cv2.normalize(picking_depth_crop, None, 255, 0, cv2.NORM_INF, cv2.CV_8UC1)
+        picking_depth_color[picking_depth_color<128] = 0
+        picking_depth_color = cv2.equalizeHist(picking_depth_color)
+        picking_depth_color = cv2.applyColorMap(picking_depth_color, cv2.COLORMAP_JET)
 
-    picking_color_input = picking_queue_color.get()
-    picking_color_frame = picking_color_input.getCvFrame()
+        cv2.imshow("Picking Depth", picking_depth_color)
 
-    picking_color_crop = picking_color_frame[0:390, 65:585]
+    if packets["picking_color"] is not None:
+        picking_color_frame = packets["picking_color"].getCvFrame()
 
-    cv2.imshow("Picking Depth", picking_depth_color)
+        picking_color_crop = picking_color_frame[0:390, 65:585]
 
-    cv2.imshow("Picking Color", picking_color_crop)
+        cv2.imshow("Picking Color", picking_color_crop)
 
-    assembly_color_input = assembly_queue_color.get()
-    assembly_color_frame = assembly_color_input.getCvFrame()
+    if packets["assembly_color"] is not None:
+        assembly_color_frame = packets["assembly_color"].getCvFrame()
 
-    assembly_color_resized = cv2.resize(assembly_color_frame, (520, 390), cv2.INTER_AREA)
+        assembly_color_resized = cv2.resize(assembly_color_frame, (520, 390), cv2.INTER_AREA)
 
-    assembly_depth_input = assembly_queue_depth.get()
-    assembly_depth_frame = assembly_depth_input.getFrame()
+        cv2.imshow("Assembly Color", assembly_color_resized)
 
-    assembly_depth_crop = assembly_depth_frame[0:390, 30:550]
-    assembly_depth_color = cv2.normalize(assembly_depth_crop, None, 255, 0, cv2.NORM_INF, cv2.CV_8UC1)
-    assembly_depth_color[assembly_depth_color<128] = 0
-    assembly_depth_color = cv2.equalizeHist(assembly_depth_color)
-    assembly_depth_color = cv2.applyColorMap(assembly_depth_color, cv2.COLORMAP_JET)
+    if packets["assembly_depth"] is not None:
+        assembly_depth_frame = packets["assembly_depth"].getFrame()
 
-    cv2.imshow("Assembly Depth", assembly_depth_color)
+        assembly_depth_crop = assembly_depth_frame[0:390, 30:550]
+        assembly_depth_color = cv2.normalize(assembly_depth_crop, None, 255, 0, cv2.NORM_INF, cv2.CV_8UC1)
+        assembly_depth_color[assembly_depth_color<128] = 0
+        assembly_depth_color = cv2.equalizeHist(assembly_depth_color)
+        assembly_depth_color = cv2.applyColorMap(assembly_depth_color, cv2.COLORMAP_JET)
 
-    cv2.imshow("Assembly Color", assembly_color_resized)
+        cv2.imshow("Assembly Depth", assembly_depth_color)
 
     if cv2.waitKey(1) == ord('q'):
         cv2.destroyAllWindows()
-        break
\ No newline at end of file
+        break
@@ -5,6 +5,8 @@ import threading
 import numpy as np
 import depthai as dai
 import mediapipe_utils as mpu
+import nn_utils as nnu
+from depth_utils import DepthStatistics, DisparityColorizer
 from json import JSONEncoder
 from tkinter import *
 from tkinter import messagebox
@@ -111,6 +113,22 @@ def DisableWidget(widget):
 def EnableWidget(widget):
     widget['state'] = NORMAL
 
+class DisplaySurface:
+    def __init__(self, label):
+        self.Label = label
+        self.ImageTk = None
+
+    def Show(self, image):
+        h, w = image.shape[:2]
+        mode = 'RGB' if image.ndim == 3 else 'L'
+        if self.ImageTk is None or (self.ImageTk.width(), self.ImageTk.height()) != (w, h):
+            self.ImageTk = ImageTk.PhotoImage('RGB', (w, h))
+            self.Label.configure(image=self.ImageTk)
+            self.Label.image_tk = self.ImageTk
+        rawmode = 'BGR' if mode == 'RGB' else 'L'
+        image_pil = Image.frombuffer(mode, (w, h), np.ascontiguousarray(image), 'raw', rawmode, 0, 1)
+        self.ImageTk.paste(image_pil)
+
 class Window():
     def __init__(self):
         self.Root = Tk()
@@ -365,9 +383,12 @@ class DepthCalculation:
         self.PalmInputLength = 128
         self.PalmScoreThreshold = 0.6
         self.PalmNmsThreshold = 0.3
+        self.PalmPlanar = nnu.PlanarResizer(self.PalmInputLength)
+        self.PalmLayers = nnu.LayerReader({"regressors": (len(mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)), 18)})
 
         self.StreamingLabel = Label(self.VideoFrame, borderwidth=0, bg='white')
         self.StreamingLabel.place( w=640, h=360, x=0, y=80)
+        self.StreamingSurface = DisplaySurface(self.StreamingLabel)
 
     def CreatePipeline(self):
         pipeline = dai.Pipeline()
@@ -409,6 +430,7 @@ class DepthCalculation:
         stereo_depth.setDepthAlign(dai.CameraBoardSocket.RGB)
         
         self.MaxDisparity = stereo_depth.initialConfig.getMaxDisparity()
+        self.DepthColorizer = DisparityColorizer(self.MaxDisparity, threshold=0)
 
         cam_color.isp.link(color_out.input)
         cam_left.out.link(stereo_depth.left)
@@ -426,37 +448,19 @@ class DepthCalculation:
 
         return pipeline
     
-    def ToPlanar(self, array, shape):
-        resized = cv2.resize(array, shape, interpolation=cv2.INTER_NEAREST).transpose(2,0,1)
-        return resized
-
     def PalmPostprocess(self, inference):
-        anchor_options = mpu.SSDAnchorOptions(
-            num_layers=4, 
-            min_scale=0.1484375,
-            max_scale=0.75,
-            input_size_height=128,
-            input_size_width=128,
-            anchor_offset_x=0.5,
-            anchor_offset_y=0.5,
-            strides=[8, 16, 16, 16],
-            aspect_ratios= [1.0],
-            reduce_boxes_in_lowest_layer=False,
-            interpolated_scale_aspect_ratio=1.0,
-            fixed_anchor_size=True)
-
-        anchors = mpu.generate_anchors(anchor_options)
-        
-        nb_anchors = anchors.shape[0]
+        anchors = mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)
 
-        scores = np.array(inference.getLayerFp16("classificators"), dtype=np.float16) 
-        boxes = np.array(inference.getLayerFp16("regressors"), dtype=np.float16).reshape((nb_anchors, 18))
+        layers = self.PalmLayers.read(inference)
+        scores = layers["classificators"]
+        boxes = layers["regressors"]
         
-        self.regions = mpu.decode_bboxes(self.PalmScoreThreshold, scores, boxes, anchors)
-        self.regions = mpu.non_max_suppression(self.regions, self.PalmNmsThreshold)
+        palms = mpu.decode_palm_regions(self.PalmScoreThreshold, scores, boxes, anchors)
+        palms = mpu.palm_regions_nms(palms, self.PalmNmsThreshold)
 
-        mpu.detections_to_rect(self.regions)
-        mpu.rect_transformation(self.regions, self.frame_size, self.frame_size)
+        mpu.palm_regions_to_rect(palms)
+        mpu.palm_regions_transformation(palms, self.frame_size, self.frame_size)
+        self.regions = palms.to_regions()
 
     def StartMainLoop(self):
         threading.Thread(target=self.Run, daemon=True).start()
@@ -482,8 +486,6 @@ class DepthCalculation:
                 if len(packets) > 0:
                     latestPacket[queueName] = packets[-1]
 
-            copiaColor = None
-
             if latestPacket["color"] is not None:
                 frame_color = latestPacket["color"].getCvFrame()
 
@@ -492,54 +494,44 @@ class DepthCalculation:
                 self.pad_h = int((self.frame_size - h)/2)
                 self.pad_w = int((self.frame_size - w)/2)
 
-                copiaColor = cv2.copyMakeBorder(frame_color, self.pad_h, self.pad_h, self.pad_w, self.pad_w, cv2.BORDER_CONSTANT)
-                
                 frame_nn = dai.ImgFrame()
                 frame_nn.setWidth(self.PalmInputLength)
                 frame_nn.setHeight(self.PalmInputLength)
-                frame_nn.setData(self.ToPlanar(copiaColor, (self.PalmInputLength, self.PalmInputLength)))
+                frame_nn.setData(self.PalmPlanar.resize(frame_color))
                 q_palm_in.send(frame_nn)
                 
                 inference = q_palm_out.get()
                 self.PalmPostprocess(inference)
 
                 for i, region in enumerate(self.regions):
-                    self.DrawPalmRectangle(frame_color, copiaColor, region)
+                    self.DrawPalmRectangle(frame_color, region)
             
             if latestPacket["depth"] is not None:
-                frame_depth = latestPacket["depth"].getFrame()
-                frame_depth = (frame_depth * 255. / self.MaxDisparity).astype(np.uint8)
-                frame_depth[frame_depth<128] = 0
-                frame_depth = cv2.applyColorMap(frame_depth, cv2.COLORMAP_JET)
-                frame_depth = np.ascontiguousarray(frame_depth)
+                disparity = latestPacket["depth"].getFrame()
+                depth_statistics = DepthStatistics(disparity)
+                frame_depth = self.DepthColorizer.colorize(disparity)
 
                 for i, region in enumerate(self.regions):
-                    self.AverageDepth, self.CentroidX, self.CentroidY = self.CalcSpatials(self.X1, self.Y1, self.X2, self.Y2, frame_depth)
+                    self.AverageDepth, self.CentroidX, self.CentroidY = self.CalcSpatials(self.X1, self.Y1, self.X2, self.Y2, depth_statistics)
                     xMin, yMin, xMax, yMax = self.GetRoiByPercent(0.5, self.X1, self.Y1, self.X2, self.Y2)
                     cv2.rectangle(frame_depth, (xMin, yMin), (xMax, yMax), (255, 255, 255), 2)
                     self.DrawPalmText(frame_depth, self.AverageDepth, self.CentroidX-10, self.CentroidY)
 
             if frame_color is not None and frame_depth is not None:
-                frame_color = cv2.cvtColor(frame_color, cv2.COLOR_BGR2RGB)
                 if len(frame_depth.shape) < 3:
-                    frame_depth = cv2.cvtColor(frame_depth, cv2.COLOR_GRAY2RGB)
-                else:
-                    frame_depth = cv2.cvtColor(frame_depth, cv2.COLOR_BGR2RGB)
+                    frame_depth = cv2.cvtColor(frame_depth, cv2.COLOR_GRAY2BGR)
                 blended = cv2.addWeighted(frame_color, self.ColorWeight, frame_depth, self.DepthWeight, 0)
-                pil_image = Image.fromarray(blended)
-                image_tk = ImageTk.PhotoImage(image=pil_image)
-                self.StreamingLabel.configure(image=image_tk)
-                self.StreamingLabel.image_tk = image_tk
-                self.StreamingLabel['image'] = image_tk
+                self.StreamingSurface.Show(blended)
                 frame_color = None
                 frame_depth = None
 
-    def DrawPalmRectangle(self, frame, copy, region):
+    def DrawPalmRectangle(self, frame, region):
         x1_float = region.pd_box[0]
         y1_float = region.pd_box[1]
         x2_float = x1_float + region.pd_box[2]
         y2_float = y1_float + region.pd_box[3]
-        new_h, new_w = copy.shape[:2]
+        new_h = self.pad_h * 2 + frame.shape[0]
+        new_w = self.pad_w * 2 + frame.shape[1]
         self.X1 = int(x1_float*new_w) - self.pad_w
         self.Y1 = int(y1_float*new_h) - self.pad_h
         self.X2 = int(x2_float*new_w) - self.pad_w
@@ -549,12 +541,12 @@ class DepthCalculation:
     def DrawPalmText(self, frame, depth, point1, point2):
         cv2.putText(frame, str(depth), (point1, point2), cv2.FONT_HERSHEY_DUPLEX, 0.4, (255, 255, 255))
     
-    def CalcSpatials(self, xMin, yMin, xMax, yMax, depth):
+    def CalcSpatials(self, xMin, yMin, xMax, yMax, depth_statistics):
         xMin, yMin, xMax, yMax = self.GetRoiByPercent(0.5, xMin, yMin, xMax, yMax)
 
-        depth_roi = depth[yMin:yMax, xMin:xMax]
-
-        average_depth = int(np.mean(depth_roi[True]))
+        average_depth = depth_statistics.mean(xMin, yMin, xMax, yMax)
+        if average_depth is not None:
+            average_depth = int(average_depth)
 
         centroid_x = int((xMax - xMin) / 2) + xMin
         centroid_y = int((yMax - yMin) / 2) + yMin
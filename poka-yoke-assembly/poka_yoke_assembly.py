@@ -1,3 +1,4 @@
+import argparse
 from typing import Any
 from utils.window_utils import *
 from utils.camera_utils import *
@@ -6,10 +7,41 @@ VALIDATION_COUNT = 10
 IMAGES_FOLDER = './images/'
 IMAGE_EXTENSION = '.jpg'
 
+STEP_LABELS = [
+    '1_carrier',
+    '2_bot',
+    'gear',
+    '4_top_ok',
+    '5_gear_ok',
+    '6_axis']
+
+STEP_PARTS = [
+    'a_6285647',
+    'b_4565452',
+    'b_4565452',
+    'b_4565452',
+    'c_6285646',
+    'd_6130007']
+
+STEP_OKS = [
+    'ok_6285647',
+    'ok_4565452',
+    'ok_4565452',
+    'ok_4565452',
+    'ok_6285646',
+    'ok_6130007']
+
+STEP_KOS = [
+    None,
+    None,
+    None,
+    'ko_4565452',
+    'ko_6285646',
+    None]
+
 class StepValidation:
-    def __init__(self, label: str, widget, part: str, ok: str, ko: str):
+    def __init__(self, label: str, part: str, ok: str, ko: str):
         self.Label = label
-        self.Widget = widget
         self.Part = part
         self.OK = ok
         self.KO = ko
@@ -22,22 +54,68 @@ class StepValidation:
     def Reset(self):
         self.Count = 0
 
+class AssemblyValidation:
+    def __init__(self):
+        self.Steps = []
+        for index, label in enumerate(STEP_LABELS):
+            self.Steps.append(StepValidation(label, STEP_PARTS[index], STEP_OKS[index], STEP_KOS[index]))
+        self.Current = 0
+
+    def IsComplete(self):
+        return self.Current == len(self.Steps)
+
+    def StepEvent(self, name: str, image: str, slot: int = None):
+        event = {'event': name, 'step': self.Current, 'label': self.Steps[self.Current].Label, 'image': image}
+        if slot is not None:
+            event['slot'] = slot
+        return event
+
+    def CompleteStep(self, events: list, image: str):
+        events.append(self.StepEvent('step_valid', image))
+        self.Current = self.Current + 1
+        if self.IsComplete():
+            events.append({'event': 'assembly_complete'})
+
+    def ValidateClassification(self, classifications: list):
+        events = []
+        if self.IsComplete() or self.Current == 2 or len(classifications) == 0:
+            return events
+        step = self.Steps[self.Current]
+        label = classifications[0].Label
+        if '_ko' in label:
+            if label.split('_')[1] == step.Label.split('_')[1] and step.KO is not None:
+                events.append(self.StepEvent('part_ko', step.KO))
+        elif step.KO is not None:
+            events.append(self.StepEvent('part_pending', step.Part))
+        if label == step.Label:
+            step.Count = step.Count + 1
+        if step.IsValid():
+            self.CompleteStep(events, step.OK)
+        return events
+
+    def ValidateDetections(self, detections: list):
+        events = []
+        if self.Current != 2 or len(detections) == 0:
+            return events
+        step = self.Steps[self.Current]
+        ok_labels = len([detection for detection in detections if detection.Label == step.Label])
+        if ok_labels > 0:
+            events.append(self.StepEvent('part_ok', step.OK, min(ok_labels, 3) - 1))
+        if ok_labels == 3:
+            step.Count = step.Count + 1
+        if step.IsValid():
+            self.CompleteStep(events, None)
+        return events
+
 class PokaYokeAssembly:
     def __init__(self):
         self.Window = AssemblyWindow()
         self.Cameras = AssemblyCameras(self.DrawImages)
+        self.Validation = AssemblyValidation()
 
         self.label_image_length = 400
 
-        step_labels = [
-            '1_carrier',
-            '2_bot',
-            'gear',
-            '4_top_ok',
-            '5_gear_ok',
-            '6_axis']
-
-        step_widgets = [
+        self.step_widgets = [
             self.Window.PartALabel,
             self.Window.PartBLabels[0],
             [
@@ -49,133 +127,42 @@ class PokaYokeAssembly:
             self.Window.PartCLabel,
             self.Window.PartDLabel]
         
-        step_parts = [
-            'a_6285647',
-            'b_4565452',
-            'b_4565452',
-            'b_4565452',
-            'c_6285646',
-            'd_6130007']
-        
-        step_oks = [
-            'ok_6285647',
-            'ok_4565452',
-            'ok_4565452',
-            'ok_4565452',
-            'ok_6285646',
-            'ok_6130007']
-        
-        step_kos = [
-            None,
-            None,
-            None,
-            'ko_4565452',
-            'ko_6285646',
-            None]
-        
-        self.current_validation = 0
-        
-        self.step_validations = []
-
-        for index, label in enumerate(step_labels):
-            self.step_validations.append(StepValidation(label, 
-                step_widgets[index], step_parts[index],
-                step_oks[index], step_kos[index]))
-        
         self.evidence_image_size = (120, 120)
 
+    def ApplyValidationEvents(self, events: list, evidence_image: np.ndarray):
+        for event in events:
+            if event['event'] == 'assembly_complete':
+                continue
+            if event['image'] is not None:
+                widget = self.step_widgets[event['step']]
+                if 'slot' in event:
+                    widget = widget[event['slot']]
+                SetLabelImageFromPath(widget, IMAGES_FOLDER + event['image'] + IMAGE_EXTENSION, PART_IMAGE_SIZE)
+            if event['event'] == 'step_valid':
+                evidence_resized = cv2.resize(evidence_image, self.evidence_image_size, interpolation=cv2.INTER_AREA)
+                SetLabelImageFromArray(self.Window.EvidenceLabels[event['step']], evidence_resized)
+
     def DrawImages(self, primary_image: np.ndarray, model_image: np.ndarray, secondary_image: np.ndarray, classifications: list, detections: list):
         if primary_image.any() and model_image.any() and secondary_image.any():
-            if self.current_validation < len(self.step_validations):
+            if not self.Validation.IsComplete():
                 DrawRectangle(primary_image, (159, 160), (229, 230), COLOR_CV_BLUE)
                 DrawText(primary_image, 'differential assembly', (159-95, 160-12), COLOR_CV_BLUE)
                 DrawText(primary_image, 'in progress', (159-35, 230+25), COLOR_CV_BLUE)
 
-                if self.current_validation != 2 and len(classifications) > 0:
-                    color = COLOR_CV_GREEN
-                    label = classifications[0].Label
-
-                    if '0_' in label:
-                        color = COLOR_CV_BLUE
-                    if '7_' in label:
-                        color = COLOR_CV_WHITE
-                    if '_ko' in label:
-                        color = COLOR_CV_RED
-                        if label.split('_')[1] == self.step_validations[self.current_validation].Label.split('_')[1]:
-                            SetLabelImageFromPath(
-                                self.step_validations[self.current_validation].Widget, 
-                                IMAGES_FOLDER + self.step_validations[self.current_validation].KO + IMAGE_EXTENSION)
-                    else:
-                        if self.step_validations[self.current_validation].KO is not None:
-                            SetLabelImageFromPath(
-                                self.step_validations[self.current_validation].Widget, 
-                                IMAGES_FOLDER + self.step_validations[self.current_validation].Part + IMAGE_EXTENSION)
-                    
-                    text = label[2:] + ' {:.2f}'.format(classifications[0].Score)
-                    
-                    DrawRectangle(model_image, (5, 5), (395, 395), color)
-                    DrawText(model_image, text, (5+5, 5+25), color)
-
-                    if label == self.step_validations[self.current_validation].Label:
-                        self.step_validations[self.current_validation].Count = self.step_validations[self.current_validation].Count + 1
-                    
-                    if self.step_validations[self.current_validation].IsValid():
-                        SetLabelImageFromPath(
-                            self.step_validations[self.current_validation].Widget, 
-                            IMAGES_FOLDER + self.step_validations[self.current_validation].OK + IMAGE_EXTENSION)
-                        model_resized = cv2.resize(model_image, self.evidence_image_size, interpolation=cv2.INTER_AREA)
-                        SetLabelImageFromArray(self.Window.EvidenceLabels[self.current_validation], model_resized)
-                        self.current_validation = self.current_validation + 1
-
-                if self.current_validation == 2 and len(detections) > 0:
-                    ok_labels = 0
+                if self.Validation.Current != 2 and len(classifications) > 0:
+                    DrawClassification(model_image, classifications[0])
+                    events = self.Validation.ValidateClassification(classifications)
+                    self.ApplyValidationEvents(events, model_image)
 
+                if self.Validation.Current == 2 and len(detections) > 0:
                     detect_evidence = model_image.copy()
-
-                    for detection in detections:
-                        color = COLOR_CV_WHITE
-                        label = detection.Label
-                        
-                        if label == self.step_validations[self.current_validation].Label:
-                            color = COLOR_CV_GREEN
-                            ok_labels = ok_labels + 1
-                        
-                        x_min = int(self.label_image_length * detection.Box.Left)
-                        y_min = int(self.label_image_length * detection.Box.Top)
-                        x_max = int(self.label_image_length * detection.Box.Right)
-                        y_max = int(self.label_image_length * detection.Box.Bottom)
-
-                        DrawRectangle(model_image, (x_min, y_min), (x_max, y_max), color)
-                        DrawText(model_image, label, (x_min+5, y_min+25), color)
-                        DrawText(model_image, '{:.2f}'.format(detection.Score), (x_min+5, y_min+50), color)
-                    
-                    if ok_labels > 0:
-                        SetLabelImageFromPath(
-                            self.step_validations[self.current_validation].Widget[ok_labels - 1], 
-                            IMAGES_FOLDER + self.step_validations[self.current_validation].OK + IMAGE_EXTENSION)               
-                    
-                    if ok_labels == 3:
-                        self.step_validations[self.current_validation].Count = self.step_validations[self.current_validation].Count + 1
-                    
-                    if self.step_validations[self.current_validation].IsValid():
-                        text_evidence = '3x mid'
-                        for detection in detections:
-                            text_evidence = text_evidence + ' {:.2f}'.format(detection.Score)
-                            
-                            x_min = int(self.label_image_length * detection.Box.Left)
-                            y_min = int(self.label_image_length * detection.Box.Top)
-                            x_max = int(self.label_image_length * detection.Box.Right)
-                            y_max = int(self.label_image_length * detection.Box.Bottom)
-
-                            DrawRectangle(detect_evidence, (x_min, y_min), (x_max, y_max), COLOR_CV_GREEN)
-
-                        DrawRectangle(detect_evidence, (5, 5), (395, 395), COLOR_CV_GREEN)
-                        DrawText(detect_evidence, text_evidence, (5+5, 5+25), COLOR_CV_GREEN)
-                        model_resized = cv2.resize(detect_evidence, self.evidence_image_size, interpolation=cv2.INTER_AREA)
-                        SetLabelImageFromArray(self.Window.EvidenceLabels[self.current_validation], model_resized)
-                        self.current_validation = self.current_validation + 1
+                    DrawDetections(model_image, detections, self.Validation.Steps[2].Label, self.label_image_length)
+                    events = self.Validation.ValidateDetections(detections)
+                    if any(event['event'] == 'step_valid' for event in events):
+                        DrawDetectionEvidence(detect_evidence, detections, self.label_image_length)
+                    self.ApplyValidationEvents(events, detect_evidence)
             
-            if self.current_validation == len(self.step_validations):
+            if self.Validation.IsComplete():
                 DrawRectangle(primary_image, (159, 160), (229, 230), COLOR_CV_GREEN)
                 DrawText(primary_image, 'differential assembly', (159-95, 160-12), COLOR_CV_GREEN)
                 DrawText(primary_image, 'completed', (159-30, 230+25), COLOR_CV_GREEN)
@@ -184,7 +171,56 @@ class PokaYokeAssembly:
             SetLabelImageFromArray(self.Window.ModelLabel, model_image)
             SetLabelImageFromArray(self.Window.SecondaryLabel, secondary_image)
 
+class HeadlessAssembly:
+    def __init__(self, reporter: HeadlessReporter):
+        self.Cameras = AssemblyCameras(self.Validate)
+        self.Validation = AssemblyValidation()
+        self.Reporter = reporter
+        self.LastEvents = []
+
+        self.label_image_length = 400
+
+    def Run(self):
+        self.Cameras.Run()
+
+    def Validate(self, primary_image: np.ndarray, model_image: np.ndarray, secondary_image: np.ndarray, classifications: list, detections: list):
+        if not (primary_image.any() and model_image.any() and secondary_image.any()):
+            return
+        if not self.Validation.IsComplete() and self.Validation.Current != 2 and len(classifications) > 0:
+            classification = classifications[0]
+            self.Reporter.EmitOnChange((self.Validation.Current, classification.Label), {
+                'event': 'classification',
+                'step': self.Validation.Current,
+                'label': classification.Label,
+                'score': round(float(classification.Score), 3)})
+        events = self.Validation.ValidateClassification(classifications)
+        events = events + self.Validation.ValidateDetections(detections)
+        for event in events:
+            if event not in self.LastEvents:
+                self.Reporter.Emit(event)
+        self.LastEvents = events
+        if self.Reporter.IsSnapshotDue():
+            snapshot = model_image.copy()
+            if self.Validation.Current == 2 and len(detections) > 0:
+                DrawDetections(snapshot, detections, self.Validation.Steps[2].Label, self.label_image_length)
+            elif len(classifications) > 0:
+                DrawClassification(snapshot, classifications[0])
+            self.Reporter.Snapshot('assembly', snapshot)
+
 def Main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+                        help='Validate without the Tk interface and print JSON events')
+    parser.add_argument('--snapshot_dir', default=None, type=str,
+                        help='Folder where headless mode writes annotated frames (default=%(default)s)')
+    parser.add_argument('--snapshot_period', default=5., type=float,
+                        help='Seconds between annotated frames in headless mode (default=%(default)s)')
+    args = parser.parse_args()
+
+    if args.headless:
+        HeadlessAssembly(HeadlessReporter(args.snapshot_dir, args.snapshot_period)).Run()
+        return
+
     assembly_poka_yoke = PokaYokeAssembly()
     assembly_poka_yoke.Cameras.StartMainLoop()
     assembly_poka_yoke.Window.StartMainLoop()
@@ -1,10 +1,44 @@
+import os
 import cv2
+import json
+import time
 import threading
+import numpy as np
 import depthai as dai
 from pathlib import Path
 
+import utils.nn_utils as nnu
+from utils.packet_utils import PacketReader
 from utils.model_utils import *
 
+class HeadlessReporter:
+    def __init__(self, snapshot_dir: str = None, snapshot_period: float = 5.):
+        self.SnapshotDir = snapshot_dir
+        self.SnapshotPeriod = snapshot_period
+        self.LastSnapshot = None
+        self.LastKeys = {}
+
+    def Emit(self, event: dict):
+        event = dict(event, time=round(time.time(), 3))
+        print(json.dumps(event, default=vars), flush=True)
+
+    def EmitOnChange(self, key, event: dict):
+        if self.LastKeys.get(event['event']) != key:
+            self.LastKeys[event['event']] = key
+            self.Emit(event)
+
+    def IsSnapshotDue(self):
+        if self.SnapshotDir is None:
+            return False
+        now = time.monotonic()
+        if self.LastSnapshot is not None and now - self.LastSnapshot < self.SnapshotPeriod:
+            return False
+        self.LastSnapshot = now
+        return True
+
+    def Snapshot(self, name: str, image: np.ndarray):
+        cv2.imwrite(os.path.join(self.SnapshotDir, name + '.jpg'), image)
+
 class AssemblyCameras:
     def __init__(self, drawImages: classmethod):
         self.DrawImages = drawImages
@@ -26,6 +60,11 @@ class AssemblyCameras:
         self.classify_input_length = 224
         self.detect_input_length = 416
 
+        self.classify_planar = nnu.PlanarResizer(self.classify_input_length, letterbox=False, interpolation=cv2.INTER_AREA)
+        self.detect_planar = nnu.PlanarResizer(self.detect_input_length, letterbox=False, interpolation=cv2.INTER_AREA)
+        self.classify_layers = nnu.LayerReader()
+        self.detect_layers = nnu.LayerReader()
+
         self.window_image_size = (400, 400)
 
         self.primary_image = None
@@ -110,19 +149,12 @@ class AssemblyCameras:
         queue_detect_in = self.secondary_device.getInputQueue(name=self.detect_in_stream)
         queue_detect_out = self.secondary_device.getOutputQueue(name=self.detect_out_stream, maxSize=4, blocking=True)
 
-        while True:
-            latestPacket = {}
-            latestPacket[self.primary_stream] = None
-            latestPacket[self.secondary_stream] = None
-
-            primary_packets = self.primary_device.getOutputQueue(self.primary_stream).tryGetAll()
-            secondary_packets = self.secondary_device.getOutputQueue(self.secondary_stream).tryGetAll()
+        reader = PacketReader()
+        reader.attach(self.primary_device.getOutputQueue(self.primary_stream, maxSize=1, blocking=False), self.primary_stream)
+        reader.attach(self.secondary_device.getOutputQueue(self.secondary_stream, maxSize=1, blocking=False), self.secondary_stream)
 
-            if len(primary_packets) > 0:
-                latestPacket[self.primary_stream] = primary_packets[-1]
-            
-            if len(secondary_packets) > 0:
-                latestPacket[self.secondary_stream] = secondary_packets[-1]
+        while True:
+            latestPacket = reader.wait()
 
             primary_frame = None
             secondary_frame = None
@@ -141,7 +173,7 @@ class AssemblyCameras:
                 # Model Image 224x224 --> 400x400 & 416x416
                 model_crop = primary_frame[1443:1667, 2011:2235]
 
-                image_classify_data = ImagePreprocess(model_crop, (self.classify_input_length, self.classify_input_length))
+                image_classify_data = self.classify_planar.resize(model_crop)
                 frame_classify_nn = dai.ImgFrame()
                 frame_classify_nn.setWidth(self.classify_input_length)
                 frame_classify_nn.setHeight(self.classify_input_length)
@@ -151,11 +183,10 @@ class AssemblyCameras:
                 classify_inference = queue_classify_out.get()
 
                 if classify_inference is not None:
-                    classify_layer_names = classify_inference.getAllLayerNames()
-                    classify_layer_float = classify_inference.getLayerFp16(classify_layer_names[0])
+                    classify_layer_float = self.classify_layers.first(classify_inference)
                     self.classify_predictions = ClassifyPostprocess(classify_layer_float)
 
-                image_detect_data = ImagePreprocess(model_crop, (self.detect_input_length, self.detect_input_length))
+                image_detect_data = self.detect_planar.resize(model_crop)
                 frame_detect_nn = dai.ImgFrame()
                 frame_detect_nn.setWidth(self.detect_input_length)
                 frame_detect_nn.setHeight(self.detect_input_length)
@@ -165,8 +196,7 @@ class AssemblyCameras:
                 detect_inference = queue_detect_out.get()
 
                 if detect_inference is not None:
-                    detect_layer_names = detect_inference.getAllLayerNames()
-                    detect_layer_float = detect_inference.getLayerFp16(detect_layer_names[0])
+                    detect_layer_float = self.detect_layers.first(detect_inference)
                     self.detect_predictions = DetectPostprocess(detect_layer_float)
 
                 self.model_image = cv2.resize(model_crop, self.window_image_size, interpolation=cv2.INTER_AREA)
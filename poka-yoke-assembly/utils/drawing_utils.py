@@ -16,8 +16,52 @@ COLOR_TK_WHITE = '#FFFFFF' # 'white'
 FONT_TK_BOLD = ('arial', 12, 'bold')
 FONT_TK_NORMAL = ('arial', 12, 'normal')
 
+PART_IMAGE_SIZE = (72, 72)
+
 def DrawRectangle(image: np.ndarray, point1: tuple, point2: tuple, color: tuple):
     cv2.rectangle(image, point1, point2, color, 3)
     
 def DrawText(image: np.ndarray, text: str, point: tuple, color: tuple):
-    cv2.putText(image, text, point, cv2.FONT_HERSHEY_DUPLEX, 0.78, color, 2)
\ No newline at end of file
+    cv2.putText(image, text, point, cv2.FONT_HERSHEY_DUPLEX, 0.78, color, 2)
+
+def GetClassificationColor(label: str):
+    color = COLOR_CV_GREEN
+    if '0_' in label:
+        color = COLOR_CV_BLUE
+    if '7_' in label:
+        color = COLOR_CV_WHITE
+    if '_ko' in label:
+        color = COLOR_CV_RED
+    return color
+
+def DrawClassification(image: np.ndarray, classification):
+    color = GetClassificationColor(classification.Label)
+    text = classification.Label[2:] + ' {:.2f}'.format(classification.Score)
+    DrawRectangle(image, (5, 5), (395, 395), color)
+    DrawText(image, text, (5+5, 5+25), color)
+
+def GetDetectionBox(detection, length: int):
+    x_min = int(length * detection.Box.Left)
+    y_min = int(length * detection.Box.Top)
+    x_max = int(length * detection.Box.Right)
+    y_max = int(length * detection.Box.Bottom)
+    return x_min, y_min, x_max, y_max
+
+def DrawDetections(image: np.ndarray, detections: list, ok_label: str, length: int):
+    for detection in detections:
+        color = COLOR_CV_WHITE
+        if detection.Label == ok_label:
+            color = COLOR_CV_GREEN
+        x_min, y_min, x_max, y_max = GetDetectionBox(detection, length)
+        DrawRectangle(image, (x_min, y_min), (x_max, y_max), color)
+        DrawText(image, detection.Label, (x_min+5, y_min+25), color)
+        DrawText(image, '{:.2f}'.format(detection.Score), (x_min+5, y_min+50), color)
+
+def DrawDetectionEvidence(image: np.ndarray, detections: list, length: int):
+    text_evidence = '3x mid'
+    for detection in detections:
+        text_evidence = text_evidence + ' {:.2f}'.format(detection.Score)
+        x_min, y_min, x_max, y_max = GetDetectionBox(detection, length)
+        DrawRectangle(image, (x_min, y_min), (x_max, y_max), COLOR_CV_GREEN)
+    DrawRectangle(image, (5, 5), (395, 395), COLOR_CV_GREEN)
+    DrawText(image, text_evidence, (5+5, 5+25), COLOR_CV_GREEN)
@@ -0,0 +1,34 @@
+import threading
+
+class PacketReader:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.packets = {}
+        self.arrivals = 0
+        self.taken = 0
+
+    def attach(self, queue, name: str):
+        self.packets[name] = None
+        queue.addCallback(lambda stream, packet: self.put(name, packet))
+
+    def watch(self, queue):
+        queue.addCallback(lambda stream, packet: self.notify())
+
+    def put(self, name: str, packet):
+        with self.condition:
+            self.packets[name] = packet
+            self.arrivals += 1
+            self.condition.notify_all()
+
+    def notify(self):
+        with self.condition:
+            self.arrivals += 1
+            self.condition.notify_all()
+
+    def wait(self, timeout: float = None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.arrivals != self.taken, timeout)
+            self.taken = self.arrivals
+            packets = self.packets
+            self.packets = dict.fromkeys(packets)
+        return packets
@@ -1,27 +1,87 @@
-import cv2
+import os
 import math
 import numpy as np
 from tkinter import *
 from tkinter import messagebox
 from PIL import ImageTk
 from PIL import Image as PIL_Image
+from collections import OrderedDict
 
 from utils.drawing_utils import *
 
-def SetLabelImageFromPath(label: Widget, path: str):
-    image_pil = PIL_Image.open(path)
-    image_tk = ImageTk.PhotoImage(image=image_pil)
-    label.configure(image=image_tk)
-    label.image_tk = image_tk
-    label['image'] = image_tk
+class AssetCache:
+    def __init__(self, capacity: int = 64):
+        self.Capacity = capacity
+        self.Images = OrderedDict()
+
+    def Get(self, path: str, size: tuple = None):
+        key = (os.path.normpath(path), size)
+        if key in self.Images:
+            self.Images.move_to_end(key)
+            return self.Images[key]
+        image_pil = PIL_Image.open(path)
+        if size is not None and image_pil.size != size:
+            image_pil = image_pil.resize(size, PIL_Image.LANCZOS)
+        image_tk = ImageTk.PhotoImage(image=image_pil)
+        self.Images[key] = image_tk
+        if len(self.Images) > self.Capacity:
+            self.Images.popitem(last=False)
+        return image_tk
+
+    def Preload(self, folder: str, size: tuple = None, extension: str = '.jpg'):
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(extension):
+                self.Get(os.path.join(folder, name), size)
+
+    def SetLabelImage(self, label: Widget, path: str, size: tuple = None):
+        key = (os.path.normpath(path), size)
+        if getattr(label, 'image_key', None) == key:
+            return
+        image_tk = self.Get(path, size)
+        label.configure(image=image_tk)
+        label.image_tk = image_tk
+        label.image_key = key
+
+    def ClearLabelImage(self, label: Widget):
+        if getattr(label, 'image_key', False) is None:
+            return
+        label.configure(image='')
+        label.image_tk = None
+        label.image_key = None
+
+ASSET_CACHE = AssetCache()
+
+def SetLabelImageFromPath(label: Widget, path: str, size: tuple = None):
+    ASSET_CACHE.SetLabelImage(label, path, size)
+
+class DisplaySurface:
+    def __init__(self, label: Widget):
+        self.Label = label
+        self.ImageTk = None
+
+    def Show(self, image: np.ndarray):
+        h, w = image.shape[:2]
+        mode = 'RGB' if image.ndim == 3 else 'L'
+        if self.ImageTk is None or (self.ImageTk.width(), self.ImageTk.height()) != (w, h):
+            self.ImageTk = ImageTk.PhotoImage('RGB', (w, h))
+        if getattr(self.Label, 'image_tk', None) is not self.ImageTk:
+            self.Label.configure(image=self.ImageTk)
+            self.Label.image_tk = self.ImageTk
+            self.Label.image_key = None
+        rawmode = 'BGR' if mode == 'RGB' else 'L'
+        image_pil = PIL_Image.frombuffer(mode, (w, h), np.ascontiguousarray(image), 'raw', rawmode, 0, 1)
+        self.ImageTk.paste(image_pil)
+
+    def Clear(self):
+        if getattr(self.Label, 'image_tk', None) is not None:
+            self.Label.configure(image='')
+            self.Label.image_tk = None
+            self.Label.image_key = None
 
 def SetLabelImageFromArray(label: Widget, array: np.ndarray):
-    image_rgb = cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
-    image_pil = PIL_Image.fromarray(image_rgb)
-    image_tk = ImageTk.PhotoImage(image=image_pil)
-    label.configure(image=image_tk)
-    label.image_tk = image_tk
-    label['image'] = image_tk
+    if getattr(label, 'surface', None) is None:
+        label.surface = DisplaySurface(label)
+    label.surface.Show(array)
 
 class AssemblyWindow():
     def __init__(self):
@@ -62,24 +122,26 @@ class AssemblyWindow():
         self.ValidationFrame = Frame(self.MainFrame, width=400, height=260)
         self.ValidationFrame.place(x=860, y=440)
 
+        ASSET_CACHE.Preload('./images/', PART_IMAGE_SIZE)
+
         self.PartALabel = Label(self.ValidationFrame, borderwidth=0, bg=COLOR_TK_WHITE)
         self.PartALabel.place(w=72, h=72, x=0, y=0)
-        SetLabelImageFromPath(self.PartALabel, './images/a_6285647.jpg')
+        SetLabelImageFromPath(self.PartALabel, './images/a_6285647.jpg', PART_IMAGE_SIZE)
 
         self.PartBLabels = []
 
         for index in range(5):
             self.PartBLabels.append(Label(self.ValidationFrame, borderwidth=0, bg=COLOR_TK_WHITE))
             self.PartBLabels[index].place(w=72, h=72, x=index*80, y=94)
-            SetLabelImageFromPath(self.PartBLabels[index], './images/b_4565452.jpg')
+            SetLabelImageFromPath(self.PartBLabels[index], './images/b_4565452.jpg', PART_IMAGE_SIZE)
 
         self.PartCLabel = Label(self.ValidationFrame, borderwidth=0, bg=COLOR_TK_WHITE)
         self.PartCLabel.place(w=72, h=72, x=0, y=188)
-        SetLabelImageFromPath(self.PartCLabel, './images/c_6285646.jpg')
+        SetLabelImageFromPath(self.PartCLabel, './images/c_6285646.jpg', PART_IMAGE_SIZE)
 
         self.PartDLabel = Label(self.ValidationFrame, borderwidth=0, bg=COLOR_TK_WHITE)
         self.PartDLabel.place(w=72, h=72, x=160, y=188)
-        SetLabelImageFromPath(self.PartDLabel, './images/d_6130007.jpg')
+        SetLabelImageFromPath(self.PartDLabel, './images/d_6130007.jpg', PART_IMAGE_SIZE)
 
         self.Root.protocol('WM_DELETE_WINDOW', self.OnClosingEvent)
 
@@ -1,5 +1,6 @@
 import os
 import json
+import argparse
 import cv2
 import math
 import numpy as np
@@ -10,12 +11,17 @@ from PIL import ImageTk
 from PIL import Image as PIL_Image
 from utils.counting_utils import *
 from utils.detection_utils import *
+from utils.mailbox_utils import *
 from utils.drawing_utils import *
 
 class PokaYokeCounting():
     def __init__(self, json: list):
         self.Window = Window()
-        self.Detection = Detection(self.DrawImage)
+        self.Detection = Detection()
+        self.VideoSurface = DisplaySurface(self.Window.VideoLabel)
+        self.CropSurface = DisplaySurface(self.Window.CropLabel)
+        self.Assets = AssetCache()
+        self.Assets.Preload('images', DETECTION_IMAGE_SIZE)
 
         self.SetAllAttributes()
         self.SetAllIconImages()
@@ -31,6 +37,7 @@ class PokaYokeCounting():
             left = (index%4)*80
             top = math.floor(index/4)*80
             self.DetectionLabels[index].place(w=72, h=72, x=left, y=top)
+        self.DetectionPanel = [None] * len(self.DetectionLabels)
 
     def SetAllAttributes(self):
         self.PickingItems = []
@@ -40,6 +47,8 @@ class PokaYokeCounting():
         self.EditItem = None
         self.MouseX = None
         self.MouseY = None
+        self.OverlayItems = None
+        self.EditingState = None
         # widgets lists
         self.OrderButtons = []
         self.ImageLabels = []
@@ -97,6 +106,23 @@ class PokaYokeCounting():
         self.AmountValues.append(StringVar(value=''))
         self.RectValues.append(BooleanVar(value=False))
         self.DepthValues.append(BooleanVar(value=False))
+        self.EyeValues[-1].trace_add('write', self.InvalidateOverlay)
+        self.BulbValues[-1].trace_add('write', self.InvalidateOverlay)
+        self.EditValues[-1].trace_add('write', self.InvalidateOverlay)
+
+    def InvalidateOverlay(self, *_):
+        self.OverlayItems = None
+        self.EditingState = None
+
+    def GetOverlayItems(self):
+        if self.OverlayItems is None:
+            self.OverlayItems = []
+            for index, item in enumerate(self.PickingItems):
+                rect = item.Rect if self.EyeValues[index].get() else None
+                depth = item.Depth if self.BulbValues[index].get() else None
+                if rect is not None or depth is not None:
+                    self.OverlayItems.append((rect, depth))
+        return self.OverlayItems
 
     def SetAllIconImages(self):
         self.OrderOnIcon = PhotoImage(file='./assets/icon-check-on.png')
@@ -394,6 +420,7 @@ class PokaYokeCounting():
         del self.DepthValues[index]
     
     def SaveConfigurationFile(self):
+        self.InvalidateOverlay()
         with open(CONFIG_FILE_NAME, 'w') as json_file:
             json.dump(self.PickingItems, json_file, cls=CustomEncoder, indent=4)
             json_file.close()
@@ -449,16 +476,19 @@ class PokaYokeCounting():
 
     def SetDetectionImage(self, index: int, name: str):
         path = 'images/' + name + '.jpg'
-        image_pil = PIL_Image.open(path)
-        image_tk = ImageTk.PhotoImage(image=image_pil)
-        self.DetectionLabels[index].configure(image=image_tk)
-        self.DetectionLabels[index].image_tk = image_tk
-        self.DetectionLabels[index]['image'] = image_tk
+        self.Assets.SetLabelImage(self.DetectionLabels[index], path, DETECTION_IMAGE_SIZE)
 
     def RemoveDetectionImage(self, index: int):
-        self.DetectionLabels[index].configure(image=None)
-        self.DetectionLabels[index].image_tk = None
-        self.DetectionLabels[index]['image'] = None
+        self.Assets.ClearLabelImage(self.DetectionLabels[index])
+
+    def ApplyDetectionPanel(self, detection_panel: list):
+        for index, name in enumerate(detection_panel):
+            if name != self.DetectionPanel[index]:
+                if name is None:
+                    self.RemoveDetectionImage(index)
+                else:
+                    self.SetDetectionImage(index, name)
+        self.DetectionPanel = detection_panel
 
     def EditButtonClick(self, index: int):
         if self.EditValues[index].get():
@@ -569,13 +599,14 @@ class PokaYokeCounting():
         self.MoveSettingsInterface(index, new_index)
 
     def IsAnyItemBeingEdited(self):
-        boolean_list = [value.get() for value in self.EditValues]
-        editing_item = True in boolean_list
-        if editing_item:
-            item_index = boolean_list.index(editing_item)
-            return editing_item, item_index
-        else:
-            return editing_item, None
+        if self.EditingState is None:
+            boolean_list = [value.get() for value in self.EditValues]
+            editing_item = True in boolean_list
+            if editing_item:
+                self.EditingState = editing_item, boolean_list.index(editing_item)
+            else:
+                self.EditingState = editing_item, None
+        return self.EditingState
 
     def CaptureMouseMotionEvent(self, event: EventType):
         editing, _ = self.IsAnyItemBeingEdited()
@@ -609,14 +640,12 @@ class PokaYokeCounting():
     def GetBlendedImage(self, color_image: np.ndarray, depth_image: np.ndarray):
         blend_depth = self.BlendValue.get() / 100
         blend_color = 1 - blend_depth
+        frame_color = color_image
         if len(color_image.shape) < 3:
-            frame_color = cv2.cvtColor(color_image, cv2.COLOR_GRAY2RGB)
-        else:
-            frame_color = cv2.cvtColor(color_image, cv2.COLOR_BGR2RGB)
+            frame_color = cv2.cvtColor(color_image, cv2.COLOR_GRAY2BGR)
+        frame_depth = depth_image
         if len(depth_image.shape) < 3:
-            frame_depth = cv2.cvtColor(depth_image, cv2.COLOR_GRAY2RGB)
-        else:
-            frame_depth = cv2.cvtColor(depth_image, cv2.COLOR_BGR2RGB)
+            frame_depth = cv2.cvtColor(depth_image, cv2.COLOR_GRAY2BGR)
         blended_image = cv2.addWeighted(frame_color, blend_color, frame_depth, blend_depth, 0)
         return blended_image
 
@@ -626,30 +655,43 @@ class PokaYokeCounting():
         self.BlendValue = IntVar(value=50)
         Scale(self.Window.StreamingFrame, from_=0, to=100, orient=HORIZONTAL, showvalue=0, variable=self.BlendValue).place(w=545, h=22, x=45, y=366)
 
+    def StartRenderLoop(self):
+        self.Window.Root.after(RENDER_INTERVAL_MS, self.RenderFrame)
+
+    def RenderFrame(self):
+        frame = self.Detection.Mailbox.Take()
+        if frame is not None:
+            color_image, disparity, hand_regions, counting_image, part_detections = frame
+            depth_image = self.Detection.DepthColorizer.colorize(disparity)
+            self.DrawImage(color_image, depth_image, hand_regions, counting_image, part_detections)
+        if self.Detection.ReportStats:
+            report = self.Detection.Mailbox.Report()
+            if report is not None:
+                print(report)
+        self.Window.Root.after(RENDER_INTERVAL_MS, self.RenderFrame)
+
     def DrawImage(self, color_image: np.ndarray, depth_image: np.ndarray, hand_regions: list, counting_image: np.ndarray, part_detections: list):
         scaled_color_image = cv2.resize(color_image, (640, 360), interpolation = cv2.INTER_AREA)
         scaled_depth_image = cv2.resize(depth_image, (640, 360), interpolation = cv2.INTER_AREA)
         blended_image = self.GetBlendedImage(scaled_color_image, scaled_depth_image)
 
-        for index, item in enumerate(self.PickingItems):
-            if self.EyeValues[index].get():
-                if item.Rect is not None:
-                    top_l = item.Rect.TopLeft
-                    bot_r = item.Rect.BottomRight
-                    if top_l is not None:
-                        if bot_r is not None:
-                            cv2.rectangle(blended_image, (top_l.X, top_l.Y), (bot_r.X, bot_r.Y), COLOR_CV_WHITE, 1)
-                        else:
-                            cv2.drawMarker(blended_image, (top_l.X, top_l.Y), COLOR_CV_WHITE, cv2.MARKER_CROSS, 24, 1)
-            if self.BulbValues[index].get():
-                if item.Depth is not None:
-                    lower = item.Depth.LowerLevel
-                    upper = item.Depth.UpperLevel
-                    if lower is not None:
-                        if upper is not None:
-                            cv2.arrowedLine(blended_image, (lower.X, lower.Y), (upper.X, upper.Y), COLOR_CV_WHITE, 1)
-                        else:
-                            cv2.circle(blended_image, (lower.X, lower.Y), 12, COLOR_CV_WHITE, 1)
+        for rect, depth in self.GetOverlayItems():
+            if rect is not None:
+                top_l = rect.TopLeft
+                bot_r = rect.BottomRight
+                if top_l is not None:
+                    if bot_r is not None:
+                        cv2.rectangle(blended_image, (top_l.X, top_l.Y), (bot_r.X, bot_r.Y), COLOR_CV_WHITE, 1)
+                    else:
+                        cv2.drawMarker(blended_image, (top_l.X, top_l.Y), COLOR_CV_WHITE, cv2.MARKER_CROSS, 24, 1)
+            if depth is not None:
+                lower = depth.LowerLevel
+                upper = depth.UpperLevel
+                if lower is not None:
+                    if upper is not None:
+                        cv2.arrowedLine(blended_image, (lower.X, lower.Y), (upper.X, upper.Y), COLOR_CV_WHITE, 1)
+                    else:
+                        cv2.circle(blended_image, (lower.X, lower.Y), 12, COLOR_CV_WHITE, 1)
 
         editing, index = self.IsAnyItemBeingEdited()
         if editing:
@@ -678,78 +720,77 @@ class PokaYokeCounting():
                     else:
                         cv2.line(blended_image, (lower.X, lower.Y), (self.MouseX, self.MouseY), COLOR_CV_WHITE, 1)
 
-        for index, _ in enumerate(self.DetectionLabels):
-                self.RemoveDetectionImage(index)
+        detection_panel = [None] * len(self.DetectionLabels)
 
         if self.CurrentItem is not None:
-            current_rect = self.PickingItems[self.CurrentItem].Rect
+            current_item = self.PickingItems[self.CurrentItem]
+            current_rect = current_item.Rect
             current_point1 = (current_rect.TopLeft.X, current_rect.TopLeft.Y)
             current_point2 = (current_rect.BottomRight.X, current_rect.BottomRight.Y)
             cv2.rectangle(blended_image, current_point1, current_point2, COLOR_CV_WHITE, 2)
+            detection_panel = CalculateDetectionPanel(self.CurrentItem + 1, current_item, None, len(self.DetectionLabels))
 
-            target_count = int(self.AmountLabels[self.CurrentItem]['text'])
-            for index, _ in enumerate(self.DetectionLabels):
-                if index < target_count:
-                    image_name = str(self.CurrentItem + 1) + '_' + self.NameLabels[self.CurrentItem]['text']
-                    self.SetDetectionImage(index, image_name)
-
-        pil_image = PIL_Image.fromarray(blended_image)
-        image_tk = ImageTk.PhotoImage(image=pil_image)
-        self.Window.VideoLabel.configure(image=image_tk)
-        self.Window.VideoLabel.image_tk = image_tk
-        self.Window.VideoLabel['image'] = image_tk
+        self.VideoSurface.Show(blended_image)
         
         if counting_image is not None and counting_image.any():
-            count_color = COLOR_CV_WHITE
-            counting_image = cv2.cvtColor(counting_image, cv2.COLOR_BGR2RGB)
             crop_length = 280
             counting_image = cv2.resize(counting_image, (crop_length, crop_length), interpolation=cv2.INTER_NEAREST)
             if self.CurrentItem is not None:
-                target_count = int(self.AmountLabels[self.CurrentItem]['text'])
-                count_detections = 0
-                for index, detection in enumerate(part_detections):
-                    x1 = int(crop_length*detection.Box.Left)
-                    y1 = int(crop_length*detection.Box.Top)
-                    x2 = x1 + int(crop_length*detection.Box.Width)
-                    y2 = y1 + int(crop_length*detection.Box.Height)
-
-                    label_code = detection.Label[2:]
-
-                    if label_code == self.NameLabels[self.CurrentItem]['text']:
-                        count_color = COLOR_CV_GREEN
-                        count_detections = count_detections + 1
-                        if count_detections <= target_count:
-                            self.SetDetectionImage(index, 'ok_' + label_code)
-                        else:
-                            self.SetDetectionImage(index, 'ko_' + label_code)
-                    else:
-                        count_color = COLOR_CV_RED
-                        self.SetDetectionImage(index, 'ko_' + label_code)
-
-                    cv2.rectangle(counting_image, (x1, y1), (x2, y2), count_color, 2)
-                
-                detections_length = len(part_detections)
-                
-                for index in range(detections_length, 8):
-                    self.RemoveDetectionImage(index)
-                
-                missing_parts = target_count - count_detections
-                if missing_parts > 0:
-                    image_name = str(self.CurrentItem + 1) + '_' + self.NameLabels[self.CurrentItem]['text']
-                    for index in range(detections_length, detections_length + missing_parts):
-                        self.SetDetectionImage(index, image_name)
-
-            pil_crop = PIL_Image.fromarray(counting_image)
-            crop_tk = ImageTk.PhotoImage(image=pil_crop)
-            self.Window.CropLabel.configure(image=image_tk)
-            self.Window.CropLabel.image_tk = crop_tk
-            self.Window.CropLabel['image'] = crop_tk
+                DrawPartDetections(counting_image, current_item, part_detections)
+                detection_panel = CalculateDetectionPanel(self.CurrentItem + 1, current_item, part_detections, len(self.DetectionLabels))
+
+            self.CropSurface.Show(counting_image)
         else:
-            self.Window.CropLabel.configure(image=image_tk)
-            self.Window.CropLabel.image_tk = None
-            self.Window.CropLabel['image'] = None
+            self.CropSurface.Clear()
+
+        self.ApplyDetectionPanel(detection_panel)
+
+class HeadlessCounting:
+    def __init__(self, json: list, item: int, reporter: HeadlessReporter):
+        self.Detection = Detection()
+        self.Reporter = reporter
+        self.PickingItems = [pick for pick in map(PickingItemFromJson, json) if pick is not None]
+        if not 0 < item <= len(self.PickingItems):
+            raise ValueError('Picking item %d does not exist in %s' % (item, CONFIG_FILE_NAME))
+        self.CurrentItem = self.PickingItems[item - 1]
+
+    def Run(self):
+        self.Detection.StartMainLoop()
+        while True:
+            self.Validate(*self.Detection.Mailbox.Wait())
+
+    def Validate(self, color_image: np.ndarray, disparity: np.ndarray, hand_regions: list, counting_image: np.ndarray, part_detections: list):
+        event = {
+            'event': 'counting',
+            'item': self.CurrentItem.Name,
+            'target': self.CurrentItem.Amount,
+            'hands': len(hand_regions),
+            'counting': counting_image is not None and bool(counting_image.any())}
+        if event['counting']:
+            ok_parts, ko_parts, missing_parts = CountParts(self.CurrentItem, part_detections)
+            event.update(ok=ok_parts, ko=ko_parts, missing=missing_parts,
+                complete=ko_parts == 0 and missing_parts == 0)
+        key = (event['hands'] > 0, event['counting'], event.get('ok'), event.get('ko'), event.get('missing'))
+        self.Reporter.EmitOnChange(key, event)
+        if event['counting'] and self.Reporter.IsSnapshotDue():
+            snapshot = counting_image.copy()
+            DrawPartDetections(snapshot, self.CurrentItem, part_detections)
+            self.Reporter.Snapshot('counting', snapshot)
 
 def Main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+                        help='Validate without the Tk interface and print JSON events')
+    parser.add_argument('--item', default=1, type=int,
+                        help='Order of the picking item validated in headless mode (default=%(default)s)')
+    parser.add_argument('--snapshot_dir', default=None, type=str,
+                        help='Folder where headless mode writes annotated frames (default=%(default)s)')
+    parser.add_argument('--snapshot_period', default=5., type=float,
+                        help='Seconds between annotated frames in headless mode (default=%(default)s)')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print transfer rates, request latencies and display rates every ten seconds')
+    args = parser.parse_args()
+
     if os.path.isfile(CONFIG_FILE_NAME):
         with open(CONFIG_FILE_NAME, 'r') as json_file:
             config_data = json.load(json_file)
@@ -761,8 +802,17 @@ def Main():
             json_file.write(default_json)
             json_file.close()
 
+    if args.headless:
+        reporter = HeadlessReporter(args.snapshot_dir, args.snapshot_period)
+        headless_counting = HeadlessCounting(config_data, args.item, reporter)
+        headless_counting.Detection.ReportStats = args.stats
+        headless_counting.Run()
+        return
+
     picking_poka_yoke = PokaYokeCounting(config_data)
+    picking_poka_yoke.Detection.ReportStats = args.stats
     picking_poka_yoke.Detection.StartMainLoop()
+    picking_poka_yoke.StartRenderLoop()
     picking_poka_yoke.Window.StartMainLoop()
 
 if __name__ == '__main__':
@@ -1,6 +1,11 @@
+import os
+import numpy as np
+from collections import OrderedDict
 from json import JSONEncoder
 from tkinter import *
 from tkinter import messagebox
+from PIL import ImageTk
+from PIL import Image as PIL_Image
 
 class Point:
     def __init__(self, x: int, y: int):
@@ -99,6 +104,70 @@ class CustomEncoder(JSONEncoder):
     def default(self, o):
         return o.__dict__
 
+class AssetCache:
+    def __init__(self, capacity: int = 64):
+        self.Capacity = capacity
+        self.Images = OrderedDict()
+
+    def Get(self, path: str, size: tuple = None):
+        key = (os.path.normpath(path), size)
+        if key in self.Images:
+            self.Images.move_to_end(key)
+            return self.Images[key]
+        image_pil = PIL_Image.open(path)
+        if size is not None and image_pil.size != size:
+            image_pil = image_pil.resize(size, PIL_Image.LANCZOS)
+        image_tk = ImageTk.PhotoImage(image=image_pil)
+        self.Images[key] = image_tk
+        if len(self.Images) > self.Capacity:
+            self.Images.popitem(last=False)
+        return image_tk
+
+    def Preload(self, folder: str, size: tuple = None, extension: str = '.jpg'):
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(extension):
+                self.Get(os.path.join(folder, name), size)
+
+    def SetLabelImage(self, label: Widget, path: str, size: tuple = None):
+        key = (os.path.normpath(path), size)
+        if getattr(label, 'image_key', None) == key:
+            return
+        image_tk = self.Get(path, size)
+        label.configure(image=image_tk)
+        label.image_tk = image_tk
+        label.image_key = key
+
+    def ClearLabelImage(self, label: Widget):
+        if getattr(label, 'image_key', False) is None:
+            return
+        label.configure(image='')
+        label.image_tk = None
+        label.image_key = None
+
+class DisplaySurface:
+    def __init__(self, label: Widget):
+        self.Label = label
+        self.ImageTk = None
+
+    def Show(self, image: np.ndarray):
+        h, w = image.shape[:2]
+        mode = 'RGB' if image.ndim == 3 else 'L'
+        if self.ImageTk is None or (self.ImageTk.width(), self.ImageTk.height()) != (w, h):
+            self.ImageTk = ImageTk.PhotoImage('RGB', (w, h))
+        if getattr(self.Label, 'image_tk', None) is not self.ImageTk:
+            self.Label.configure(image=self.ImageTk)
+            self.Label.image_tk = self.ImageTk
+            self.Label.image_key = None
+        rawmode = 'BGR' if mode == 'RGB' else 'L'
+        image_pil = PIL_Image.frombuffer(mode, (w, h), np.ascontiguousarray(image), 'raw', rawmode, 0, 1)
+        self.ImageTk.paste(image_pil)
+
+    def Clear(self):
+        if getattr(self.Label, 'image_tk', None) is not None:
+            self.Label.configure(image='')
+            self.Label.image_tk = None
+            self.Label.image_key = None
+
 class Window():
     def __init__(self):
         self.Root = Tk()
@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+
+class DepthStatistics:
+    def __init__(self, frame=None):
+        self.frame = None
+        self.sums = None
+        self.counts = None
+        if frame is not None:
+            self.update(frame)
+
+    def update(self, frame):
+        self.frame = frame
+        self.sums = cv2.integral(frame, sdepth=cv2.CV_64F)
+        self.counts = cv2.integral((frame > 0).view(np.uint8))
+
+    def clip(self, rois):
+        h, w = self.frame.shape[:2]
+        rois = np.array(rois, dtype=np.intp).reshape(-1, 4)
+        np.clip(rois[:, 0::2], 0, w, out=rois[:, 0::2])
+        np.clip(rois[:, 1::2], 0, h, out=rois[:, 1::2])
+        rois[:, 2] = np.maximum(rois[:, 0], rois[:, 2])
+        rois[:, 3] = np.maximum(rois[:, 1], rois[:, 3])
+        return rois
+
+    def box_sums(self, table, rois):
+        x1, y1, x2, y2 = rois.T
+        return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+
+    def means(self, rois):
+        rois = self.clip(rois)
+        sums = self.box_sums(self.sums, rois)
+        counts = self.box_sums(self.counts, rois)
+        areas = (rois[:, 2] - rois[:, 0]) * (rois[:, 3] - rois[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = sums / counts
+            valid = np.where(areas > 0, counts / areas, 0.)
+        return means, valid
+
+    def mean(self, xMin, yMin, xMax, yMax):
+        means, valid = self.means([(xMin, yMin, xMax, yMax)])
+        if valid[0] == 0:
+            return None
+        return float(means[0])
+
+    def valid_fraction(self, xMin, yMin, xMax, yMax):
+        return float(self.means([(xMin, yMin, xMax, yMax)])[1][0])
+
+    def percentile(self, xMin, yMin, xMax, yMax, percent):
+        x1, y1, x2, y2 = self.clip([(xMin, yMin, xMax, yMax)])[0]
+        values = self.frame[y1:y2, x1:x2].ravel()
+        histogram = np.bincount(values, minlength=1)
+        histogram[0] = 0
+        cumulative = np.cumsum(histogram)
+        if cumulative[-1] == 0:
+            return None
+        return int(np.searchsorted(cumulative, max(cumulative[-1] * percent / 100., 1)))
+
+    def median(self, xMin, yMin, xMax, yMax):
+        return self.percentile(xMin, yMin, xMax, yMax, 50)
+
+class DisparityColorizer:
+    def __init__(self, max_disparity, threshold=128, colormap=cv2.COLORMAP_JET):
+        self.max_disparity = max_disparity
+        self.threshold = threshold
+        self.colormap = colormap
+        self.luts = {}
+        self.output = None
+        self.scaled = None
+
+    def lookup_table(self, dtype):
+        if dtype not in self.luts:
+            levels = np.iinfo(dtype).max + 1
+            scaled = np.minimum(np.arange(levels) * 255. / self.max_disparity, 255).astype(np.uint8)
+            scaled[scaled < self.threshold] = 0
+            if dtype == np.uint8:
+                scaled = cv2.applyColorMap(scaled.reshape(-1, 1), self.colormap)
+            self.luts[dtype] = scaled
+        return self.luts[dtype]
+
+    def colorize(self, disparity):
+        if self.output is None or self.output.shape[:2] != disparity.shape[:2]:
+            self.output = np.empty(disparity.shape[:2] + (3,), dtype=np.uint8)
+            self.scaled = np.empty(disparity.shape[:2], dtype=np.uint8)
+        lut = self.lookup_table(disparity.dtype)
+        if disparity.dtype == np.uint8:
+            cv2.applyColorMap(disparity, lut, dst=self.output)
+        else:
+            np.take(lut, disparity, out=self.scaled, mode='clip')
+            cv2.applyColorMap(self.scaled, self.colormap, dst=self.output)
+        return self.output
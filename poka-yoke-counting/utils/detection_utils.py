@@ -3,20 +3,37 @@ import numpy as np
 import threading
 import depthai as dai
 import utils.mediapipe_utils as mpu
+import utils.nn_utils as nnu
+from utils.packet_utils import PacketReader
+from utils.mailbox_utils import FrameMailbox
 from pathlib import Path
+from utils.depth_utils import DisparityColorizer
 from utils.azure_model_utils import *
 from utils.drawing_utils import *
 
 class Detection:
-    def __init__(self, drawImage: classmethod):
-        self.DrawImage = drawImage
+    def __init__(self):
+        self.Mailbox = FrameMailbox()
         self.QueueNames = []
 
         self.PalmInputLength = 128
+        self.PalmOnDevice = True
         self.PalmScoreThreshold = 0.6
         self.PalmNmsThreshold = 0.3
+        self.PalmRequestDepth = 2
+        self.PalmPlanar = nnu.PlanarResizer(self.PalmInputLength)
+        self.PalmLayers = nnu.LayerReader({"regressors": (len(mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)), 18)})
 
         self.CountInputLength = 416
+        self.CountOnDevice = True
+        self.CountRequestDepth = 2
+        self.CountPlanar = nnu.PlanarResizer(self.CountInputLength, letterbox=False)
+        self.CountLayers = nnu.LayerReader()
+
+        self.DisplaySize = (640, 360)
+        self.ReportStats = False
+        self.LinkCounter = nnu.TransferCounter("xlink")
+        self.CountCounter = nnu.TransferCounter("count")
 
         self.regions = []
         self.detections = []
@@ -61,63 +78,84 @@ class Detection:
         stereo_depth.setDepthAlign(dai.CameraBoardSocket.RGB)
         
         self.MaxDisparity = stereo_depth.initialConfig.getMaxDisparity()
+        self.DepthColorizer = DisparityColorizer(self.MaxDisparity, threshold=0)
 
-        cam_color.isp.link(color_out.input)
+        if self.CountOnDevice:
+            cam_color.setPreviewSize(*self.DisplaySize)
+            cam_color.preview.link(color_out.input)
+        else:
+            cam_color.isp.link(color_out.input)
         cam_left.out.link(stereo_depth.left)
         cam_right.out.link(stereo_depth.right)
         stereo_depth.disparity.link(depth_out.input)
 
         palm_nn = pipeline.createNeuralNetwork()
         palm_nn.setBlobPath(str(Path("models/palm_detection.blob").resolve().absolute()))
-        palm_in = pipeline.createXLinkIn()
-        palm_in.setStreamName("palm_in")
-        palm_in.out.link(palm_nn.input)
+        if self.PalmOnDevice:
+            palm_manip = pipeline.create(dai.node.ImageManip)
+            palm_manip.initialConfig.setResizeThumbnail(self.PalmInputLength, self.PalmInputLength)
+            palm_manip.initialConfig.setFrameType(dai.ImgFrame.Type.BGR888p)
+            palm_manip.setMaxOutputFrameSize(self.PalmInputLength * self.PalmInputLength * 3)
+            palm_manip.inputImage.setQueueSize(1)
+            palm_manip.inputImage.setBlocking(False)
+            cam_color.isp.link(palm_manip.inputImage)
+            palm_manip.out.link(palm_nn.input)
+        else:
+            palm_in = pipeline.createXLinkIn()
+            palm_in.setStreamName("palm_in")
+            palm_in.out.link(palm_nn.input)
         palm_out = pipeline.createXLinkOut()
         palm_out.setStreamName("palm_out")
         palm_nn.out.link(palm_out.input)
 
         count_nn = pipeline.createNeuralNetwork()
         count_nn.setBlobPath(str(Path("models/part_counting.blob").resolve().absolute()))
-        count_in = pipeline.createXLinkIn()
-        count_in.setStreamName("count_in")
-        count_in.out.link(count_nn.input)
+        if self.CountOnDevice:
+            count_cfg_in = pipeline.createXLinkIn()
+            count_cfg_in.setStreamName("count_cfg")
+            count_manip = pipeline.create(dai.node.ImageManip)
+            count_manip.setWaitForConfigInput(True)
+            count_manip.setMaxOutputFrameSize(self.CountInputLength * self.CountInputLength * 3)
+            count_manip.inputImage.setQueueSize(1)
+            count_manip.inputImage.setBlocking(False)
+            cam_color.isp.link(count_manip.inputImage)
+            count_cfg_in.out.link(count_manip.inputConfig)
+            count_manip.out.link(count_nn.input)
+            crop_out = pipeline.createXLinkOut()
+            crop_out.setStreamName("count_crop")
+            count_manip.out.link(crop_out.input)
+        else:
+            count_in = pipeline.createXLinkIn()
+            count_in.setStreamName("count_in")
+            count_in.out.link(count_nn.input)
         count_out = pipeline.createXLinkOut()
         count_out.setStreamName("count_out")
         count_nn.out.link(count_out.input)
 
         return pipeline
-    
-    def ToPlanar(self, array, shape):
-        resized = cv2.resize(array, shape, interpolation=cv2.INTER_NEAREST).transpose(2,0,1)
-        return resized
 
+    def CountCropConfig(self, frame: np.ndarray, xMin: int, yMin: int, xMax: int, yMax: int):
+        h, w = frame.shape[:2]
+        config = dai.ImageManipConfig()
+        config.setCropRect(max(xMin, 0) / w, max(yMin, 0) / h, min(xMax, w) / w, min(yMax, h) / h)
+        config.setResize(self.CountInputLength, self.CountInputLength)
+        config.setKeepAspectRatio(False)
+        config.setFrameType(dai.ImgFrame.Type.BGR888p)
+        return config
+    
     def PalmPostprocess(self, inference):
-        anchor_options = mpu.SSDAnchorOptions(
-            num_layers=4, 
-            min_scale=0.1484375,
-            max_scale=0.75,
-            input_size_height=128,
-            input_size_width=128,
-            anchor_offset_x=0.5,
-            anchor_offset_y=0.5,
-            strides=[8, 16, 16, 16],
-            aspect_ratios= [1.0],
-            reduce_boxes_in_lowest_layer=False,
-            interpolated_scale_aspect_ratio=1.0,
-            fixed_anchor_size=True)
-
-        anchors = mpu.generate_anchors(anchor_options)
-        
-        nb_anchors = anchors.shape[0]
+        anchors = mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)
 
-        scores = np.array(inference.getLayerFp16("classificators"), dtype=np.float16) 
-        boxes = np.array(inference.getLayerFp16("regressors"), dtype=np.float16).reshape((nb_anchors, 18))
+        layers = self.PalmLayers.read(inference)
+        scores = layers["classificators"]
+        boxes = layers["regressors"]
         
-        self.regions = mpu.decode_bboxes(self.PalmScoreThreshold, scores, boxes, anchors)
-        self.regions = mpu.non_max_suppression(self.regions, self.PalmNmsThreshold)
+        palms = mpu.decode_palm_regions(self.PalmScoreThreshold, scores, boxes, anchors)
+        palms = mpu.palm_regions_nms(palms, self.PalmNmsThreshold)
 
-        mpu.detections_to_rect(self.regions)
-        mpu.rect_transformation(self.regions, self.frame_size, self.frame_size)
+        mpu.palm_regions_to_rect(palms)
+        mpu.palm_regions_transformation(palms, self.frame_size, self.frame_size)
+        self.regions = palms.to_regions()
 
     def StartMainLoop(self):
         threading.Thread(target=self.Run, daemon=True).start()
@@ -127,75 +165,102 @@ class Detection:
         device.startPipeline(self.CreatePipeline())
 
         frame_color = None
-        frame_depth = None
+        disparity = None
+        count_crop = None
 
-        q_palm_in = device.getInputQueue(name="palm_in")
+        q_palm_in = None if self.PalmOnDevice else device.getInputQueue(name="palm_in")
         q_palm_out = device.getOutputQueue(name="palm_out", maxSize=4, blocking=True)
 
-        q_count_in = device.getInputQueue(name="count_in")
+        if self.CountOnDevice:
+            q_count_in = device.getInputQueue(name="count_cfg")
+            q_count_crop = device.getOutputQueue(name="count_crop", maxSize=4, blocking=False)
+        else:
+            q_count_in = device.getInputQueue(name="count_in")
         q_count_out = device.getOutputQueue(name="count_out", maxSize=4, blocking=True)
 
-        while True:
-            latestPacket = {}
-            latestPacket["color"] = None
-            latestPacket["depth"] = None
+        palm_window = nnu.InferenceWindow(q_palm_in, q_palm_out, self.PalmRequestDepth)
+        count_window = nnu.InferenceWindow(q_count_in, q_count_out, self.CountRequestDepth,
+            sequenced=not self.CountOnDevice, counter=self.CountCounter)
+
+        reader = PacketReader()
+        for queueName in ("color", "depth"):
+            reader.attach(device.getOutputQueue(queueName, maxSize=1, blocking=False), queueName)
+        reader.watch(q_palm_out)
+        reader.watch(q_count_out)
+        if self.CountOnDevice:
+            reader.watch(q_count_crop)
 
-            queueEvents = device.getQueueEvents(("color", "depth"))
-            for queueName in queueEvents:
-                packets = device.getOutputQueue(queueName).tryGetAll()
-                if len(packets) > 0:
-                    latestPacket[queueName] = packets[-1]
+        while True:
+            latestPacket = reader.wait()
 
-            mediapipe_color = None
             counting_image = None
 
             if latestPacket["color"] is not None:
-                frame_color = latestPacket["color"].getCvFrame()
+                color = latestPacket["color"].getCvFrame()
+                self.LinkCounter.add_bytes(color.nbytes)
 
-                h, w = frame_color.shape[:2]
+                h, w = color.shape[:2]
                 self.frame_size = max(h, w)
                 self.pad_h = int((self.frame_size - h)/2)
                 self.pad_w = int((self.frame_size - w)/2)
 
-                mediapipe_color = cv2.copyMakeBorder(frame_color, self.pad_h, self.pad_h, self.pad_w, self.pad_w, cv2.BORDER_CONSTANT)
-                
-                frame_palm_nn = dai.ImgFrame()
-                frame_palm_nn.setWidth(self.PalmInputLength)
-                frame_palm_nn.setHeight(self.PalmInputLength)
-                frame_palm_nn.setData(self.ToPlanar(mediapipe_color, (self.PalmInputLength, self.PalmInputLength)))
-                q_palm_in.send(frame_palm_nn)
-                
-                palm_inference = q_palm_out.get()
+                if self.PalmOnDevice:
+                    palm_window.expect(latestPacket["color"].getSequenceNum(), color)
+                else:
+                    frame_palm_nn = dai.ImgFrame()
+                    frame_palm_nn.setWidth(self.PalmInputLength)
+                    frame_palm_nn.setHeight(self.PalmInputLength)
+                    frame_palm_nn.setData(self.PalmPlanar.resize(color))
+                    palm_window.send(frame_palm_nn, color)
+
+            for palm_color, palm_inference in palm_window.results():
+                frame_color = palm_color
+                counting_image = None
+
                 self.PalmPostprocess(palm_inference)
 
+                if len(self.regions) == 0:
+                    count_crop = None
+
                 for region in self.regions:
                     xMin, yMin, xMax, yMax = CalculatePalmRectFromRegion(frame_color, region)
-                    counting_image = frame_color[yMin:yMax, xMin:xMax]
+                    if self.CountOnDevice:
+                        if min(xMax, frame_color.shape[1]) > max(xMin, 0) and min(yMax, frame_color.shape[0]) > max(yMin, 0):
+                            count_window.send(self.CountCropConfig(frame_color, xMin, yMin, xMax, yMax))
+                    else:
+                        counting_image = frame_color[yMin:yMax, xMin:xMax]
                     break
 
                 if counting_image is not None and counting_image.any():
-                    image_count_data = self.ToPlanar(counting_image, (self.CountInputLength, self.CountInputLength))
+                    image_count_data = self.CountPlanar.resize(counting_image)
                     frame_count_nn = dai.ImgFrame()
                     frame_count_nn.setWidth(self.CountInputLength)
                     frame_count_nn.setHeight(self.CountInputLength)
                     frame_count_nn.setData(image_count_data)
-                    q_count_in.send(frame_count_nn)
-
-                    count_inference = q_count_out.get()
-
-                    if count_inference is not None:
-                        layer_names = count_inference.getAllLayerNames()
-                        layer_float = count_inference.getLayerFp16(layer_names[0])
-                        self.detections = postprocess(layer_float)
+                    count_window.send(frame_count_nn)
+                    self.LinkCounter.add_bytes(image_count_data.nbytes)
+
+            for _, count_inference in count_window.results():
+                layer_float = self.CountLayers.first(count_inference)
+                self.detections = postprocess(layer_float)
+
+            if self.CountOnDevice:
+                crops = q_count_crop.tryGetAll()
+                if len(crops) > 0:
+                    count_crop = crops[-1].getCvFrame()
+                    self.LinkCounter.add_bytes(sum(crop.getWidth() * crop.getHeight() * 3 for crop in crops))
+                counting_image = count_crop
+
+            if self.ReportStats:
+                for counter in (self.LinkCounter, self.CountCounter):
+                    report = counter.report()
+                    if report is not None:
+                        print(report)
             
             if latestPacket["depth"] is not None:
-                frame_depth = latestPacket["depth"].getFrame()
-                frame_depth = (frame_depth * 255. / self.MaxDisparity).astype(np.uint8)
-                frame_depth[frame_depth<128] = 0
-                frame_depth = cv2.applyColorMap(frame_depth, cv2.COLORMAP_JET)
-                frame_depth = np.ascontiguousarray(frame_depth)
-
-            if frame_color is not None and frame_depth is not None:
-                self.DrawImage(frame_color, frame_depth, self.regions, counting_image, self.detections)
+                disparity = latestPacket["depth"].getFrame()
+
+            if frame_color is not None and disparity is not None:
+                self.Mailbox.Publish(frame_color, disparity, self.regions, counting_image, self.detections)
                 frame_color = None
-                frame_depth = None
\ No newline at end of file
+                disparity = None
\ No newline at end of file
@@ -5,9 +5,14 @@ CONFIG_FILE_NAME = 'config.json'
 
 MAX_PICKING_ITEMS = 8
 
+DETECTION_IMAGE_SIZE = (72, 72)
+
+RENDER_INTERVAL_MS = 15
+
+# OpenCV BGR
 COLOR_CV_WHITE = (255, 255, 255)
-COLOR_CV_GREEN = (14, 168, 75)
-COLOR_CV_RED = (236, 31, 36)
+COLOR_CV_GREEN = (75, 168, 14)
+COLOR_CV_RED = (36, 31, 236)
 
 COLOR_TK_YELLOW = '#FFE61A' # (100, 90, 10)
 COLOR_TK_DEFAULT = '#F0F0F0' # 'SystemWindow'
@@ -108,4 +113,54 @@ def IsDepthInRangeZ(depth: int, lower_z: int, upper_z: int):
     hand_z = depth + 15
     lower_range = lower_z > hand_z
     upper_range = upper_z < hand_z
-    return lower_range and upper_range
\ No newline at end of file
+    return lower_range and upper_range
+
+def CalculateDetectionPanel(item_number: int, item: PickingItem, part_detections: list, slots: int):
+    item_image = str(item_number) + '_' + item.Name
+    panel = [item_image if index < item.Amount else None for index in range(slots)]
+    if part_detections is None:
+        return panel
+    count_detections = 0
+    for index, detection in enumerate(part_detections):
+        label_code = detection.Label[2:]
+        if label_code == item.Name:
+            count_detections = count_detections + 1
+            if count_detections <= item.Amount:
+                slot_image = 'ok_' + label_code
+            else:
+                slot_image = 'ko_' + label_code
+        else:
+            slot_image = 'ko_' + label_code
+        if index < slots:
+            panel[index] = slot_image
+    detections_length = len(part_detections)
+    missing_parts = item.Amount - count_detections
+    for index in range(detections_length, slots):
+        if index < detections_length + missing_parts:
+            panel[index] = item_image
+        else:
+            panel[index] = None
+    return panel
+
+def CountParts(item: PickingItem, part_detections: list):
+    ok_parts = 0
+    ko_parts = 0
+    for detection in part_detections:
+        if detection.Label[2:] == item.Name and ok_parts < item.Amount:
+            ok_parts = ok_parts + 1
+        else:
+            ko_parts = ko_parts + 1
+    return ok_parts, ko_parts, item.Amount - ok_parts
+
+def DrawPartDetections(counting_image: np.ndarray, item: PickingItem, part_detections: list):
+    h, w = counting_image.shape[:2]
+    for detection in part_detections:
+        x1 = int(w*detection.Box.Left)
+        y1 = int(h*detection.Box.Top)
+        x2 = x1 + int(w*detection.Box.Width)
+        y2 = y1 + int(h*detection.Box.Height)
+        if detection.Label[2:] == item.Name:
+            count_color = COLOR_CV_GREEN
+        else:
+            count_color = COLOR_CV_RED
+        cv2.rectangle(counting_image, (x1, y1), (x2, y2), count_color, 2)
@@ -0,0 +1,77 @@
+import os
+import cv2
+import json
+import numpy as np
+import time
+import threading
+
+class FrameMailbox:
+    def __init__(self, period: int = 10):
+        self.Condition = threading.Condition()
+        self.Frame = None
+        self.Period = period
+        self.ResetCounters(time.monotonic())
+
+    def ResetCounters(self, now: float):
+        self.Start = now
+        self.Published = 0
+        self.Dropped = 0
+
+    def Publish(self, *frame):
+        with self.Condition:
+            if self.Frame is not None:
+                self.Dropped += 1
+            self.Frame = frame
+            self.Published += 1
+            self.Condition.notify_all()
+
+    def Take(self):
+        with self.Condition:
+            frame = self.Frame
+            self.Frame = None
+        return frame
+
+    def Wait(self, timeout: float = None):
+        with self.Condition:
+            self.Condition.wait_for(lambda: self.Frame is not None, timeout)
+            frame = self.Frame
+            self.Frame = None
+        return frame
+
+    def Report(self):
+        now = time.monotonic()
+        elapsed = now - self.Start
+        if elapsed < self.Period:
+            return None
+        with self.Condition:
+            text = 'display: %.1f fps, %d dropped' % ((self.Published - self.Dropped) / elapsed, self.Dropped)
+            self.ResetCounters(now)
+        return text
+
+class HeadlessReporter:
+    def __init__(self, snapshot_dir: str = None, snapshot_period: float = 5.):
+        self.SnapshotDir = snapshot_dir
+        self.SnapshotPeriod = snapshot_period
+        self.LastSnapshot = None
+        self.LastKeys = {}
+
+    def Emit(self, event: dict):
+        event = dict(event, time=round(time.time(), 3))
+        print(json.dumps(event, default=vars), flush=True)
+
+    def EmitOnChange(self, key, event: dict):
+        if self.LastKeys.get(event['event']) != key:
+            self.LastKeys[event['event']] = key
+            self.Emit(event)
+
+    def IsSnapshotDue(self):
+        if self.SnapshotDir is None:
+            return False
+        now = time.monotonic()
+        if self.LastSnapshot is not None and now - self.LastSnapshot < self.SnapshotPeriod:
+            return False
+        self.LastSnapshot = now
+        return True
+
+    def Snapshot(self, name: str, image: np.ndarray):
+        cv2.imwrite(os.path.join(self.SnapshotDir, name + '.jpg'), image)
@@ -22,6 +22,63 @@ class Detection(Classification):
         Classification.__init__(self, label, score)
         self.Box = Boundary(x, y, w, h)
 
+class RegionDecoder():
+
+    def __init__(self, anchors, prob_threshold):
+        self.anchors = anchors
+        self.prob_threshold = prob_threshold
+        self.shapes = {}
+
+    def _prepare(self, shape):
+        channels, height, width = shape
+        num_anchor = self.anchors.shape[0]
+        cells = height * width * num_anchor
+        grid_y, grid_x, anchor = np.unravel_index(np.arange(cells), (height, width, num_anchor))
+        state = {
+            'grid_x': grid_x.astype(np.float64),
+            'grid_y': grid_y.astype(np.float64),
+            'anchor_w': self.anchors[anchor, 0] / width,
+            'anchor_h': self.anchors[anchor, 1] / height,
+            'objectness': np.empty((height * width, num_anchor), dtype=np.float32),
+            'mask': np.empty(cells, dtype=bool),
+        }
+        self.shapes[shape] = state
+        return state
+
+    def Decode(self, outputs):
+        state = self.shapes.get(outputs.shape) or self._prepare(outputs.shape)
+        channels, height, width = outputs.shape
+        num_anchor = self.anchors.shape[0]
+        outputs = outputs.reshape((num_anchor, -1, height * width))
+
+        objectness = state['objectness']
+        np.multiply(outputs[:, 4, :].T, 0.5, out=objectness)
+        self._logistic(objectness)
+        np.greater(objectness.reshape(-1), self.prob_threshold, out=state['mask'])
+        candidates = np.flatnonzero(state['mask'])
+
+        cell, anchor = np.divmod(candidates, num_anchor)
+        regions = outputs[anchor, :, cell].astype(np.float32)
+
+        x = (self._logistic(regions[:, 0] * 0.5) + state['grid_x'][candidates]) / width
+        y = (self._logistic(regions[:, 1] * 0.5) + state['grid_y'][candidates]) / height
+        w = np.exp(regions[:, 2]) * state['anchor_w'][candidates]
+        h = np.exp(regions[:, 3]) * state['anchor_h'][candidates]
+        boxes = np.stack((x - w / 2, y - h / 2, w, h), axis=-1)
+
+        class_probs = regions[:, 5:]
+        class_probs -= np.amax(class_probs, axis=1)[:, np.newaxis]
+        np.exp(class_probs, out=class_probs)
+        class_probs *= (objectness.reshape(-1)[candidates] / np.sum(class_probs, axis=1))[:, np.newaxis]
+
+        return boxes, class_probs
+
+    def _logistic(self, half_x):
+        np.tanh(half_x, out=half_x)
+        half_x *= 0.5
+        half_x += 0.5
+        return half_x
+
 class ObjectDetection():
 
     ANCHOR_BOXES = np.array([[0.573, 0.677], [1.87, 2.06], [3.34, 5.47], [7.88, 3.53], [9.77, 9.17]])
@@ -54,6 +111,8 @@ class ObjectDetection():
 
         self.images = np.ndarray(shape=(n, c, h, w))
 
+        self.decoder = RegionDecoder(self.ANCHOR_BOXES, self.prob_threshold)
+
     def Infer(self, image):
         self.images[0] = self._preprocess(image)
 
@@ -71,9 +130,7 @@ class ObjectDetection():
         return input_image
 
     def _postprocess(self, outputs):
-        outputs = np.squeeze(outputs).transpose((1,2,0)).astype(np.float32)
-
-        boxes, class_probs = self._extract_bounding_boxes(outputs)
+        boxes, class_probs = self.decoder.Decode(np.squeeze(outputs))
 
         max_probs = np.amax(class_probs, axis=1)
         index, = np.where(max_probs > self.prob_threshold)
@@ -96,41 +153,35 @@ class ObjectDetection():
 
         return predictions
 
-    def _extract_bounding_boxes(self, output):
-        num_anchor = self.ANCHOR_BOXES.shape[0]
-        height, width, channels = output.shape
-        num_class = int(channels / num_anchor) - 5
-
-        outputs = output.reshape((height, width, num_anchor, -1))
-
-        x = (self._logistic(outputs[..., 0]) + np.arange(width)[np.newaxis, :, np.newaxis]) / width
-        y = (self._logistic(outputs[..., 1]) + np.arange(height)[:, np.newaxis, np.newaxis]) / height
-        w = np.exp(outputs[..., 2]) * self.ANCHOR_BOXES[:, 0][np.newaxis, np.newaxis, :] / width
-        h = np.exp(outputs[..., 3]) * self.ANCHOR_BOXES[:, 1][np.newaxis, np.newaxis, :] / height
-
-        x = x - w / 2
-        y = y - h / 2
-        boxes = np.stack((x, y, w, h), axis=-1).reshape(-1, 4)
-
-        objectness = self._logistic(outputs[..., 4])
-
-        class_probs = outputs[..., 5:]
-        class_probs = np.exp(class_probs - np.amax(class_probs, axis=3)[..., np.newaxis])
-        class_probs = class_probs / np.sum(class_probs, axis=3)[..., np.newaxis] * objectness[..., np.newaxis]
-        class_probs = class_probs.reshape(-1, num_class)
-
-        return (boxes, class_probs)
-
-    def _logistic(self, x):
-        return np.where(x > 0, 1 / (1 + np.exp(-x)), np.exp(x) / (1 + np.exp(x)))
-
     def _non_maximum_suppression(self, boxes, class_probs):
         max_detections = min(self.max_detections, len(boxes))
         max_probs = np.amax(class_probs, axis=1)
+
+        candidates, = np.where(max_probs >= self.prob_threshold)
+        if len(candidates) == 0:
+            return [], [], []
+
+        boxes = boxes[candidates]
+        class_probs = class_probs[candidates]
+        max_probs = max_probs[candidates]
         max_classes = np.argmax(class_probs, axis=1)
 
         areas = boxes[:, 2] * boxes[:, 3]
 
+        x1 = np.maximum(boxes[:, None, 0], boxes[:, 0])
+        y1 = np.maximum(boxes[:, None, 1], boxes[:, 1])
+        x2 = np.minimum(boxes[:, None, 0] + boxes[:, None, 2], boxes[:, 0] + boxes[:, 2])
+        y2 = np.minimum(boxes[:, None, 1] + boxes[:, None, 3], boxes[:, 1] + boxes[:, 3])
+        w = np.maximum(0, x2 - x1)
+        h = np.maximum(0, y2 - y1)
+
+        overlap_area = w * h
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iou = overlap_area / (areas[:, None] + areas - overlap_area)
+
+        overlapping = iou > self.IOU_THRESHOLD
+        np.fill_diagonal(overlapping, True)
+
         selected_boxes = []
         selected_classes = []
         selected_probs = []
@@ -144,22 +195,7 @@ class ObjectDetection():
             selected_classes.append(max_classes[i])
             selected_probs.append(max_probs[i])
 
-            box = boxes[i]
-            other_indices = np.concatenate((np.arange(i), np.arange(i + 1, len(boxes))))
-            other_boxes = boxes[other_indices]
-
-            x1 = np.maximum(box[0], other_boxes[:, 0])
-            y1 = np.maximum(box[1], other_boxes[:, 1])
-            x2 = np.minimum(box[0] + box[2], other_boxes[:, 0] + other_boxes[:, 2])
-            y2 = np.minimum(box[1] + box[3], other_boxes[:, 1] + other_boxes[:, 3])
-            w = np.maximum(0, x2 - x1)
-            h = np.maximum(0, y2 - y1)
-
-            overlap_area = w * h
-            iou = overlap_area / (areas[i] + areas[other_indices] - overlap_area)
-
-            overlapping_indices = other_indices[np.where(iou > self.IOU_THRESHOLD)[0]]
-            overlapping_indices = np.append(overlapping_indices, i)
+            overlapping_indices = overlapping[i]
 
             class_probs[overlapping_indices, max_classes[i]] = 0
             max_probs[overlapping_indices] = np.amax(class_probs[overlapping_indices], axis=1)
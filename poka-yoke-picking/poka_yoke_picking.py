@@ -1,5 +1,6 @@
 import os
 import json
+import argparse
 import cv2
 import numpy as np
 from tkinter import *
@@ -9,12 +10,14 @@ from PIL import ImageTk
 from PIL import Image as PIL_Image
 from utils.picking_utils import *
 from utils.detection_utils import *
+from utils.mailbox_utils import *
 from utils.drawing_utils import *
 
 class PokaYokePicking():
     def __init__(self, json: list):
         self.Window = Window()
-        self.Detection = Detection(self.DrawImage)
+        self.Detection = Detection()
+        self.VideoSurface = DisplaySurface(self.Window.VideoLabel)
 
         self.SetAllAttributes()
         self.SetAllIconImages()
@@ -31,6 +34,8 @@ class PokaYokePicking():
         self.EditItem = None
         self.MouseX = None
         self.MouseY = None
+        self.OverlayItems = None
+        self.EditingState = None
         # widgets lists
         self.OrderButtons = []
         self.ImageLabels = []
@@ -87,6 +92,23 @@ class PokaYokePicking():
         self.AmountValues.append(StringVar(value=''))
         self.RectValues.append(BooleanVar(value=False))
         self.DepthValues.append(BooleanVar(value=False))
+        self.EyeValues[-1].trace_add('write', self.InvalidateOverlay)
+        self.BulbValues[-1].trace_add('write', self.InvalidateOverlay)
+        self.EditValues[-1].trace_add('write', self.InvalidateOverlay)
+
+    def InvalidateOverlay(self, *_):
+        self.OverlayItems = None
+        self.EditingState = None
+
+    def GetOverlayItems(self):
+        if self.OverlayItems is None:
+            self.OverlayItems = []
+            for index, item in enumerate(self.PickingItems):
+                rect = item.Rect if self.EyeValues[index].get() else None
+                depth = item.Depth if self.BulbValues[index].get() else None
+                if rect is not None or depth is not None:
+                    self.OverlayItems.append((rect, depth))
+        return self.OverlayItems
 
     def SetAllIconImages(self):
         self.OrderOnIcon = PhotoImage(file='./assets/icon-check-on.png')
@@ -384,6 +406,7 @@ class PokaYokePicking():
         del self.DepthValues[index]
     
     def SaveConfigurationFile(self):
+        self.InvalidateOverlay()
         with open(CONFIG_FILE_NAME, 'w') as json_file:
             json.dump(self.PickingItems, json_file, cls=CustomEncoder, indent=4)
             json_file.close()
@@ -546,13 +569,14 @@ class PokaYokePicking():
         self.MoveSettingsInterface(index, new_index)
 
     def IsAnyItemBeingEdited(self):
-        boolean_list = [value.get() for value in self.EditValues]
-        editing_item = True in boolean_list
-        if editing_item:
-            item_index = boolean_list.index(editing_item)
-            return editing_item, item_index
-        else:
-            return editing_item, None
+        if self.EditingState is None:
+            boolean_list = [value.get() for value in self.EditValues]
+            editing_item = True in boolean_list
+            if editing_item:
+                self.EditingState = editing_item, boolean_list.index(editing_item)
+            else:
+                self.EditingState = editing_item, None
+        return self.EditingState
 
     def CaptureMouseMotionEvent(self, event: EventType):
         editing, _ = self.IsAnyItemBeingEdited()
@@ -586,14 +610,12 @@ class PokaYokePicking():
     def GetBlendedImage(self, color_image: np.ndarray, depth_image: np.ndarray):
         blend_depth = self.BlendValue.get() / 100
         blend_color = 1 - blend_depth
+        frame_color = color_image
         if len(color_image.shape) < 3:
-            frame_color = cv2.cvtColor(color_image, cv2.COLOR_GRAY2RGB)
-        else:
-            frame_color = cv2.cvtColor(color_image, cv2.COLOR_BGR2RGB)
+            frame_color = cv2.cvtColor(color_image, cv2.COLOR_GRAY2BGR)
+        frame_depth = depth_image
         if len(depth_image.shape) < 3:
-            frame_depth = cv2.cvtColor(depth_image, cv2.COLOR_GRAY2RGB)
-        else:
-            frame_depth = cv2.cvtColor(depth_image, cv2.COLOR_BGR2RGB)
+            frame_depth = cv2.cvtColor(depth_image, cv2.COLOR_GRAY2BGR)
         blended_image = cv2.addWeighted(frame_color, blend_color, frame_depth, blend_depth, 0)
         return blended_image
 
@@ -603,28 +625,41 @@ class PokaYokePicking():
         self.BlendValue = IntVar(value=50)
         Scale(self.Window.StreamingFrame, from_=0, to=100, orient=HORIZONTAL, showvalue=0, variable=self.BlendValue).place(w=545, h=22, x=45, y=446)
 
-    def DrawImage(self, color_image: np.ndarray, depth_image: np.ndarray, hand_regions: list):
+    def StartRenderLoop(self):
+        self.Window.Root.after(RENDER_INTERVAL_MS, self.RenderFrame)
+
+    def RenderFrame(self):
+        frame = self.Detection.Mailbox.Take()
+        if frame is not None:
+            color_image, depth_statistics, hand_regions = frame
+            depth_image = self.Detection.DepthColorizer.colorize(depth_statistics.frame)
+            self.DrawImage(color_image, depth_image, depth_statistics, hand_regions)
+        if self.Detection.ReportStats:
+            report = self.Detection.Mailbox.Report()
+            if report is not None:
+                print(report)
+        self.Window.Root.after(RENDER_INTERVAL_MS, self.RenderFrame)
+
+    def DrawImage(self, color_image: np.ndarray, depth_image: np.ndarray, depth_statistics: DepthStatistics, hand_regions: list):
         blended_image = self.GetBlendedImage(color_image, depth_image)
 
-        for index, item in enumerate(self.PickingItems):
-            if self.EyeValues[index].get():
-                if item.Rect is not None:
-                    top_l = item.Rect.TopLeft
-                    bot_r = item.Rect.BottomRight
-                    if top_l is not None:
-                        if bot_r is not None:
-                            cv2.rectangle(blended_image, (top_l.X, top_l.Y), (bot_r.X, bot_r.Y), COLOR_CV_WHITE, 1)
-                        else:
-                            cv2.drawMarker(blended_image, (top_l.X, top_l.Y), COLOR_CV_WHITE, cv2.MARKER_CROSS, 24, 1)
-            if self.BulbValues[index].get():
-                if item.Depth is not None:
-                    lower = item.Depth.LowerLevel
-                    upper = item.Depth.UpperLevel
-                    if lower is not None:
-                        if upper is not None:
-                            cv2.arrowedLine(blended_image, (lower.X, lower.Y), (upper.X, upper.Y), COLOR_CV_WHITE, 1)
-                        else:
-                            cv2.circle(blended_image, (lower.X, lower.Y), 12, COLOR_CV_WHITE, 1)
+        for rect, depth in self.GetOverlayItems():
+            if rect is not None:
+                top_l = rect.TopLeft
+                bot_r = rect.BottomRight
+                if top_l is not None:
+                    if bot_r is not None:
+                        cv2.rectangle(blended_image, (top_l.X, top_l.Y), (bot_r.X, bot_r.Y), COLOR_CV_WHITE, 1)
+                    else:
+                        cv2.drawMarker(blended_image, (top_l.X, top_l.Y), COLOR_CV_WHITE, cv2.MARKER_CROSS, 24, 1)
+            if depth is not None:
+                lower = depth.LowerLevel
+                upper = depth.UpperLevel
+                if lower is not None:
+                    if upper is not None:
+                        cv2.arrowedLine(blended_image, (lower.X, lower.Y), (upper.X, upper.Y), COLOR_CV_WHITE, 1)
+                    else:
+                        cv2.circle(blended_image, (lower.X, lower.Y), 12, COLOR_CV_WHITE, 1)
 
         editing, index = self.IsAnyItemBeingEdited()
         if editing:
@@ -654,52 +689,73 @@ class PokaYokePicking():
                         cv2.line(blended_image, (lower.X, lower.Y), (self.MouseX, self.MouseY), COLOR_CV_WHITE, 1)
 
         if self.CurrentItem is not None:
-            hand_color = COLOR_CV_WHITE
-            x_color = COLOR_CV_WHITE
-            y_color = COLOR_CV_WHITE
-            z_color = COLOR_CV_WHITE
             current_rect = self.PickingItems[self.CurrentItem].Rect
             current_point1 = (current_rect.TopLeft.X, current_rect.TopLeft.Y)
             current_point2 = (current_rect.BottomRight.X, current_rect.BottomRight.Y)
-            cv2.rectangle(blended_image, current_point1, current_point2, hand_color, 2)
+            cv2.rectangle(blended_image, current_point1, current_point2, COLOR_CV_WHITE, 2)
             if self.CurrentLowerZ is None and self.CurrentUpperZ is None:
                 current_depth = self.PickingItems[self.CurrentItem].Depth
-                self.CurrentLowerZ, self.CurrentUpperZ = CalculateDepthRange(depth_image, current_depth)
+                self.CurrentLowerZ, self.CurrentUpperZ = CalculateDepthRange(depth_statistics, current_depth)
             for region in hand_regions:
-                xMin, yMin, xMax, yMax = CalculateRectFromRegion(blended_image, region)
-                if IsRectInsideItemRect(current_rect, xMin, yMin, xMax, yMax):
-                    hand_color = COLOR_CV_GREEN
-                else:
-                    hand_color = COLOR_CV_RED
-                x_point, y_point, z_point = CalculateTextPoints(xMin, yMin, xMax, yMax)
-                if IsRectInRangeX(current_rect, xMin, xMax):
-                    x_color = COLOR_CV_GREEN
-                else:
-                    x_color = COLOR_CV_RED
-                if IsRectInRangeY(current_rect, yMin, yMax):
-                    y_color = COLOR_CV_GREEN
-                else:
-                    y_color = COLOR_CV_RED
-                depth_value = CalculateDepthFromCoords(depth_image, xMin, yMin, xMax, yMax)
-                if IsDepthInRangeZ(depth_value, self.CurrentLowerZ, self.CurrentUpperZ):
-                    z_color = COLOR_CV_GREEN
-                else:
-                    z_color = COLOR_CV_RED
-                blended_image_copy = blended_image.copy()
-                cv2.rectangle(blended_image_copy, (xMin, yMin), (xMax, yMax), z_color, cv2.FILLED)
-                blended_image = cv2.addWeighted(blended_image, 0.8, blended_image_copy, 0.2, 0)
-                cv2.rectangle(blended_image, (xMin, yMin), (xMax, yMax), hand_color, 2)
-                cv2.putText(blended_image, 'X', x_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, x_color, 1)
-                cv2.putText(blended_image, 'Y', y_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, y_color, 1)
-                cv2.putText(blended_image, 'Z', z_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, z_color, 1)
-
-        pil_image = PIL_Image.fromarray(blended_image)
-        image_tk = ImageTk.PhotoImage(image=pil_image)
-        self.Window.VideoLabel.configure(image=image_tk)
-        self.Window.VideoLabel.image_tk = image_tk
-        self.Window.VideoLabel['image'] = image_tk
+                hand = HandValidation(blended_image, region, current_rect, depth_statistics, self.CurrentLowerZ, self.CurrentUpperZ)
+                DrawHandValidation(blended_image, hand)
+
+        self.VideoSurface.Show(blended_image)
+
+class HeadlessPicking:
+    def __init__(self, json: list, item: int, reporter: HeadlessReporter):
+        self.Detection = Detection()
+        self.Reporter = reporter
+        self.PickingItems = [pick for pick in map(PickingItemFromJson, json) if pick is not None]
+        if not 0 < item <= len(self.PickingItems):
+            raise ValueError('Picking item %d does not exist in %s' % (item, CONFIG_FILE_NAME))
+        self.CurrentItem = self.PickingItems[item - 1]
+        if self.CurrentItem.Rect is None or self.CurrentItem.Rect.BottomRight is None:
+            raise ValueError('Picking item %s has no area' % self.CurrentItem.Name)
+        if self.CurrentItem.Depth is None or self.CurrentItem.Depth.UpperLevel is None:
+            raise ValueError('Picking item %s has no depth levels' % self.CurrentItem.Name)
+        self.CurrentLowerZ = None
+        self.CurrentUpperZ = None
+
+    def Run(self):
+        self.Detection.StartMainLoop()
+        while True:
+            self.Validate(*self.Detection.Mailbox.Wait())
+
+    def Validate(self, color_image: np.ndarray, depth_statistics: DepthStatistics, hand_regions: list):
+        if self.CurrentLowerZ is None and self.CurrentUpperZ is None:
+            self.CurrentLowerZ, self.CurrentUpperZ = CalculateDepthRange(depth_statistics, self.CurrentItem.Depth)
+        current_rect = self.CurrentItem.Rect
+        hands = [HandValidation(color_image, region, current_rect, depth_statistics, self.CurrentLowerZ, self.CurrentUpperZ)
+            for region in hand_regions]
+        key = [(hand.InsideRect, hand.InRangeX, hand.InRangeY, hand.InRangeZ) for hand in hands]
+        self.Reporter.EmitOnChange(key, {
+            'event': 'picking',
+            'item': self.CurrentItem.Name,
+            'picking': any(hand.IsPicking() for hand in hands),
+            'hands': hands})
+        if self.Reporter.IsSnapshotDue():
+            snapshot = color_image.copy()
+            cv2.rectangle(snapshot, (current_rect.TopLeft.X, current_rect.TopLeft.Y),
+                (current_rect.BottomRight.X, current_rect.BottomRight.Y), COLOR_CV_WHITE, 2)
+            for hand in hands:
+                DrawHandValidation(snapshot, hand)
+            self.Reporter.Snapshot('picking', snapshot)
 
 def Main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+                        help='Validate without the Tk interface and print JSON events')
+    parser.add_argument('--item', default=1, type=int,
+                        help='Order of the picking item validated in headless mode (default=%(default)s)')
+    parser.add_argument('--snapshot_dir', default=None, type=str,
+                        help='Folder where headless mode writes annotated frames (default=%(default)s)')
+    parser.add_argument('--snapshot_period', default=5., type=float,
+                        help='Seconds between annotated frames in headless mode (default=%(default)s)')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print display rates and dropped frames every ten seconds')
+    args = parser.parse_args()
+
     if os.path.isfile(CONFIG_FILE_NAME):
         with open(CONFIG_FILE_NAME, 'r') as json_file:
             config_data = json.load(json_file)
@@ -711,8 +767,15 @@ def Main():
             json_file.write(default_json)
             json_file.close()
 
+    if args.headless:
+        reporter = HeadlessReporter(args.snapshot_dir, args.snapshot_period)
+        HeadlessPicking(config_data, args.item, reporter).Run()
+        return
+
     picking_poka_yoke = PokaYokePicking(config_data)
+    picking_poka_yoke.Detection.ReportStats = args.stats
     picking_poka_yoke.Detection.StartMainLoop()
+    picking_poka_yoke.StartRenderLoop()
     picking_poka_yoke.Window.StartMainLoop()
 
 if __name__ == '__main__':
@@ -3,16 +3,25 @@ import numpy as np
 import threading
 import depthai as dai
 import utils.mediapipe_utils as mpu
+import utils.nn_utils as nnu
+from utils.packet_utils import PacketReader
+from utils.mailbox_utils import FrameMailbox
 from pathlib import Path
+from utils.depth_utils import DepthStatistics, DisparityColorizer
 
 class Detection:
-    def __init__(self, drawImage: classmethod):
-        self.DrawImage = drawImage
+    def __init__(self):
+        self.Mailbox = FrameMailbox()
         self.QueueNames = []
+        self.ReportStats = False
 
         self.PalmInputLength = 128
+        self.PalmOnDevice = True
         self.PalmScoreThreshold = 0.6
         self.PalmNmsThreshold = 0.3
+        self.PalmRequestDepth = 2
+        self.PalmPlanar = nnu.PlanarResizer(self.PalmInputLength)
+        self.PalmLayers = nnu.LayerReader({"regressors": (len(mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)), 18)})
 
     def CreatePipeline(self):
         pipeline = dai.Pipeline()
@@ -54,6 +63,7 @@ class Detection:
         stereo_depth.setDepthAlign(dai.CameraBoardSocket.RGB)
         
         self.MaxDisparity = stereo_depth.initialConfig.getMaxDisparity()
+        self.DepthColorizer = DisparityColorizer(self.MaxDisparity, threshold=0)
 
         cam_color.isp.link(color_out.input)
         cam_left.out.link(stereo_depth.left)
@@ -62,46 +72,38 @@ class Detection:
 
         palm_nn = pipeline.createNeuralNetwork()
         palm_nn.setBlobPath(str(Path("models/palm_detection.blob").resolve().absolute()))
-        palm_in = pipeline.createXLinkIn()
-        palm_in.setStreamName("palm_in")
-        palm_in.out.link(palm_nn.input)
+        if self.PalmOnDevice:
+            palm_manip = pipeline.create(dai.node.ImageManip)
+            palm_manip.initialConfig.setResizeThumbnail(self.PalmInputLength, self.PalmInputLength)
+            palm_manip.initialConfig.setFrameType(dai.ImgFrame.Type.BGR888p)
+            palm_manip.setMaxOutputFrameSize(self.PalmInputLength * self.PalmInputLength * 3)
+            palm_manip.inputImage.setQueueSize(1)
+            palm_manip.inputImage.setBlocking(False)
+            cam_color.isp.link(palm_manip.inputImage)
+            palm_manip.out.link(palm_nn.input)
+        else:
+            palm_in = pipeline.createXLinkIn()
+            palm_in.setStreamName("palm_in")
+            palm_in.out.link(palm_nn.input)
         palm_out = pipeline.createXLinkOut()
         palm_out.setStreamName("palm_out")
         palm_nn.out.link(palm_out.input)
 
         return pipeline
     
-    def ToPlanar(self, array, shape):
-        resized = cv2.resize(array, shape, interpolation=cv2.INTER_NEAREST).transpose(2,0,1)
-        return resized
-
     def PalmPostprocess(self, inference):
-        anchor_options = mpu.SSDAnchorOptions(
-            num_layers=4, 
-            min_scale=0.1484375,
-            max_scale=0.75,
-            input_size_height=128,
-            input_size_width=128,
-            anchor_offset_x=0.5,
-            anchor_offset_y=0.5,
-            strides=[8, 16, 16, 16],
-            aspect_ratios= [1.0],
-            reduce_boxes_in_lowest_layer=False,
-            interpolated_scale_aspect_ratio=1.0,
-            fixed_anchor_size=True)
-
-        anchors = mpu.generate_anchors(anchor_options)
-        
-        nb_anchors = anchors.shape[0]
+        anchors = mpu.get_anchors(mpu.PALM_ANCHOR_OPTIONS)
 
-        scores = np.array(inference.getLayerFp16("classificators"), dtype=np.float16) 
-        boxes = np.array(inference.getLayerFp16("regressors"), dtype=np.float16).reshape((nb_anchors, 18))
+        layers = self.PalmLayers.read(inference)
+        scores = layers["classificators"]
+        boxes = layers["regressors"]
         
-        self.regions = mpu.decode_bboxes(self.PalmScoreThreshold, scores, boxes, anchors)
-        self.regions = mpu.non_max_suppression(self.regions, self.PalmNmsThreshold)
+        palms = mpu.decode_palm_regions(self.PalmScoreThreshold, scores, boxes, anchors)
+        palms = mpu.palm_regions_nms(palms, self.PalmNmsThreshold)
 
-        mpu.detections_to_rect(self.regions)
-        mpu.rect_transformation(self.regions, self.frame_size, self.frame_size)
+        mpu.palm_regions_to_rect(palms)
+        mpu.palm_regions_transformation(palms, self.frame_size, self.frame_size)
+        self.regions = palms.to_regions()
 
     def StartMainLoop(self):
         threading.Thread(target=self.Run, daemon=True).start()
@@ -111,51 +113,46 @@ class Detection:
         device.startPipeline()
 
         frame_color = None
-        frame_depth = None
+        depth_statistics = None
 
-        q_palm_in = device.getInputQueue(name="palm_in")
+        q_palm_in = None if self.PalmOnDevice else device.getInputQueue(name="palm_in")
         q_palm_out = device.getOutputQueue(name="palm_out", maxSize=4, blocking=True)
 
-        while True:
-            latestPacket = {}
-            latestPacket["color"] = None
-            latestPacket["depth"] = None
+        palm_window = nnu.InferenceWindow(q_palm_in, q_palm_out, self.PalmRequestDepth)
 
-            queueEvents = device.getQueueEvents(("color", "depth"))
-            for queueName in queueEvents:
-                packets = device.getOutputQueue(queueName).tryGetAll()
-                if len(packets) > 0:
-                    latestPacket[queueName] = packets[-1]
+        reader = PacketReader()
+        for queueName in ("color", "depth"):
+            reader.attach(device.getOutputQueue(queueName, maxSize=1, blocking=False), queueName)
+        reader.watch(q_palm_out)
 
-            copiaColor = None
+        while True:
+            latestPacket = reader.wait()
 
             if latestPacket["color"] is not None:
-                frame_color = latestPacket["color"].getCvFrame()
+                color = latestPacket["color"].getCvFrame()
 
-                h, w = frame_color.shape[:2]
+                h, w = color.shape[:2]
                 self.frame_size = max(h, w)
                 self.pad_h = int((self.frame_size - h)/2)
                 self.pad_w = int((self.frame_size - w)/2)
 
-                copiaColor = cv2.copyMakeBorder(frame_color, self.pad_h, self.pad_h, self.pad_w, self.pad_w, cv2.BORDER_CONSTANT)
-                
-                frame_nn = dai.ImgFrame()
-                frame_nn.setWidth(self.PalmInputLength)
-                frame_nn.setHeight(self.PalmInputLength)
-                frame_nn.setData(self.ToPlanar(copiaColor, (self.PalmInputLength, self.PalmInputLength)))
-                q_palm_in.send(frame_nn)
-                
-                inference = q_palm_out.get()
+                if self.PalmOnDevice:
+                    palm_window.expect(latestPacket["color"].getSequenceNum(), color)
+                else:
+                    frame_nn = dai.ImgFrame()
+                    frame_nn.setWidth(self.PalmInputLength)
+                    frame_nn.setHeight(self.PalmInputLength)
+                    frame_nn.setData(self.PalmPlanar.resize(color))
+                    palm_window.send(frame_nn, color)
+
+            for palm_color, inference in palm_window.results():
+                frame_color = palm_color
                 self.PalmPostprocess(inference)
             
             if latestPacket["depth"] is not None:
-                frame_depth = latestPacket["depth"].getFrame()
-                frame_depth = (frame_depth * 255. / self.MaxDisparity).astype(np.uint8)
-                frame_depth[frame_depth<128] = 0
-                frame_depth = cv2.applyColorMap(frame_depth, cv2.COLORMAP_JET)
-                frame_depth = np.ascontiguousarray(frame_depth)
-
-            if frame_color is not None and frame_depth is not None:
-                self.DrawImage(frame_color, frame_depth, self.regions)
+                depth_statistics = DepthStatistics(latestPacket["depth"].getFrame())
+
+            if frame_color is not None and depth_statistics is not None:
+                self.Mailbox.Publish(frame_color, depth_statistics, self.regions)
                 frame_color = None
-                frame_depth = None
\ No newline at end of file
+                depth_statistics = None
@@ -1,13 +1,17 @@
 from utils.picking_utils import *
 from utils.mediapipe_utils import *
+from utils.depth_utils import DepthStatistics
 
 CONFIG_FILE_NAME = 'config.json'
 
 MAX_PICKING_ITEMS = 8
 
+RENDER_INTERVAL_MS = 15
+
+# OpenCV BGR
 COLOR_CV_WHITE = (255, 255, 255)
-COLOR_CV_GREEN = (14, 168, 75)
-COLOR_CV_RED = (236, 31, 36)
+COLOR_CV_GREEN = (75, 168, 14)
+COLOR_CV_RED = (36, 31, 236)
 
 COLOR_TK_YELLOW = '#FFE61A' # (100, 90, 10)
 COLOR_TK_DEFAULT = '#F0F0F0' # 'SystemWindow'
@@ -15,6 +19,8 @@ COLOR_TK_WHITE = '#FFF' # 'white'
 
 DEFAULT_NAME = 'NewItem#'
 
+DEPTH_MARGIN_Z = 6
+
 FONT_TK_BOLD = ('arial', 12, 'bold')
 FONT_TK_NORMAL = ('arial', 12, 'normal')
 
@@ -60,14 +66,8 @@ def CalculateRectFromRegion(color_image: np.ndarray, region: HandRegion):
     xMin, yMin, xMax, yMax = GetRoiByPercent(0.5, x1, y1, x2, y2)
     return xMin, yMin, xMax, yMax
 
-def CalculateDepthFromCoords(depth_image: np.ndarray, xMin: int, yMin: int, xMax: int, yMax: int):
-    depth_roi = depth_image[yMin:yMax, xMin:xMax]
-    float_mean = np.mean(depth_roi[True])
-    if np.isnan(float_mean):
-        average_depth = None
-    else:
-        average_depth = int(float_mean)
-    return average_depth
+def CalculateDepthFromCoords(depth_statistics: DepthStatistics, xMin: int, yMin: int, xMax: int, yMax: int):
+    return depth_statistics.mean(xMin, yMin, xMax, yMax)
 
 def CalculateTextPoints(xMin: int, yMin: int, xMax: int, yMax: int):
     centroid_x = int((xMax - xMin) / 2) + xMin
@@ -77,11 +77,37 @@ def CalculateTextPoints(xMin: int, yMin: int, xMax: int, yMax: int):
     point_z = (centroid_x + 5, centroid_y + 4)
     return point_x, point_y, point_z
 
-def CalculateDepthRange(depth_image: np.ndarray, current_depth: Depth):
+def DrawTranslucentRect(image: np.ndarray, xMin: int, yMin: int, xMax: int, yMax: int, color: tuple, alpha: float):
+    h, w = image.shape[:2]
+    x1, x2 = max(min(xMin, xMax), 0), min(max(xMin, xMax) + 1, w)
+    y1, y2 = max(min(yMin, yMax), 0), min(max(yMin, yMax) + 1, h)
+    if x1 >= x2 or y1 >= y2:
+        return
+    roi = image[y1:y2, x1:x2]
+    fill = np.empty_like(roi)
+    fill[:] = color
+    cv2.addWeighted(roi, 1 - alpha, fill, alpha, 0, dst=roi)
+
+def GetValidationColor(valid: bool):
+    if valid:
+        return COLOR_CV_GREEN
+    return COLOR_CV_RED
+
+def DrawHandValidation(image: np.ndarray, hand):
+    xMin, yMin, xMax, yMax = hand.Rect
+    x_point, y_point, z_point = CalculateTextPoints(xMin, yMin, xMax, yMax)
+    z_color = GetValidationColor(hand.InRangeZ)
+    DrawTranslucentRect(image, xMin, yMin, xMax, yMax, z_color, 0.2)
+    cv2.rectangle(image, (xMin, yMin), (xMax, yMax), GetValidationColor(hand.InsideRect), 2)
+    cv2.putText(image, 'X', x_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, GetValidationColor(hand.InRangeX), 1)
+    cv2.putText(image, 'Y', y_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, GetValidationColor(hand.InRangeY), 1)
+    cv2.putText(image, 'Z', z_point, cv2.FONT_HERSHEY_DUPLEX, 0.4, z_color, 1)
+
+def CalculateDepthRange(depth_statistics: DepthStatistics, current_depth: Depth):
     min_x1, min_y1, min_x2, min_y2 = GetRoiByRadius(10, current_depth.LowerLevel)
     max_x1, max_y1, max_x2, max_y2 = GetRoiByRadius(10, current_depth.UpperLevel)
-    min_depth = CalculateDepthFromCoords(depth_image, min_x1, min_y1, min_x2, min_y2)
-    max_depth = CalculateDepthFromCoords(depth_image, max_x1, max_y1, max_x2, max_y2)
+    min_depth = depth_statistics.median(min_x1, min_y1, min_x2, min_y2)
+    max_depth = depth_statistics.median(max_x1, max_y1, max_x2, max_y2)
     return min_depth, max_depth
 
 def IsRectInRangeX(rect: Rect, x1: int, x2: int):
@@ -99,8 +125,23 @@ def IsRectInsideItemRect(rect: Rect, x1: int, y1: int, x2: int, y2: int):
     bot_right_value = rect.BottomRight.X > x2 and rect.BottomRight.Y > y2
     return top_left_value and bot_right_value
 
-def IsDepthInRangeZ(depth: int, lower_z: int, upper_z: int):
-    hand_z = depth + 15
-    lower_range = lower_z > hand_z
-    upper_range = upper_z < hand_z
-    return lower_range and upper_range
\ No newline at end of file
+def IsDepthInRangeZ(depth: float, lower_z: int, upper_z: int):
+    if depth is None or lower_z is None or upper_z is None:
+        return False
+    hand_z = depth - DEPTH_MARGIN_Z
+    lower_range = lower_z < hand_z
+    upper_range = upper_z > hand_z
+    return lower_range and upper_range
+
+class HandValidation:
+    def __init__(self, color_image: np.ndarray, region: HandRegion, current_rect: Rect, depth_statistics: DepthStatistics, lower_z: int, upper_z: int):
+        self.Rect = CalculateRectFromRegion(color_image, region)
+        xMin, yMin, xMax, yMax = self.Rect
+        self.Depth = CalculateDepthFromCoords(depth_statistics, xMin, yMin, xMax, yMax)
+        self.InsideRect = IsRectInsideItemRect(current_rect, xMin, yMin, xMax, yMax)
+        self.InRangeX = IsRectInRangeX(current_rect, xMin, xMax)
+        self.InRangeY = IsRectInRangeY(current_rect, yMin, yMax)
+        self.InRangeZ = IsDepthInRangeZ(self.Depth, lower_z, upper_z)
+
+    def IsPicking(self):
+        return self.InsideRect and self.InRangeZ
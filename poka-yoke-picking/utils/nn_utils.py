@@ -0,0 +1,160 @@
+import cv2
+import time
+import numpy as np
+from collections import deque
+
+class LayerReader:
+    def __init__(self, shapes={}):
+        self.shapes = dict(shapes)
+        self.layers = None
+        self.size = None
+
+    def cache_layers(self, inference):
+        self.layers = {}
+        self.size = len(inference.getData())
+        for tensor in inference.getAllLayers():
+            count = int(np.prod(tensor.dims))
+            shape = self.shapes.get(tensor.name, (count,))
+            self.layers[tensor.name] = (tensor.offset, tensor.offset + count * 2, shape)
+
+    def read(self, inference):
+        data = inference.getData()
+        if self.layers is None or len(data) != self.size:
+            self.cache_layers(inference)
+        return {name: data[start:end].view(np.float16).reshape(shape)
+                for name, (start, end, shape) in self.layers.items()}
+
+    def first(self, inference):
+        return next(iter(self.read(inference).values()))
+
+class InferenceWindow:
+    def __init__(self, queue_in, queue_out, depth=2, sequenced=True, counter=None):
+        self.queue_in = queue_in
+        self.queue_out = queue_out
+        self.depth = depth
+        self.sequenced = sequenced
+        self.counter = counter
+        self.sequence = 0
+        self.pending = deque()
+
+    def send(self, message, context=None):
+        if self.sequenced:
+            message.setSequenceNum(self.sequence)
+        self.expect(self.sequence, context)
+        self.sequence += 1
+        self.queue_in.send(message)
+
+    def expect(self, sequence, context=None):
+        self.pending.append((sequence, context, time.monotonic()))
+
+    def results(self):
+        while self.pending:
+            if len(self.pending) >= self.depth:
+                inference = self.queue_out.get()
+            else:
+                inference = self.queue_out.tryGet()
+            if inference is None:
+                break
+            request = self.match(inference)
+            if request is not None:
+                yield request[1], inference
+
+    def drain(self):
+        while self.pending:
+            inference = self.queue_out.get()
+            request = self.match(inference)
+            if request is not None:
+                yield request[1], inference
+
+    def match(self, inference):
+        if self.sequenced:
+            sequence = inference.getSequenceNum()
+        else:
+            sequence = self.pending[0][0]
+        while self.pending and self.pending[0][0] < sequence:
+            self.pending.popleft()
+        if not self.pending or self.pending[0][0] != sequence:
+            return None
+        request = self.pending.popleft()
+        if self.counter is not None:
+            self.counter.add_latency(time.monotonic() - request[2])
+        return request
+
+class TransferCounter:
+    def __init__(self, name, period=10):
+        self.name = name
+        self.period = period
+        self.reset(time.monotonic())
+
+    def reset(self, now):
+        self.start = now
+        self.bytes = 0
+        self.latency = 0.
+        self.requests = 0
+
+    def add_bytes(self, count):
+        self.bytes += count
+
+    def add_latency(self, seconds):
+        self.latency += seconds
+        self.requests += 1
+
+    def report(self):
+        now = time.monotonic()
+        elapsed = now - self.start
+        if elapsed < self.period:
+            return None
+        text = '%s: %.2f MB/s' % (self.name, self.bytes / elapsed / 1e6)
+        if self.requests > 0:
+            text += ', %.1f ms/request' % (self.latency / self.requests * 1000)
+        self.reset(now)
+        return text
+
+class PlanarResizer:
+    def __init__(self, size, letterbox=True, interpolation=cv2.INTER_NEAREST):
+        if letterbox and interpolation != cv2.INTER_NEAREST:
+            raise ValueError('PlanarResizer letterboxes with INTER_NEAREST only')
+        self.size = size
+        self.letterbox = letterbox
+        self.interpolation = interpolation
+        self.buffer = np.zeros((3, size, size), dtype=np.uint8)
+        self.shape = None
+        self.geometry = None
+        self.maps = None
+
+    def source_index(self, length, pad):
+        padded = length + 2 * pad
+        scale = 1. / (self.size / padded)
+        index = np.minimum(np.floor(np.arange(self.size) * scale).astype(np.intp), padded - 1) - pad
+        valid = np.flatnonzero((index >= 0) & (index < length))
+        if len(valid) == 0:
+            return slice(0, 0), index[valid]
+        return slice(valid[0], valid[-1] + 1), index[valid]
+
+    def prepare(self, shape):
+        h, w = shape[:2]
+        pad_h = pad_w = 0
+        if self.letterbox:
+            frame_size = max(h, w)
+            pad_h = int((frame_size - h)/2)
+            pad_w = int((frame_size - w)/2)
+        rows = self.source_index(h, pad_h)
+        cols = self.source_index(w, pad_w)
+        self.buffer.fill(0)
+        self.shape = shape[:2]
+        self.geometry = rows, cols
+        self.maps = np.meshgrid(cols[1].astype(np.float32), rows[1].astype(np.float32))
+
+    def resize(self, frame):
+        if frame.shape[:2] != self.shape:
+            self.prepare(frame.shape)
+        if not self.letterbox:
+            region = cv2.resize(frame, (self.size, self.size), interpolation=self.interpolation)
+            self.buffer[:] = region.transpose(2, 0, 1)
+            return self.buffer
+
+        (row_slice, rows), (col_slice, cols) = self.geometry
+        if len(rows) and len(cols):
+            region = cv2.remap(frame, self.maps[0], self.maps[1], cv2.INTER_NEAREST)
+            self.buffer[:, row_slice, col_slice] = region.transpose(2, 0, 1)
+        return self.buffer
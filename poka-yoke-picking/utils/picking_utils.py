@@ -1,6 +1,9 @@
+import numpy as np
 from json import JSONEncoder
 from tkinter import *
 from tkinter import messagebox
+from PIL import ImageTk
+from PIL import Image as PIL_Image
 
 class Point:
     def __init__(self, x: int, y: int):
@@ -99,6 +102,30 @@ class CustomEncoder(JSONEncoder):
     def default(self, o):
         return o.__dict__
 
+class DisplaySurface:
+    def __init__(self, label: Widget):
+        self.Label = label
+        self.ImageTk = None
+
+    def Show(self, image: np.ndarray):
+        h, w = image.shape[:2]
+        mode = 'RGB' if image.ndim == 3 else 'L'
+        if self.ImageTk is None or (self.ImageTk.width(), self.ImageTk.height()) != (w, h):
+            self.ImageTk = ImageTk.PhotoImage('RGB', (w, h))
+        if getattr(self.Label, 'image_tk', None) is not self.ImageTk:
+            self.Label.configure(image=self.ImageTk)
+            self.Label.image_tk = self.ImageTk
+            self.Label.image_key = None
+        rawmode = 'BGR' if mode == 'RGB' else 'L'
+        image_pil = PIL_Image.frombuffer(mode, (w, h), np.ascontiguousarray(image), 'raw', rawmode, 0, 1)
+        self.ImageTk.paste(image_pil)
+
+    def Clear(self):
+        if getattr(self.Label, 'image_tk', None) is not None:
+            self.Label.configure(image='')
+            self.Label.image_tk = None
+            self.Label.image_key = None
+
 class Window():
     def __init__(self):
         self.Root = Tk()
@@ -0,0 +1,16 @@
+import pytest
+
+from module_loader import load_module
+
+NN_UTILS = [
+    'depth-calculation/nn_utils.py',
+    'hand-landmarks/nn_utils.py',
+    'picking-detection/nn_utils.py',
+    'poka-yoke-assembly/utils/nn_utils.py',
+    'poka-yoke-counting/utils/nn_utils.py',
+    'poka-yoke-picking/utils/nn_utils.py',
+]
+
+@pytest.fixture(params=NN_UTILS)
+def nnu(request):
+    return load_module(request.param)
@@ -0,0 +1,223 @@
+import struct
+import threading
+import time
+from collections import Counter, deque
+from datetime import timedelta
+from types import ModuleType, SimpleNamespace
+
+import numpy as np
+
+class FakeNNData:
+    def __init__(self, layers, sequence=0):
+        self.layers = []
+        self.data = bytearray()
+        for name, values in layers.items():
+            values = np.asarray(values, dtype=np.float16)
+            self.data += bytes(-len(self.data) % 64)
+            self.layers.append(SimpleNamespace(name=name, dims=list(values.shape), offset=len(self.data)))
+            self.data += values.tobytes()
+        self.sequence = sequence
+        self.all_layer_calls = 0
+
+    def getAllLayers(self):
+        self.all_layer_calls += 1
+        return self.layers
+
+    def getData(self):
+        return np.frombuffer(bytes(self.data), dtype=np.uint8)
+
+    def getLayerFp16(self, name):
+        layer = next(layer for layer in self.layers if layer.name == name)
+        count = int(np.prod(layer.dims))
+        return list(struct.unpack_from(f'<{count}e', self.data, layer.offset))
+
+    def getSequenceNum(self):
+        return self.sequence
+
+    def setSequenceNum(self, sequence):
+        self.sequence = sequence
+
+class FakeQueue:
+    def __init__(self, name='', timeout=5., max_size=None):
+        self.name = name
+        self.timeout = timeout
+        self.packets = deque(maxlen=max_size)
+        self.callbacks = []
+        self.condition = threading.Condition()
+        self.calls = Counter()
+
+    def send(self, packet):
+        with self.condition:
+            self.packets.append(packet)
+            self.condition.notify_all()
+        for callback in self.callbacks:
+            callback(self.name, packet)
+
+    def addCallback(self, callback):
+        self.callbacks.append(callback)
+
+    def get(self):
+        self.calls['get'] += 1
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.packets, self.timeout):
+                raise RuntimeError(f'{self.name}: no packet within {self.timeout} s')
+            return self.packets.popleft()
+
+    def tryGet(self):
+        self.calls['tryGet'] += 1
+        with self.condition:
+            return self.packets.popleft() if self.packets else None
+
+    def tryGetAll(self):
+        self.calls['tryGetAll'] += 1
+        with self.condition:
+            packets = list(self.packets)
+            self.packets.clear()
+            return packets
+
+class FakePacket:
+    def __init__(self, stream, sequence, timestamp):
+        self.stream = stream
+        self.sequence = sequence
+        self.timestamp = timedelta(seconds=timestamp)
+
+    def getSequenceNum(self):
+        return self.sequence
+
+    def getTimestamp(self):
+        return self.timestamp
+
+    def getTimestampDevice(self):
+        return self.timestamp
+
+    def __repr__(self):
+        return f'FakePacket({self.stream!r}, {self.sequence}, {self.timestamp.total_seconds():.4f})'
+
+class SimulatedDevice:
+    def __init__(self, rates, phases=None, jitter=0., drop=0., seed=0):
+        self.rates = dict(rates)
+        self.phases = dict.fromkeys(self.rates, 0.)
+        self.phases.update(phases or {})
+        self.jitter = jitter
+        self.drop = drop
+        self.rng = np.random.default_rng(seed)
+        self.queues = {name: FakeQueue(name, max_size=1) for name in self.rates}
+        self.emitted = {name: [] for name in self.rates}
+        self.thread = None
+
+    def getOutputQueue(self, name, maxSize=1, blocking=False):
+        return self.queues[name]
+
+    def schedule(self, duration):
+        arrivals = []
+        for name, rate in self.rates.items():
+            count = int(duration * rate)
+            timestamps = self.phases[name] + np.arange(count) / rate
+            timestamps += self.rng.uniform(-self.jitter, self.jitter, count)
+            kept = self.rng.uniform(size=count) >= self.drop
+            arrivals += [(timestamp, name, sequence) for sequence, timestamp in enumerate(timestamps) if kept[sequence]]
+        arrivals.sort()
+        return [FakePacket(name, sequence, max(0., timestamp)) for timestamp, name, sequence in arrivals]
+
+    def emit(self, packets, speed=1.):
+        start = time.monotonic()
+        for packet in packets:
+            delay = start + packet.timestamp.total_seconds() / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.emitted[packet.stream].append(packet)
+            self.queues[packet.stream].send(packet)
+
+    def start(self, duration, speed=1.):
+        self.thread = threading.Thread(target=self.emit, args=(self.schedule(duration), speed))
+        self.thread.start()
+        return self
+
+    def join(self):
+        self.thread.join()
+
+class FakeName:
+    def __init__(self, path):
+        self.path = path
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return FakeName(f'{self.path}.{name}')
+
+    def __repr__(self):
+        return self.path
+
+class FakeNode:
+    def __init__(self, pipeline, kind):
+        self.pipeline = pipeline
+        self.kind = kind
+        self.calls = {}
+        self.children = {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name == 'getMaxDisparity':
+            return lambda: 95.
+        if name.startswith('set'):
+            return lambda *args: self.calls.setdefault(name, []).append(args)
+        if name not in self.children:
+            self.children[name] = FakeNode(self.pipeline, f'{self.kind}.{name}')
+        return self.children[name]
+
+    def link(self, target):
+        self.pipeline.links.append((self, target))
+
+    def call(self, name):
+        return self.calls[name][-1] if name in self.calls else None
+
+class FakePipeline:
+    def __init__(self):
+        self.nodes = []
+        self.links = []
+
+    def create(self, kind):
+        node = FakeNode(self, kind.path.rsplit('.', 1)[-1])
+        self.nodes.append(node)
+        return node
+
+    def __getattr__(self, name):
+        if not name.startswith('create'):
+            raise AttributeError(name)
+        return lambda: self.create(FakeName(name[len('create'):]))
+
+    def find(self, kind, **calls):
+        return [node for node in self.nodes if node.kind == kind
+                and all(value in str(node.call(name)) for name, value in calls.items())]
+
+    def linked(self, source, target):
+        return (source, target) in self.links
+
+class FakeCalibrationHandler:
+    def __init__(self, path=None, width=640, height=480, focal=450., baseline=-7.5):
+        self.path = path
+        self.size = (width, height)
+        self.intrinsics = [[focal, 0., width / 2], [0., focal, height / 2], [0., 0., 1.]]
+        self.extrinsics = np.eye(4)
+        self.extrinsics[0, 3] = baseline
+
+    def getDistortionCoefficients(self, socket):
+        return [0.] * 14
+
+    def getCameraIntrinsics(self, socket, width, height):
+        scale = np.diag([width / self.size[0], height / self.size[1], 1.])
+        return (scale @ self.intrinsics).tolist()
+
+    def getStereoLeftRectificationRotation(self):
+        return np.eye(3).tolist()
+
+    def getCameraExtrinsics(self, source, destination):
+        return self.extrinsics.tolist()
+
+def fake_depthai_module():
+    module = ModuleType('depthai')
+    module.Pipeline = FakePipeline
+    module.CalibrationHandler = FakeCalibrationHandler
+    module.__getattr__ = lambda name: FakeName(name)
+    return module
@@ -0,0 +1,12 @@
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def load_module(relative_path):
+    path = ROOT / relative_path
+    name = '_'.join(Path(relative_path).with_suffix('').parts).replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,74 @@
+import sys
+
+import numpy as np
+import pytest
+
+from fake_depthai import FakeCalibrationHandler, fake_depthai_module
+from module_loader import load_module
+
+pytest.importorskip('rosbags')
+pytest.importorskip('lz4')
+from rosbags.rosbag1 import Reader
+from rosbags.serde import deserialize_cdr, ros1_to_cdr
+
+WIDTH, HEIGHT = 640, 480
+
+@pytest.fixture
+def rosbag_utils(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'depthai', fake_depthai_module())
+    return load_module('depth-recording/rosbag_utils.py')
+
+def depth_frames(count):
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH]
+    return [(800 + 300 * np.sin(x / 90 + k) + 200 * np.cos(y / 70)).astype(np.uint16) for k in range(count)]
+
+def read_messages(path, topic):
+    with Reader(path) as reader:
+        connections = [c for c in reader.connections if c.topic == topic]
+        return [(timestamp, connection.msgtype, bytes(raw)) for connection, timestamp, raw in reader.messages(connections)]
+
+@pytest.mark.parametrize('compression', ['none', 'lz4', 'bz2'])
+def test_bag_round_trip(tmp_path, rosbag_utils, compression):
+    frames = depth_frames(12)
+    first = 1700000000_500000000
+    stamps = [first + sequence * 33_333_333 for sequence in range(len(frames))]
+
+    path = tmp_path / 'depth.bag'
+    with rosbag_utils.DepthAiBags(path, tmp_path / 'calib.json', {'depth': (WIDTH, HEIGHT)}, compression=compression,
+                                  chunk_size=1 << 20) as bag:
+        for sequence, (frame, stamp) in enumerate(zip(frames, stamps)):
+            bag.write(frame, stamp=stamp, sequence=sequence)
+        if compression == 'lz4':
+            assert bag.writer.compressor is rosbag_utils.lz4_compress
+
+    assert b'compression=' + compression.encode() in path.read_bytes()
+
+    images = read_messages(path, '/device_0/sensor_0/Depth_0/image/data')
+    assert len(images) == len(frames)
+    for sequence, ((timestamp, msgtype, raw), frame, stamp) in enumerate(zip(images, frames, stamps)):
+        assert timestamp == stamp - first
+        assert int.from_bytes(raw[:4], 'little') == sequence
+        image = deserialize_cdr(ros1_to_cdr(raw, msgtype), msgtype)
+        assert image.header.stamp.sec * 1000000000 + image.header.stamp.nanosec == stamp
+        assert (image.height, image.width, image.encoding, image.step) == (HEIGHT, WIDTH, 'mono16', WIDTH * 2)
+        np.testing.assert_array_equal(image.data.view(np.uint16).reshape(HEIGHT, WIDTH), frame)
+
+    metadata = read_messages(path, '/device_0/sensor_0/Depth_0/image/metadata')
+    assert len(metadata) == 3 * len(frames)
+    values = [deserialize_cdr(ros1_to_cdr(raw, msgtype), msgtype) for _, msgtype, raw in metadata[:3]]
+    assert [value.key for value in values] == ['system_time', 'timestamp_domain', 'Time Of Arrival']
+    assert values[0].value == '%.6f' % (first / 1e9)
+    assert values[1].value == 'Global Time'
+
+def test_bag_camera_info(tmp_path, rosbag_utils):
+    path = tmp_path / 'depth.bag'
+    with rosbag_utils.DepthAiBags(path, tmp_path / 'calib.json', {'depth': (WIDTH // 2, HEIGHT // 2)}) as bag:
+        bag.write(depth_frames(1)[0])
+
+    (_, msgtype, raw), = read_messages(path, '/device_0/sensor_0/Depth_0/info/camera_info')
+    info = deserialize_cdr(ros1_to_cdr(raw, msgtype), msgtype)
+    calib = FakeCalibrationHandler()
+    assert (info.width, info.height) == (WIDTH // 2, HEIGHT // 2)
+    np.testing.assert_array_equal(info.K, np.ravel(calib.getCameraIntrinsics(None, WIDTH // 2, HEIGHT // 2)))
+    np.testing.assert_array_equal(info.R, np.eye(3).ravel())
+    np.testing.assert_array_equal(info.P, calib.extrinsics[:3].ravel())
@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+import pytest
+
+from module_loader import load_module
+
+DEPTH_UTILS = [
+    'color-depth-align/depth_utils.py',
+    'depth-calculation/depth_utils.py',
+    'picking-detection/depth_utils.py',
+    'poka-yoke-counting/utils/depth_utils.py',
+    'poka-yoke-picking/utils/depth_utils.py',
+]
+
+def reference(disparity, max_disparity, threshold):
+    frame = (disparity * 255. / max_disparity).astype(np.uint8)
+    frame[frame < threshold] = 0
+    return np.ascontiguousarray(cv2.applyColorMap(frame, cv2.COLORMAP_JET))
+
+@pytest.fixture(params=DEPTH_UTILS)
+def depth_utils(request):
+    return load_module(request.param)
+
+@pytest.mark.parametrize('threshold', [0, 128])
+@pytest.mark.parametrize('dtype, max_disparity', [(np.uint8, 95), (np.uint8, 190), (np.uint16, 760), (np.uint16, 3040)])
+def test_colorize_matches_reference(depth_utils, dtype, max_disparity, threshold):
+    rng = np.random.default_rng(0)
+    disparity = rng.integers(0, max_disparity + 1, (400, 640), dtype=dtype)
+    disparity.flat[:max_disparity + 1] = np.arange(max_disparity + 1)
+    colorizer = depth_utils.DisparityColorizer(max_disparity, threshold=threshold)
+
+    np.testing.assert_array_equal(colorizer.colorize(disparity), reference(disparity, max_disparity, threshold))
+
+def test_colorize_reuses_buffer_until_shape_changes(depth_utils):
+    colorizer = depth_utils.DisparityColorizer(95)
+    first = colorizer.colorize(np.zeros((400, 640), dtype=np.uint8))
+    assert colorizer.colorize(np.full((400, 640), 95, dtype=np.uint8)) is first
+
+    resized = colorizer.colorize(np.zeros((720, 1280), dtype=np.uint16))
+    assert resized is not first
+    assert resized.shape == (720, 1280, 3)
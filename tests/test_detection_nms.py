@@ -0,0 +1,132 @@
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from module_loader import ROOT, load_module
+
+def loop_nms(boxes, class_probs, max_detections, prob_threshold, iou_threshold):
+    max_detections = min(max_detections, len(boxes))
+    max_probs = np.amax(class_probs, axis=1)
+    max_classes = np.argmax(class_probs, axis=1)
+
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    selected_boxes = []
+    selected_classes = []
+    selected_probs = []
+
+    while len(selected_boxes) < max_detections:
+        i = np.argmax(max_probs)
+        if max_probs[i] < prob_threshold:
+            break
+
+        selected_boxes.append(boxes[i])
+        selected_classes.append(max_classes[i])
+        selected_probs.append(max_probs[i])
+
+        box = boxes[i]
+        other_indices = np.concatenate((np.arange(i), np.arange(i + 1, len(boxes))))
+        other_boxes = boxes[other_indices]
+
+        x1 = np.maximum(box[0], other_boxes[:, 0])
+        y1 = np.maximum(box[1], other_boxes[:, 1])
+        x2 = np.minimum(box[0] + box[2], other_boxes[:, 0] + other_boxes[:, 2])
+        y2 = np.minimum(box[1] + box[3], other_boxes[:, 1] + other_boxes[:, 3])
+        w = np.maximum(0, x2 - x1)
+        h = np.maximum(0, y2 - y1)
+
+        overlap_area = w * h
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iou = overlap_area / (areas[i] + areas[other_indices] - overlap_area)
+
+        overlapping_indices = other_indices[np.where(iou > iou_threshold)[0]]
+        overlapping_indices = np.append(overlapping_indices, i)
+
+        class_probs[overlapping_indices, max_classes[i]] = 0
+        max_probs[overlapping_indices] = np.amax(class_probs[overlapping_indices], axis=1)
+        max_classes[overlapping_indices] = np.argmax(class_probs[overlapping_indices], axis=1)
+
+    return selected_boxes, selected_classes, selected_probs
+
+def assembly_nms(monkeypatch):
+    monkeypatch.chdir(ROOT / 'poka-yoke-assembly')
+    module = load_module('poka-yoke-assembly/utils/model_utils.py')
+    params = (module.MAX_DETECTIONS_DETECT, module.SCORE_THRESHOLD_DETECT, module.IOU_THRESHOLD)
+    return module.non_maximum_suppression, params
+
+def openvino_nms(monkeypatch):
+    pytest.importorskip('openvino.inference_engine')
+    module = load_module('poka-yoke-counting/utils/openvino_utils.py')
+    detector = SimpleNamespace(max_detections=5, prob_threshold=0.85, IOU_THRESHOLD=module.ObjectDetection.IOU_THRESHOLD)
+    params = (detector.max_detections, detector.prob_threshold, detector.IOU_THRESHOLD)
+    return lambda boxes, class_probs: module.ObjectDetection._non_maximum_suppression(detector, boxes, class_probs), params
+
+def azure_nms(monkeypatch):
+    pytest.importorskip('openvino.inference_engine')
+    monkeypatch.chdir(ROOT / 'poka-yoke-counting')
+    monkeypatch.syspath_prepend(str(ROOT / 'poka-yoke-counting'))
+    monkeypatch.delitem(sys.modules, 'utils', raising=False)
+    module = load_module('poka-yoke-counting/utils/azure_model_utils.py')
+    params = (module.MAX_DETECTIONS, module.PROB_THRESHOLD, module.IOU_THRESHOLD)
+    return module.non_maximum_suppression, params
+
+@pytest.fixture(params=[assembly_nms, openvino_nms, azure_nms], ids=['assembly', 'openvino', 'azure'])
+def nms(request, monkeypatch):
+    return request.param(monkeypatch)
+
+def random_detections(rng, count, classes=5):
+    xy = rng.uniform(0, 0.8, (count, 2))
+    wh = rng.uniform(0.05, 0.4, (count, 2))
+    class_probs = rng.uniform(0, 1, (count, classes)) ** 3
+    return np.hstack((xy, wh)), class_probs
+
+def assert_same_selection(nms, boxes, class_probs):
+    function, params = nms
+    expected = loop_nms(boxes.copy(), class_probs.copy(), *params)
+    actual = function(boxes.copy(), class_probs.copy())
+
+    assert len(actual[0]) == len(expected[0])
+    np.testing.assert_array_equal(np.reshape(actual[0], (-1, 4)), np.reshape(expected[0], (-1, 4)))
+    np.testing.assert_array_equal(actual[1], expected[1])
+    np.testing.assert_array_equal(actual[2], expected[2])
+    return actual
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_detections_match_loop(nms, seed):
+    rng = np.random.default_rng(seed)
+    boxes, class_probs = random_detections(rng, int(rng.integers(1, 200)))
+    assert_same_selection(nms, boxes, class_probs)
+
+def test_no_boxes(nms):
+    selected = assert_same_selection(nms, np.zeros((0, 4)), np.zeros((0, 5)))
+    assert selected == ([], [], [])
+
+def test_no_candidates(nms):
+    rng = np.random.default_rng(0)
+    boxes, _ = random_detections(rng, 10)
+    selected = assert_same_selection(nms, boxes, np.full((10, 5), 0.01))
+    assert selected == ([], [], [])
+
+def test_single_box(nms):
+    boxes = np.array([[0.2, 0.2, 0.3, 0.3]])
+    class_probs = np.array([[0.1, 0.95, 0.2]])
+    selected = assert_same_selection(nms, boxes, class_probs)
+    assert len(selected[0]) == 1
+
+def test_equal_scores(nms):
+    boxes = np.array([[0.1, 0.1, 0.3, 0.3], [0.12, 0.1, 0.3, 0.3], [0.6, 0.6, 0.2, 0.2], [0.1, 0.12, 0.3, 0.3]])
+    class_probs = np.full((4, 3), 0.95)
+    assert_same_selection(nms, boxes, class_probs)
+
+def test_overlapping_boxes_of_different_classes(nms):
+    boxes = np.array([[0.1, 0.1, 0.4, 0.4], [0.11, 0.1, 0.4, 0.4], [0.1, 0.11, 0.4, 0.4]])
+    class_probs = np.array([[0.99, 0.97, 0.0], [0.98, 0.0, 0.96], [0.0, 0.99, 0.98]])
+    selected = assert_same_selection(nms, boxes, class_probs)
+    assert len(set(np.asarray(selected[1]).tolist())) > 1
+
+def test_zero_area_boxes(nms):
+    boxes = np.array([[0.2, 0.2, 0.0, 0.0], [0.2, 0.2, 0.0, 0.0], [0.5, 0.5, 0.1, 0.1]])
+    class_probs = np.array([[0.99, 0.0], [0.98, 0.0], [0.97, 0.0]])
+    assert_same_selection(nms, boxes, class_probs)
@@ -0,0 +1,75 @@
+import importlib
+import sys
+
+import pytest
+
+from fake_depthai import fake_depthai_module
+from module_loader import ROOT
+
+@pytest.fixture
+def load_detection(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'depthai', fake_depthai_module())
+
+    def load(demo):
+        monkeypatch.chdir(ROOT / demo)
+        monkeypatch.syspath_prepend(str(ROOT / demo))
+        for name in [name for name in sys.modules if name == 'utils' or name.startswith('utils.')]:
+            monkeypatch.delitem(sys.modules, name)
+        return importlib.import_module('utils.detection_utils')
+
+    yield load
+    for name in [name for name in sys.modules if name == 'utils' or name.startswith('utils.')]:
+        del sys.modules[name]
+
+def neural_network(pipeline, blob):
+    networks = pipeline.find('NeuralNetwork', setBlobPath=blob)
+    assert len(networks) == 1
+    return networks[0]
+
+def xlink(pipeline, kind, stream):
+    links = pipeline.find(kind, setStreamName=stream)
+    assert len(links) == 1
+    return links[0]
+
+def assert_palm_wiring(pipeline, on_device):
+    palm_nn = neural_network(pipeline, 'palm_detection.blob')
+    assert pipeline.linked(palm_nn.out, xlink(pipeline, 'XLinkOut', 'palm_out').input)
+    manips = [manip for manip in pipeline.find('ImageManip') if pipeline.linked(manip.out, palm_nn.input)]
+    if on_device:
+        assert len(manips) == 1
+        assert pipeline.find('XLinkIn', setStreamName='palm_in') == []
+        assert manips[0].initialConfig.call('setResizeThumbnail') == (128, 128)
+    else:
+        assert manips == []
+        assert pipeline.linked(xlink(pipeline, 'XLinkIn', 'palm_in').out, palm_nn.input)
+
+@pytest.mark.parametrize('palm_on_device', [True, False])
+def test_picking_pipeline(load_detection, palm_on_device):
+    detection = load_detection('poka-yoke-picking').Detection()
+    detection.PalmOnDevice = palm_on_device
+    pipeline = detection.CreatePipeline()
+
+    assert_palm_wiring(pipeline, palm_on_device)
+    assert detection.QueueNames == ['color', 'depth']
+
+@pytest.mark.parametrize('count_on_device', [True, False])
+@pytest.mark.parametrize('palm_on_device', [True, False])
+def test_counting_pipeline(load_detection, palm_on_device, count_on_device):
+    pytest.importorskip('openvino.inference_engine')
+    detection = load_detection('poka-yoke-counting').Detection()
+    detection.PalmOnDevice = palm_on_device
+    detection.CountOnDevice = count_on_device
+    pipeline = detection.CreatePipeline()
+
+    assert_palm_wiring(pipeline, palm_on_device)
+    count_nn = neural_network(pipeline, 'part_counting.blob')
+    assert pipeline.linked(count_nn.out, xlink(pipeline, 'XLinkOut', 'count_out').input)
+    manips = [manip for manip in pipeline.find('ImageManip') if pipeline.linked(manip.out, count_nn.input)]
+    if count_on_device:
+        assert len(manips) == 1
+        assert pipeline.linked(xlink(pipeline, 'XLinkIn', 'count_cfg').out, manips[0].inputConfig)
+        assert pipeline.linked(manips[0].out, xlink(pipeline, 'XLinkOut', 'count_crop').input)
+        assert pipeline.find('XLinkIn', setStreamName='count_in') == []
+    else:
+        assert manips == []
+        assert pipeline.linked(xlink(pipeline, 'XLinkIn', 'count_in').out, count_nn.input)
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from fake_depthai import FakeNNData, FakeQueue
+
+def output(sequence):
+    return FakeNNData({"output": [sequence]}, sequence=sequence)
+
+def make_window(nnu, **kwargs):
+    queue_in = FakeQueue('in')
+    queue_out = FakeQueue('out')
+    return nnu.InferenceWindow(queue_in, queue_out, **kwargs), queue_in, queue_out
+
+def emit_later(queue, packets, delay=0.05):
+    def emit():
+        for packet in packets:
+            time.sleep(delay)
+            queue.send(packet)
+    thread = threading.Thread(target=emit)
+    thread.start()
+    return thread
+
+def test_send_stamps_sequence_numbers(nnu):
+    window, queue_in, _ = make_window(nnu, depth=4)
+    for context in 'abc':
+        window.send(FakeNNData({}, sequence=99), context)
+
+    assert [message.getSequenceNum() for message in queue_in.packets] == [0, 1, 2]
+    assert [request[:2] for request in window.pending] == [(0, 'a'), (1, 'b'), (2, 'c')]
+
+def test_fifo_mode_pairs_results_in_order(nnu):
+    window, queue_in, queue_out = make_window(nnu, depth=4, sequenced=False)
+    for context in 'abc':
+        window.send(FakeNNData({}, sequence=99), context)
+    assert [message.getSequenceNum() for message in queue_in.packets] == [99, 99, 99]
+
+    results = [output(7), output(3)]
+    for inference in results:
+        queue_out.send(inference)
+
+    assert list(window.results()) == [('a', results[0]), ('b', results[1])]
+    assert [request[1] for request in window.pending] == ['c']
+
+def test_sequenced_mode_matches_by_sequence(nnu):
+    window, _, queue_out = make_window(nnu, depth=4)
+    for context in 'abc':
+        window.send(FakeNNData({}), context)
+
+    queue_out.send(output(0))
+    assert [context for context, _ in window.results()] == ['a']
+    queue_out.send(output(1))
+    queue_out.send(output(2))
+    assert [(context, inference.getSequenceNum()) for context, inference in window.results()] == [('b', 1), ('c', 2)]
+    assert not window.pending
+
+def test_missing_results_evict_stale_requests(nnu):
+    window, _, queue_out = make_window(nnu, depth=4)
+    for context in 'abcd':
+        window.send(FakeNNData({}), context)
+
+    queue_out.send(output(2))
+    assert [context for context, _ in window.results()] == ['c']
+    assert [request[1] for request in window.pending] == ['d']
+
+def test_late_results_are_discarded(nnu):
+    window, _, queue_out = make_window(nnu, depth=4)
+    for context in 'abc':
+        window.send(FakeNNData({}), context)
+
+    queue_out.send(output(1))
+    queue_out.send(output(0))
+    queue_out.send(output(2))
+    assert [context for context, _ in window.results()] == ['b', 'c']
+    assert not window.pending
+
+def test_results_poll_while_below_depth(nnu):
+    window, _, queue_out = make_window(nnu, depth=3)
+    window.send(FakeNNData({}), 'a')
+    window.send(FakeNNData({}), 'b')
+
+    assert list(window.results()) == []
+    assert queue_out.calls['get'] == 0
+    assert len(window.pending) == 2
+
+def test_results_block_at_depth(nnu):
+    window, _, queue_out = make_window(nnu, depth=2)
+    window.send(FakeNNData({}), 'a')
+    window.send(FakeNNData({}), 'b')
+
+    emitter = emit_later(queue_out, [output(0)])
+    start = time.monotonic()
+    results = list(window.results())
+    emitter.join()
+
+    assert [context for context, _ in results] == ['a']
+    assert time.monotonic() - start >= 0.04
+    assert queue_out.calls['get'] == 1
+    assert [request[1] for request in window.pending] == ['b']
+
+def test_drain_waits_for_every_pending_request(nnu):
+    window, _, queue_out = make_window(nnu, depth=4)
+    for context in 'abc':
+        window.send(FakeNNData({}), context)
+
+    emitter = emit_later(queue_out, [output(0), output(1), output(2)], delay=0.01)
+    assert [context for context, _ in window.drain()] == ['a', 'b', 'c']
+    emitter.join()
+    assert not window.pending
+
+def test_counter_records_latency(nnu):
+    counter = nnu.TransferCounter('nn')
+    window, _, queue_out = make_window(nnu, depth=4, counter=counter)
+    window.send(FakeNNData({}), 'a')
+    window.send(FakeNNData({}), 'b')
+
+    queue_out.send(output(1))
+    list(window.results())
+    assert counter.requests == 1
+    assert counter.latency >= 0
@@ -0,0 +1,53 @@
+import numpy as np
+
+from fake_depthai import FakeNNData
+
+def palm_outputs(rng, anchors=896):
+    return {
+        "classificators": rng.normal(size=(1, anchors, 1)),
+        "regressors": rng.normal(size=(1, anchors, 18)) * 100,
+    }
+
+def test_read_matches_get_layer_fp16(nnu):
+    inference = FakeNNData(palm_outputs(np.random.default_rng(0)))
+    layers = nnu.LayerReader().read(inference)
+
+    assert list(layers) == ["classificators", "regressors"]
+    for name, values in layers.items():
+        assert values.dtype == np.float16
+        np.testing.assert_array_equal(values, np.array(inference.getLayerFp16(name), dtype=np.float16))
+
+def test_read_applies_shapes(nnu):
+    inference = FakeNNData(palm_outputs(np.random.default_rng(1)))
+    layers = nnu.LayerReader({"regressors": (896, 18)}).read(inference)
+
+    assert layers["classificators"].shape == (896,)
+    assert layers["regressors"].shape == (896, 18)
+    np.testing.assert_array_equal(layers["regressors"].reshape(-1), inference.getLayerFp16("regressors"))
+
+def test_first_returns_first_layer(nnu):
+    inference = FakeNNData({"output": np.arange(10), "unused": np.ones(3)})
+    np.testing.assert_array_equal(nnu.LayerReader().first(inference), np.arange(10, dtype=np.float16))
+
+def test_layout_is_cached(nnu):
+    rng = np.random.default_rng(2)
+    reader = nnu.LayerReader({"regressors": (896, 18)})
+    inferences = [FakeNNData(palm_outputs(rng)) for _ in range(5)]
+    for inference in inferences:
+        layers = reader.read(inference)
+        np.testing.assert_array_equal(layers["classificators"], inference.getLayerFp16("classificators"))
+
+    assert sum(inference.all_layer_calls for inference in inferences) == 1
+
+def test_layout_change_is_recached(nnu):
+    rng = np.random.default_rng(3)
+    reader = nnu.LayerReader()
+    reader.read(FakeNNData(palm_outputs(rng)))
+
+    inference = FakeNNData({"landmarks": rng.normal(size=63), "handedness": rng.normal(size=1)})
+    layers = reader.read(inference)
+
+    assert list(layers) == ["landmarks", "handedness"]
+    for name, values in layers.items():
+        np.testing.assert_array_equal(values, inference.getLayerFp16(name))
+    assert inference.all_layer_calls == 1
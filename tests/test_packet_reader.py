@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from fake_depthai import FakePacket, FakeQueue, SimulatedDevice
+from module_loader import load_module
+
+PACKET_UTILS = [
+    'oakdlite-cameras/packet_utils.py',
+    'poka-yoke-assembly/utils/packet_utils.py',
+    'poka-yoke-counting/utils/packet_utils.py',
+    'poka-yoke-picking/utils/packet_utils.py',
+]
+
+@pytest.fixture(params=PACKET_UTILS)
+def pku(request):
+    return load_module(request.param)
+
+def attached_reader(pku, *names):
+    reader = pku.PacketReader()
+    queues = {name: FakeQueue(name, max_size=1) for name in names}
+    for name, queue in queues.items():
+        reader.attach(queue, name)
+    return reader, queues
+
+def send_later(queue, packet, delay=0.05):
+    thread = threading.Thread(target=lambda: (time.sleep(delay), queue.send(packet)))
+    thread.start()
+    return thread
+
+def test_wait_returns_newest_packet_per_stream(pku):
+    reader, queues = attached_reader(pku, "color", "depth")
+    for sequence in range(3):
+        queues["color"].send(FakePacket("color", sequence, sequence / 30))
+    queues["depth"].send(FakePacket("depth", 0, 0.))
+
+    packets = reader.wait(timeout=1)
+    assert packets["color"].getSequenceNum() == 2
+    assert packets["depth"].getSequenceNum() == 0
+
+def test_streams_without_new_packets_are_none(pku):
+    reader, queues = attached_reader(pku, "color", "depth")
+    queues["color"].send(FakePacket("color", 0, 0.))
+    reader.wait(timeout=1)
+
+    queues["depth"].send(FakePacket("depth", 0, 0.))
+    packets = reader.wait(timeout=1)
+    assert packets["color"] is None
+    assert packets["depth"].getSequenceNum() == 0
+
+def test_wait_times_out_without_packets(pku):
+    reader, _ = attached_reader(pku, "color", "depth")
+    start = time.monotonic()
+    packets = reader.wait(timeout=0.05)
+
+    assert time.monotonic() - start >= 0.04
+    assert packets == {"color": None, "depth": None}
+
+def test_wait_wakes_on_arrival(pku):
+    reader, queues = attached_reader(pku, "color")
+    sender = send_later(queues["color"], FakePacket("color", 0, 0.))
+    start = time.monotonic()
+    packets = reader.wait(timeout=5)
+    sender.join()
+
+    assert time.monotonic() - start < 1
+    assert packets["color"].getSequenceNum() == 0
+
+def test_watched_queue_wakes_without_packet(pku):
+    reader, _ = attached_reader(pku, "color")
+    nn_out = FakeQueue("nn_out")
+    reader.watch(nn_out)
+
+    sender = send_later(nn_out, FakePacket("nn_out", 0, 0.))
+    start = time.monotonic()
+    packets = reader.wait(timeout=5)
+    sender.join()
+
+    assert 0.04 <= time.monotonic() - start < 1
+    assert packets == {"color": None}
+    assert len(nn_out.packets) == 1
+
+def test_simulated_device_delivers_newest_packets(pku):
+    device = SimulatedDevice({"color": 60, "depth": 30}, phases={"depth": 0.005}, jitter=0.002)
+    reader = pku.PacketReader()
+    for name in device.rates:
+        reader.attach(device.getOutputQueue(name), name)
+
+    received = {name: [] for name in device.rates}
+    wakeups = 0
+    device.start(0.5, speed=2.)
+    while device.thread.is_alive() or reader.arrivals != reader.taken:
+        packets = reader.wait(timeout=0.05)
+        wakeups += 1
+        for name, packet in packets.items():
+            if packet is not None:
+                received[name].append(packet.getSequenceNum())
+    device.join()
+
+    for name, sequences in received.items():
+        assert sequences == sorted(set(sequences))
+        assert sequences[-1] == device.emitted[name][-1].getSequenceNum()
+    assert wakeups <= sum(len(packets) for packets in device.emitted.values()) + 2
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import pytest
+
+INTERPOLATIONS = [cv2.INTER_NEAREST, cv2.INTER_LINEAR, cv2.INTER_AREA]
+SHAPES = [(480, 640, 3), (640, 480, 3), (300, 300, 3), (1080, 1920, 3), (97, 131, 3)]
+
+def reference(frame, size, letterbox, interpolation=cv2.INTER_NEAREST):
+    if letterbox:
+        h, w = frame.shape[:2]
+        frame_size = max(h, w)
+        pad_h = int((frame_size - h)/2)
+        pad_w = int((frame_size - w)/2)
+        frame = cv2.copyMakeBorder(frame, pad_h, pad_h, pad_w, pad_w, cv2.BORDER_CONSTANT)
+    return cv2.resize(frame, (size, size), interpolation=interpolation).transpose(2, 0, 1)
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_letterbox_matches_reference(nnu, shape):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, shape, dtype=np.uint8)
+    resizer = nnu.PlanarResizer(128)
+
+    np.testing.assert_array_equal(resizer.resize(frame), reference(frame, 128, True))
+
+@pytest.mark.parametrize('interpolation', INTERPOLATIONS)
+@pytest.mark.parametrize('shape', SHAPES)
+def test_stretch_matches_reference(nnu, shape, interpolation):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, shape, dtype=np.uint8)
+    resizer = nnu.PlanarResizer(128, letterbox=False, interpolation=interpolation)
+
+    np.testing.assert_array_equal(resizer.resize(frame), reference(frame, 128, False, interpolation))
+
+@pytest.mark.parametrize('interpolation', [cv2.INTER_LINEAR, cv2.INTER_AREA])
+def test_letterbox_rejects_filtering_interpolation(nnu, interpolation):
+    with pytest.raises(ValueError):
+        nnu.PlanarResizer(128, interpolation=interpolation)
+
+def test_resolution_change_clears_padding(nnu):
+    rng = np.random.default_rng(1)
+    resizer = nnu.PlanarResizer(64)
+    for shape in [(480, 640, 3), (640, 480, 3), (480, 640, 3)]:
+        frame = rng.integers(1, 256, shape, dtype=np.uint8)
+        for _ in range(2):
+            np.testing.assert_array_equal(resizer.resize(frame), reference(frame, 64, True))
+
+def test_degenerate_frame_is_letterboxed(nnu):
+    frame = np.full((1, 129, 3), 255, dtype=np.uint8)
+    resizer = nnu.PlanarResizer(127)
+
+    np.testing.assert_array_equal(resizer.resize(frame), reference(frame, 127, True))
+
+def test_source_index_without_valid_samples(nnu):
+    resizer = nnu.PlanarResizer(127)
+    index_slice, index = resizer.source_index(1, 64)
+
+    assert index_slice == slice(0, 0)
+    assert len(index) == 0
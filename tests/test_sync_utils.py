@@ -0,0 +1,144 @@
+import pytest
+
+from fake_depthai import FakePacket, FakeQueue, SimulatedDevice
+from module_loader import load_module
+
+@pytest.fixture
+def sync_utils():
+    return load_module('depth-recording/sync_utils.py')
+
+@pytest.fixture(params=range(3))
+def device_factory(request):
+    return lambda rates, **kwargs: SimulatedDevice(rates, seed=request.param, **kwargs)
+
+def attached_events(sync_utils, names, max_size=None):
+    events = sync_utils.QueueEvents(max_size=max_size)
+    streams = [{'name': name, 'q': FakeQueue(name)} for name in names]
+    for stream in streams:
+        events.attach(stream)
+    return events, streams
+
+def test_queue_events_keep_every_arrival_in_order(sync_utils):
+    events, (color, depth) = attached_events(sync_utils, ['color', 'depth'])
+    for sequence in range(3):
+        color['q'].send(FakePacket('color', sequence, sequence / 30))
+        depth['q'].send(FakePacket('depth', sequence, sequence / 30))
+
+    arrivals, overflow = events.wait(timeout=1)
+    assert [(stream['name'], msg.getSequenceNum()) for stream, msg in arrivals] == [
+        ('color', 0), ('depth', 0), ('color', 1), ('depth', 1), ('color', 2), ('depth', 2)]
+    assert overflow == []
+    assert events.wait(timeout=0.01) == ([], [])
+
+def test_queue_events_overflow_oldest_beyond_max_size(sync_utils):
+    events, (color,) = attached_events(sync_utils, ['color'], max_size=2)
+    for sequence in range(5):
+        color['q'].send(FakePacket('color', sequence, sequence / 30))
+
+    arrivals, overflow = events.wait(timeout=1)
+    assert [msg.getSequenceNum() for _, msg in arrivals] == [3, 4]
+    assert [msg.getSequenceNum() for _, msg in overflow] == [0, 1, 2]
+    assert events.wait(timeout=0.01) == ([], [])
+
+def test_queue_events_overflow_is_counted_as_dropped(sync_utils):
+    events, (color, depth) = attached_events(sync_utils, ['color', 'depth'], max_size=4)
+    for sequence in range(4):
+        color['q'].send(FakePacket('color', sequence, sequence / 30))
+        depth['q'].send(FakePacket('depth', sequence, sequence / 30))
+    sync = sync_utils.StreamSynchronizer(['color', 'depth'], tolerance=0.01)
+
+    arrivals, overflow = events.wait(timeout=1)
+    for stream, msg in overflow:
+        sync.drop(stream['name'], msg)
+    sets = [sync.add(stream['name'], msg) for stream, msg in arrivals]
+
+    assert [synced['color'].getSequenceNum() for synced in sets if synced is not None] == [2, 3]
+    assert sync.dropped == {'color': 2, 'depth': 2}
+    assert sync.missed == {'color': 0, 'depth': 0}
+    assert sync.report() == 'synced 2 sets, dropped 4 on host, missed 0 on device'
+
+def synchronize(sync_utils, device, duration, tolerance, max_backlog=10):
+    sync = sync_utils.StreamSynchronizer(device.rates, tolerance=tolerance, max_backlog=max_backlog)
+    packets = device.schedule(duration)
+    sets = []
+    for packet in packets:
+        synced = sync.add(packet.stream, packet)
+        if synced is not None:
+            sets.append(synced)
+        assert all(len(backlog) <= max_backlog for backlog in sync.backlogs.values())
+    return sync, packets, sets
+
+def assert_accounted(sync, packets, sets):
+    assert sync.matched == len(sets)
+    for stream, backlog in sync.backlogs.items():
+        received = sum(packet.stream == stream for packet in packets)
+        assert received == len(sets) + sync.dropped[stream] + len(backlog)
+
+def assert_within_tolerance(sets, tolerance):
+    for synced in sets:
+        stamps = [msg.getTimestamp().total_seconds() for msg in synced.values()]
+        assert max(stamps) - min(stamps) <= tolerance
+
+def test_jittered_streams_are_all_matched(sync_utils, device_factory):
+    device = device_factory({'left': 30, 'right': 30, 'color': 30}, jitter=0.004)
+    sync, packets, sets = synchronize(sync_utils, device, 2, tolerance=0.5 / 30)
+
+    assert len(sets) == 60
+    assert all(len({msg.getSequenceNum() for msg in synced.values()}) == 1 for synced in sets)
+    assert sum(sync.dropped.values()) == 0
+    assert sum(sync.missed.values()) == 0
+    assert_within_tolerance(sets, 0.5 / 30)
+    assert_accounted(sync, packets, sets)
+
+def test_dropped_frames_are_counted_as_missed(sync_utils, device_factory):
+    device = device_factory({'left': 30, 'right': 30}, jitter=0.002, drop=0.2)
+    sync, packets, sets = synchronize(sync_utils, device, 4, tolerance=0.5 / 30)
+
+    for stream in device.rates:
+        sequences = [packet.sequence for packet in packets if packet.stream == stream]
+        assert sync.missed[stream] == sequences[-1] - sequences[0] + 1 - len(sequences)
+    assert sum(sync.missed.values()) > 0
+    assert sum(sync.dropped.values()) > 0
+    assert all(synced['left'].getSequenceNum() == synced['right'].getSequenceNum() for synced in sets)
+    assert_within_tolerance(sets, 0.5 / 30)
+    assert_accounted(sync, packets, sets)
+
+def test_streams_in_phase_within_tolerance(sync_utils, device_factory):
+    device = device_factory({'color': 30, 'depth': 30}, phases={'depth': 0.4 / 30})
+    sync, packets, sets = synchronize(sync_utils, device, 2, tolerance=0.5 / 30)
+
+    assert len(sets) == 60
+    assert sum(sync.dropped.values()) == 0
+    assert_accounted(sync, packets, sets)
+
+def test_streams_out_of_phase_never_match(sync_utils, device_factory):
+    device = device_factory({'color': 30, 'depth': 30}, phases={'depth': 0.5 / 30})
+    sync, packets, sets = synchronize(sync_utils, device, 2, tolerance=0.25 / 30, max_backlog=4)
+
+    assert sets == []
+    assert sum(sync.dropped.values()) >= len(packets) - 2
+    assert_accounted(sync, packets, sets)
+
+def test_slower_stream_paces_the_sets(sync_utils, device_factory):
+    device = device_factory({'color': 30, 'depth': 15})
+    sync, packets, sets = synchronize(sync_utils, device, 2, tolerance=0.5 / 30)
+
+    assert len(sets) == 30
+    assert sync.dropped['color'] == 29
+    assert sync.dropped['depth'] == 0
+    assert_within_tolerance(sets, 0.5 / 30)
+    assert_accounted(sync, packets, sets)
+
+def test_stalled_stream_keeps_backlogs_bounded(sync_utils):
+    sync = sync_utils.StreamSynchronizer(['color', 'depth'], tolerance=0.01, max_backlog=5)
+    for sequence in range(20):
+        assert sync.add('color', FakePacket('color', sequence, sequence / 30)) is None
+
+    assert len(sync.backlogs['color']) == 5
+    assert [msg.getSequenceNum() for _, msg in sync.backlogs['color']] == [15, 16, 17, 18, 19]
+    assert sync.dropped == {'color': 15, 'depth': 0}
+
+    synced = sync.add('depth', FakePacket('depth', 0, 19 / 30))
+    assert synced['color'].getSequenceNum() == 19
+    assert sync.dropped == {'color': 19, 'depth': 0}
+    assert sync.report() == 'synced 1 sets, dropped 19 on host, missed 0 on device'